@@ -8,6 +8,8 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     DEBUG: bool = True
+    # Threads per worker for the synchronous route handlers (concurrent DB-bound requests)
+    THREADPOOL_SIZE: int = 40
     
     # Database (SQLite for development, PostgreSQL for production)
     # Read directly from environment variable with fallback
@@ -21,11 +23,70 @@ class Settings(BaseSettings):
     DB_USER: str = "postgres"
     DB_PASSWORD: str = "postgres"
     
+    # Connection pool (used for both PostgreSQL and SQLite)
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW matches THREADPOOL_SIZE, so every request
+    # thread can hold a connection; change them together, otherwise request
+    # threads queue for connections (see /api/metrics). Per worker process:
+    # keep workers * 40 below PostgreSQL's max_connections.
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is reopened, -1 to disable
+    DB_POOL_PRE_PING: bool = True
+    
+    # SQLite tuning (per pooled connection)
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
+    SQLITE_CACHE_SIZE_KB: int = 65536  # 64 MB
+    
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
     
+    # Authenticated user cache (seconds, 0 disables caching)
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    # Trust user id and role from token claims and skip the user lookup entirely.
+    # Role changes and deactivation then take effect only when the token expires.
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+    
+    # Password hashing (bcrypt cost factor and size of the hashing thread pool)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    
+    # Inventory reports cache (seconds, 0 disables caching)
+    INVENTORY_REPORT_CACHE_TTL_SECONDS: int = 300
+    INVENTORY_REPORT_CACHE_MAX_SIZE: int = 256
+    
+    # Product images: threads generating thumbnails and WebP variants in the background
+    PRODUCT_IMAGE_WORKERS: int = 2
+    
+    # Response compression: bodies from this size (bytes) are sent with brotli or gzip
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 6  # 1-9
+    BROTLI_QUALITY: int = 4  # 0-11; higher levels cost too much CPU for dynamic responses
+    
+    # Upload storage: "local" (UPLOAD_DIR on this machine) or "s3" (AWS S3, MinIO, any S3-compatible store)
+    STORAGE_BACKEND: str = "local"
+    UPLOAD_DIR: str = "uploads"
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: str = ""  # Empty for AWS, e.g. http://localhost:9000 for MinIO
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: str = ""  # Empty to use the default AWS credential chain
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_PUBLIC_BASE_URL: str = ""  # Public bucket or CDN URL; presigned URLs are used when empty
+    S3_PRESIGNED_URL_TTL_SECONDS: int = 3600
+    S3_MULTIPART_THRESHOLD_MB: int = 8  # Larger files are uploaded in parts
+    
+    # Document numbers: format per document type ({number} - sequence value, {date} - today)
+    SALES_ORDER_NUMBER_FORMAT: str = "SO-{number:06d}"
+    PURCHASE_ORDER_NUMBER_FORMAT: str = "PO-{number:06d}"
+    # Numbers each worker takes from the database at once (the unused rest is skipped on restart)
+    DOCUMENT_NUMBER_BLOCK_SIZE: int = 100
+    
+    # Dashboard: seconds between folding pending aggregate changes into dashboard_stats
+    DASHBOARD_FOLD_INTERVAL_SECONDS: int = 5
+    
     # CORS - stored as string, converted to list via property
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:3001"
     
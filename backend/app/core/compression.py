@@ -0,0 +1,189 @@
+"""
+Response compression (brotli or gzip).
+
+The encoding is chosen from Accept-Encoding: br when the client accepts it and
+the brotli package is installed, gzip otherwise. Bodies smaller than
+COMPRESSION_MINIMUM_SIZE and already compressed content types (images, archives)
+are sent as is; streamed responses are compressed chunk by chunk.
+
+Plain ASGI middleware: it relies only on the ASGI message format, not on the
+internals of Starlette's GZipMiddleware, which differ between releases.
+"""
+import zlib
+from typing import Optional, Set
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is used instead
+    brotli = None
+
+# Content types that are already compressed or must not be buffered
+EXCLUDED_CONTENT_TYPES = (
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/grpc",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "image/avif",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "text/event-stream",
+    "video/*",
+)
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Content codings listed in Accept-Encoding, without those refused with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = params.strip().lower()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        # wbits=31: gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        compressed = self._compressor.compress(body)
+        return compressed + self._compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        compressed = self._compressor.process(body)
+        return compressed + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class _Responder:
+    """Compresses one response; `encoding` None only adds the Vary header."""
+
+    def __init__(self, middleware: "CompressionMiddleware", send: Send, encoding: Optional[str]) -> None:
+        self.middleware = middleware
+        self.send = send
+        self.encoding = encoding
+        self.stream = None
+        self.initial_message: Message = {}
+        self.passthrough = False
+        self.started = False
+
+    def _is_excluded(self, headers: Headers) -> bool:
+        media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        candidates = {media_type, media_type.partition("/")[0] + "/*"}
+        if media_type.startswith("application/grpc+"):
+            candidates.add("application/grpc")
+        return not candidates.isdisjoint(self.middleware.exclude_content_types)
+
+    async def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if self.stream is None:
+            if self.encoding == "br":
+                self.stream = _BrotliStream(self.middleware.brotli_quality)
+            else:
+                self.stream = _GzipStream(self.middleware.gzip_level)
+        if len(body) >= self.middleware.thread_minimum_size:
+            # Compressing large bodies inline would block the event loop
+            return await anyio.to_thread.run_sync(self.stream.compress, body, more_body)
+        return self.stream.compress(body, more_body)
+
+    async def __call__(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Held back until the first body chunk decides the headers
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers or message["status"] == 206 or self._is_excluded(headers)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if self.passthrough or message_type != "http.response.body":
+            if not self.passthrough and not self.started and message_type == "http.response.pathsend":
+                # Files sent by the server itself are not compressed
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.started:
+            # Next chunk of a streamed response
+            if self.encoding is not None:
+                message["body"] = await self._compress(body, more_body)
+            await self.send(message)
+            return
+
+        self.started = True
+        if len(body) < self.middleware.minimum_size and not more_body:
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if self.encoding is not None:
+            message["body"] = await self._compress(body, more_body)
+            headers["Content-Encoding"] = self.encoding
+            if more_body or self.initial_message.get("trailers", False):
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+        await self.send(self.initial_message)
+        await self.send(message)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        thread_minimum_size: int = 128 * 1024,
+        exclude_content_types: tuple = EXCLUDED_CONTENT_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_minimum_size = thread_minimum_size
+        self.exclude_content_types = tuple(content_type.lower() for content_type in exclude_content_types)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope).get("Accept-Encoding", ""))
+        if brotli is not None and "br" in encodings:
+            encoding = "br"
+        elif "gzip" in encodings:
+            encoding = "gzip"
+        else:
+            encoding = None
+        await self.app(scope, receive, _Responder(self, send, encoding))
@@ -1,18 +1,25 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import get_db
 from app.models.user import User
+from app.schemas.auth import CurrentUser
 from app.core.security import decode_access_token
+from app.core.user_cache import get_cached_user, cache_user, user_version
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
-async def get_current_user(
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user."""
+) -> CurrentUser:
+    """Get the current authenticated user.
+    
+    The user is served from the in-process user cache; the database is only
+    queried on a cache miss (or never, with AUTH_TRUST_TOKEN_CLAIMS).
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Не удалось проверить учетные данные",
@@ -27,12 +34,26 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and payload.get("uid") and payload.get("role"):
+        return CurrentUser(id=payload["uid"], username=username, role=payload["role"])
+    
+    user = get_cached_user(username)
     if user is None:
-        raise credentials_exception
+        version = user_version(username)
+        db_user = db.query(User.id, User.username, User.role, User.is_active).filter(
+            User.username == username
+        ).first()
+        if db_user is None:
+            raise credentials_exception
+        user = CurrentUser(
+            id=db_user.id,
+            username=db_user.username,
+            role=db_user.role,
+            is_active=bool(db_user.is_active)
+        )
+        cache_user(user, version)
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Неактивный пользователь")
     
     return user
-
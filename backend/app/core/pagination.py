@@ -0,0 +1,145 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+The cursor is an opaque token with the sort key values of the last row on the
+page (the sort always ends with the primary key, so it is unique). The next
+page continues strictly after that row, so every page costs the same and rows
+inserted meanwhile do not shift or duplicate results.
+
+The token is returned in the X-Next-Cursor response header (absent on the last
+page) and passed back as ?cursor=. With ?total=exact the filtered row count is
+returned in X-Total-Count; ?total=estimate returns the planner estimate on
+PostgreSQL in X-Total-Count-Estimate instead of running COUNT(*).
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import and_, literal, or_, type_coerce
+from sqlalchemy.exc import CompileError
+from sqlalchemy.types import NullType
+
+CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_HEADER = "X-Total-Count"
+TOTAL_ESTIMATE_HEADER = "X-Total-Count-Estimate"
+
+# (column or expression, descending)
+SortKey = Tuple[Any, bool]
+
+
+class PageParams:
+    """Common query parameters of paginated list endpoints."""
+
+    def __init__(
+        self,
+        response: Response,
+        cursor: Optional[str] = Query(None, description="Значение X-Next-Cursor предыдущей страницы"),
+        total: Optional[str] = Query(None, pattern="^(exact|estimate)$", description="Вернуть количество записей в заголовке")
+    ):
+        self.response = response
+        self.cursor = cursor
+        self.total = total
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "n" in value:
+            return Decimal(value["n"])
+        raise ValueError("unknown cursor value")
+    # Lists and other JSON values are never written by encode_cursor
+    raise ValueError("unsupported cursor value")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("cursor does not match the sort order")
+        return [_decode_value(value) for value in values]
+    except (ValueError, TypeError, InvalidOperation, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        )
+
+
+def _raw(expression):
+    # Keys are read and compared as the stored values, without type processing:
+    # SQLite keeps DateTime as text in more than one format, and comparing with a
+    # re-formatted value would repeat or skip rows on the page boundary.
+    return type_coerce(expression, NullType())
+
+
+def _after(sort: Sequence[SortKey], values: Sequence[Any]):
+    """Rows strictly after `values` in the given sort order."""
+    clauses = []
+    for position, ((expression, descending), value) in enumerate(zip(sort, values)):
+        bound = literal(value, NullType())
+        equal = [
+            _raw(previous) == literal(previous_value, NullType())
+            for (previous, _), previous_value in zip(sort[:position], values[:position])
+        ]
+        clauses.append(and_(*equal, _raw(expression) < bound if descending else _raw(expression) > bound))
+    return or_(*clauses)
+
+
+def _estimate_count(query) -> Optional[int]:
+    session = query.session
+    dialect = session.get_bind().dialect
+    if dialect.name != "postgresql":
+        return None
+    try:
+        sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    except (CompileError, NotImplementedError):
+        return None
+    plan = session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def paginate(query, page: PageParams, sort: Sequence[SortKey], limit: int) -> list:
+    """Return one page of an ORM query ordered by `sort` (last key must be unique)."""
+    if page.total:
+        count_query = query.enable_eagerloads(False).order_by(None)
+        estimate = _estimate_count(count_query) if page.total == "estimate" else None
+        if estimate is not None:
+            page.response.headers[TOTAL_ESTIMATE_HEADER] = str(estimate)
+        else:
+            page.response.headers[TOTAL_HEADER] = str(count_query.count())
+
+    query = query.add_columns(*[_raw(expression).label(f"cursor_{i}") for i, (expression, _) in enumerate(sort)])
+    if page.cursor:
+        query = query.filter(_after(sort, decode_cursor(page.cursor, len(sort))))
+
+    order = [expression.desc() if descending else expression.asc() for expression, descending in sort]
+    rows = query.order_by(None).order_by(*order).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        page.response.headers[CURSOR_HEADER] = encode_cursor(rows[-1][1:])
+    return [row[0] for row in rows]
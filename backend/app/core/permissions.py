@@ -3,7 +3,8 @@
 """
 from fastapi import Depends, HTTPException, status
 from typing import List
-from app.models.user import User, UserRole
+from app.models.user import UserRole
+from app.schemas.auth import CurrentUser
 from app.core.dependencies import get_current_user
 
 
@@ -17,7 +18,7 @@ def require_role(allowed_roles: List[UserRole]):
     Returns:
         Зависимость FastAPI, которая проверяет роль пользователя
     """
-    async def role_checker(current_user: User = Depends(get_current_user)):
+    async def role_checker(current_user: CurrentUser = Depends(get_current_user)):
         if current_user.role not in allowed_roles:
             role_names = ", ".join([role.value for role in allowed_roles])
             raise HTTPException(
@@ -0,0 +1,54 @@
+"""
+JSON responses rendered with orjson.
+
+FastAPI passes handler results that are not Response objects through
+jsonable_encoder, which walks every value in Python and turns Decimal into
+float. Large list endpoints return json_response(...) instead: pydantic models
+are dumped in python mode and orjson writes Decimal values as JSON numbers with
+their exact digits (12.50 stays 12.50).
+
+Routes with a response_model keep FastAPI's own path (pydantic dump_json),
+which is already native and faster than dumping to Python objects first.
+"""
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+
+def orjson_default(value: Any) -> Any:
+    """Encode the types orjson does not handle natively."""
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            return None
+        return orjson.Fragment(str(value))
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """Render `content` with orjson, skipping jsonable_encoder.
+
+    FastAPI only copies headers set on the injected `response` (e.g. the
+    pagination cursor) into responses it builds itself, so they are carried
+    over here.
+    """
+    rendered = ORJSONResponse(content, status_code=status_code)
+    if response is not None:
+        rendered.headers.raw.extend(response.headers.raw)
+    return rendered
@@ -1,5 +1,9 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
 import warnings
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -12,9 +16,28 @@ warnings.filterwarnings("ignore", category=UserWarning, module="passlib")
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
-    bcrypt__ident="2b"  # Use bcrypt 2b format
+    bcrypt__ident="2b",  # Use bcrypt 2b format
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
 )
 
+# Bcrypt takes hundreds of milliseconds per call; handlers await it on a small
+# dedicated pool so a login storm cannot occupy more than PASSWORD_HASH_WORKERS
+# threads. The password handlers are async and only borrow request threads for
+# their short DB work, so waiting logins never hold the request threadpool.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_hash_stats_lock = threading.Lock()
+_hash_stats = {
+    "queued": 0,
+    "running": 0,
+    "completed": 0,
+    "max_queue_depth": 0,
+    "total_wait_seconds": 0.0,
+    "total_run_seconds": 0.0,
+}
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
@@ -33,6 +56,57 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _run_in_hash_pool(func, *args):
+    """Submit a bcrypt call to the hashing pool and return an awaitable future."""
+    submitted_at = time.perf_counter()
+
+    def task():
+        started_at = time.perf_counter()
+        with _hash_stats_lock:
+            _hash_stats["queued"] -= 1
+            _hash_stats["running"] += 1
+            _hash_stats["total_wait_seconds"] += started_at - submitted_at
+        try:
+            return func(*args)
+        finally:
+            with _hash_stats_lock:
+                _hash_stats["running"] -= 1
+                _hash_stats["completed"] += 1
+                _hash_stats["total_run_seconds"] += time.perf_counter() - started_at
+
+    with _hash_stats_lock:
+        _hash_stats["queued"] += 1
+        _hash_stats["max_queue_depth"] = max(_hash_stats["max_queue_depth"], _hash_stats["queued"])
+    return asyncio.wrap_future(_hash_executor.submit(task))
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool without holding a request thread."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool without holding a request thread."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+def get_password_hash_stats() -> dict:
+    """Queue depth and timing of the password hashing pool."""
+    with _hash_stats_lock:
+        stats = dict(_hash_stats)
+    completed = stats["completed"] or 1
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "queued": stats["queued"],
+        "running": stats["running"],
+        "completed": stats["completed"],
+        "max_queue_depth": stats["max_queue_depth"],
+        "avg_wait_ms": round(stats["total_wait_seconds"] / completed * 1000, 2),
+        "avg_run_ms": round(stats["total_run_seconds"] / completed * 1000, 2),
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -0,0 +1,60 @@
+"""
+Кэш аутентифицированных пользователей.
+
+Хранит минимальные данные пользователя (id, роль, активность) по username,
+чтобы get_current_user не обращался к базе на каждый запрос. Записи живут
+USER_CACHE_TTL_SECONDS и сбрасываются при изменении пользователя: каждое
+invalidate_user увеличивает версию, и записи со старой версией (в том числе
+прочитанные из базы параллельно с изменением) больше не выдаются.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.schemas.auth import CurrentUser
+
+_lock = threading.Lock()
+_entries: Dict[str, Tuple[float, int, CurrentUser]] = {}
+_versions: Dict[str, int] = {}
+
+
+def user_version(username: str) -> int:
+    """Current cache version of a user; take it before reading the user from the DB."""
+    with _lock:
+        return _versions.get(username, 0)
+
+
+def get_cached_user(username: str) -> Optional[CurrentUser]:
+    """Return the cached principal if it is fresh and not invalidated."""
+    with _lock:
+        entry = _entries.get(username)
+        if entry is None:
+            return None
+        expires_at, version, user = entry
+        if expires_at < time.monotonic() or version != _versions.get(username, 0):
+            del _entries[username]
+            return None
+        return user
+
+
+def cache_user(user: CurrentUser, version: int) -> None:
+    """Store a principal read from the DB under the version taken before the read."""
+    if settings.USER_CACHE_TTL_SECONDS <= 0:
+        return
+    with _lock:
+        if version != _versions.get(user.username, 0):
+            return
+        if len(_entries) >= settings.USER_CACHE_MAX_SIZE:
+            _entries.clear()
+        _entries[user.username] = (time.monotonic() + settings.USER_CACHE_TTL_SECONDS, version, user)
+
+
+def invalidate_user(*usernames: str) -> None:
+    """Drop cached principals after a user was changed or deleted."""
+    with _lock:
+        for username in usernames:
+            if not username:
+                continue
+            _versions[username] = _versions.get(username, 0) + 1
+            _entries.pop(username, None)
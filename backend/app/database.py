@@ -1,11 +1,72 @@
+import threading
+import time
+
 from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import QueuePool
 from app.config import settings
 
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long requests wait to check out a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        waited = time.perf_counter() - started_at
+        with self._stats_lock:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return connection
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            checkouts = self._checkouts
+            total_wait = self._total_wait
+            max_wait = self._max_wait
+            timeouts = self._timeouts
+        capacity = self.size() + self._max_overflow
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "saturation": round(self.checkedout() / capacity, 3) if capacity > 0 else None,
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "avg_checkout_ms": round(total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+            "max_checkout_ms": round(max_wait * 1000, 3),
+        }
+
+
 # Create database engine
-# SQLite doesn't support pool_size and max_overflow
+# Both SQLite and PostgreSQL keep a pool of open connections; sizes come from settings
+pool_options = {
+    "poolclass": MeteredQueuePool,
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
 if settings.DATABASE_URL.startswith("sqlite"):
     # SQLite configuration for better concurrency
     engine = create_engine(
@@ -14,22 +75,23 @@ if settings.DATABASE_URL.startswith("sqlite"):
             "check_same_thread": False,  # Needed for SQLite
             "timeout": 20  # Wait up to 20 seconds for lock to be released
         },
-        poolclass=NullPool,  # Use NullPool for SQLite to avoid connection pooling issues
+        **pool_options
     )
-    
-    # Enable WAL mode for better concurrency
+
+    # Runs once per pooled connection, not per request
     @event.listens_for(engine, "connect")
     def set_sqlite_pragma(dbapi_conn, connection_record):
         cursor = dbapi_conn.cursor()
-        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA journal_mode=WAL")  # Enable WAL mode for better concurrency
+        cursor.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, no fsync per commit
         cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")  # Negative value = KiB
         cursor.close()
 else:
     engine = create_engine(
         settings.DATABASE_URL,
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10
+        **pool_options
     )
 
 # Create session factory
@@ -39,6 +101,11 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def get_pool_stats() -> dict:
+    """Connection pool checkout latency and saturation."""
+    return engine.pool.stats()
+
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -46,4 +113,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
@@ -1,20 +1,29 @@
-from fastapi import FastAPI, Request, status
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from dotenv import load_dotenv
+import anyio.to_thread
+import asyncio
 import traceback
 
-from app.database import engine, Base
-from app.routers import auth, customers, products, inventory, orders, leads, upload, warehouses, suppliers, purchase_orders, users
+from app.database import engine, Base, get_pool_stats
+from app.routers import auth, customers, products, inventory, orders, leads, upload, warehouses, suppliers, purchase_orders, users, search, dashboard
 from app.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.permissions import require_admin
+from app.core.security import get_password_hash_stats
+from app.schemas.auth import CurrentUser
+from app.services import product_search, search_index, numbering, order_status, dashboard as dashboard_stats
 
 # Import all models to ensure they are registered with Base before creating tables
 # This ensures all tables are created on first startup
 from app.models import (
     User, Customer, Contact, Category, Product, Warehouse,
-    Inventory, Supplier, PurchaseOrder, PurchaseOrderItem,
-    SalesOrder, OrderItem, Lead, Opportunity
+    Inventory, InventoryMovement, Supplier, PurchaseOrder, PurchaseOrderItem,
+    SalesOrder, OrderItem, Lead, Opportunity, SearchDocument, DashboardStat, DashboardStatDelta,
+    DocumentCounter
 )
 
 # Load environment variables
@@ -43,6 +52,15 @@ try:
     print(f"📋 Created {len(Base.metadata.tables)} tables:")
     for table_name in sorted(Base.metadata.tables.keys()):
         print(f"   ✓ {table_name}")
+    order_status.ensure_order_item_warehouses(engine)
+    print("✅ Order line warehouses ready")
+    product_search.ensure_search_index(engine)
+    search_index.ensure_search_index(engine)
+    print("✅ Search indexes ready")
+    dashboard_stats.ensure_dashboard_stats(engine)
+    print("✅ Dashboard aggregates ready")
+    numbering.ensure_document_numbering(engine)
+    print("✅ Document numbering ready")
 except Exception as e:
     print(f"❌ ERROR: Failed to create database tables!")
     print(f"   Error: {str(e)}")
@@ -54,10 +72,34 @@ except Exception as e:
 
 print("=" * 50)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Route handlers are plain `def` functions that use the blocking SQLAlchemy
+    # session, so FastAPI runs them on this threadpool. Its size is how many
+    # requests one worker serves concurrently.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    print(f"🧵 Request threadpool size: {settings.THREADPOOL_SIZE}")
+    fold_task = asyncio.create_task(_fold_dashboard_deltas())
+    yield
+    fold_task.cancel()
+
+
+async def _fold_dashboard_deltas():
+    """Fold pending dashboard changes into the aggregates in the background."""
+    while True:
+        await asyncio.sleep(settings.DASHBOARD_FOLD_INTERVAL_SECONDS)
+        try:
+            await anyio.to_thread.run_sync(dashboard_stats.fold_dashboard_deltas, engine)
+        except Exception as e:
+            # The deltas stay in place and are folded on the next run
+            print(f"⚠️  Dashboard fold failed: {e}")
+
+
 app = FastAPI(
     title="CRM IMS API",
     description="Customer Relationship Management and Inventory Management System API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
     # redirect_slashes defaults to True - FastAPI will handle redirects automatically
 )
 
@@ -75,6 +117,14 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Brotli or gzip for responses from COMPRESSION_MINIMUM_SIZE bytes (images are sent as is)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.GZIP_COMPRESS_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(customers.router, prefix="/api/customers", tags=["Customers"])
@@ -87,6 +137,8 @@ app.include_router(warehouses.router, prefix="/api/warehouses", tags=["Warehouse
 app.include_router(suppliers.router, prefix="/api/suppliers", tags=["Suppliers"])
 app.include_router(purchase_orders.router, prefix="/api/purchase-orders", tags=["Purchase Orders"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 
 # Debug: Print registered routes
 print("\n📋 Registered API routes:")
@@ -106,6 +158,20 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/api/metrics")
+async def metrics(current_user: CurrentUser = Depends(require_admin())):  # Только ADMIN
+    """Runtime metrics of worker pools (admin only)."""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        "threadpool": {
+            "size": int(limiter.total_tokens),
+            "in_use": limiter.borrowed_tokens,
+        },
+        "db_pool": get_pool_stats(),
+        "password_hashing": get_password_hash_stats(),
+    }
+
+
 @app.get("/api/routes")
 async def list_routes():
     """List all registered routes (for debugging)."""
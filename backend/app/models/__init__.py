@@ -7,11 +7,15 @@ from app.models.product import Product
 from app.models.category import Category
 from app.models.warehouse import Warehouse
 from app.models.inventory import Inventory
+from app.models.inventory_movement import InventoryMovement
 from app.models.supplier import Supplier
 from app.models.purchase_order import PurchaseOrder
 from app.models.purchase_order_item import PurchaseOrderItem
 from app.models.sales_order import SalesOrder
 from app.models.order_item import OrderItem
+from app.models.search_document import SearchDocument
+from app.models.dashboard_stat import DashboardStat, DashboardStatDelta
+from app.models.document_counter import DocumentCounter
 
 __all__ = [
     "User",
@@ -23,10 +27,15 @@ __all__ = [
     "Category",
     "Warehouse",
     "Inventory",
+    "InventoryMovement",
     "Supplier",
     "PurchaseOrder",
     "PurchaseOrderItem",
     "SalesOrder",
     "OrderItem",
+    "SearchDocument",
+    "DashboardStat",
+    "DashboardStatDelta",
+    "DocumentCounter",
 ]
 
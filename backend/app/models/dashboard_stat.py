@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class DashboardStat(Base):
+    """Dashboard aggregate: one row per metric and key (see app.services.dashboard)."""
+    __tablename__ = "dashboard_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    metric = Column(String(50), nullable=False)  # revenue_by_day, sales_orders_by_status, ...
+    key = Column(String(50), nullable=False, default="")  # Дата, статус или тип сущности
+    count = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (UniqueConstraint('metric', 'key', name='_dashboard_stat_metric_key_uc'),)
+
+
+class DashboardStatDelta(Base):
+    """Pending change to a dashboard aggregate, folded into dashboard_stats (see app.services.dashboard)."""
+    __tablename__ = "dashboard_stat_deltas"
+
+    id = Column(Integer, primary_key=True)
+    metric = Column(String(50), nullable=False)
+    key = Column(String(50), nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
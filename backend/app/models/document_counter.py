@@ -0,0 +1,10 @@
+from sqlalchemy import BigInteger, Column, String
+from app.database import Base
+
+
+class DocumentCounter(Base):
+    """Last issued document number per document type (SQLite; PostgreSQL uses sequences)."""
+    __tablename__ = "document_counters"
+
+    name = Column(String(50), primary_key=True)  # sales_order, purchase_order
+    value = Column(BigInteger, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -20,7 +20,11 @@ class Inventory(Base):
     # Relationships
     product = relationship("Product", back_populates="inventory_items")
     warehouse = relationship("Warehouse", back_populates="inventory_items")
+    movements = relationship("InventoryMovement", back_populates="inventory", passive_deletes=True)
 
-    # Unique constraint
-    __table_args__ = (UniqueConstraint('product_id', 'warehouse_id', name='_product_warehouse_uc'),)
+    # Unique constraint; warehouse index serves keyset pages filtered by warehouse
+    __table_args__ = (
+        UniqueConstraint('product_id', 'warehouse_id', name='_product_warehouse_uc'),
+        Index('ix_inventory_warehouse_id_id', 'warehouse_id', 'id'),
+    )
 
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Numeric, Enum as SQLEnum, DateTime, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+import enum
+from app.database import Base
+
+
+class MovementType(str, enum.Enum):
+    RESERVE = "reserve"
+    RELEASE = "release"
+    SHIP = "ship"
+    RECEIVE = "receive"
+    ADJUST = "adjust"
+
+
+class InventoryMovement(Base):
+    """Append-only ledger of changes to inventory balances."""
+    __tablename__ = "inventory_movements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_id = Column(Integer, ForeignKey("inventory.id", ondelete="CASCADE"), nullable=False)
+    movement_type = Column(SQLEnum(MovementType), nullable=False)
+    quantity_change = Column(Numeric(10, 3), nullable=False, default=0)  # Изменение quantity
+    reserved_change = Column(Numeric(10, 3), nullable=False, default=0)  # Изменение reserved_quantity
+    reference_type = Column(String(30))  # sales_order, purchase_order
+    reference_id = Column(Integer)
+    note = Column(String(255))
+    created_by = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, server_default=func.now())
+
+    # Relationships
+    inventory = relationship("Inventory", back_populates="movements")
+
+    # History of one inventory row is read newest first by id
+    __table_args__ = (Index('ix_inventory_movements_inventory_id_id', 'inventory_id', 'id'),)
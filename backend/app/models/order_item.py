@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Numeric, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Numeric, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -10,6 +10,7 @@ class OrderItem(Base):
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("sales_orders.id", ondelete="CASCADE"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"))  # Склад, на котором зарезервирован товар
     quantity = Column(Numeric(10, 3), nullable=False, default=1)  # Поддержка кв.м (десятичные значения)
     unit_price = Column(Numeric(10, 2), nullable=False)
     discount = Column(Numeric(10, 2), default=0.00)
@@ -21,3 +22,5 @@ class OrderItem(Base):
     order = relationship("SalesOrder", back_populates="items")
     product = relationship("Product", back_populates="order_items")
 
+    # Covers the per-product sales aggregate of inventory reports without reading the table
+    __table_args__ = (Index('ix_order_items_order_id_product_id', 'order_id', 'product_id', 'quantity'),)
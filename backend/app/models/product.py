@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Numeric, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Numeric, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -32,3 +32,11 @@ class Product(Base):
     order_items = relationship("OrderItem", back_populates="product")
     purchase_order_items = relationship("PurchaseOrderItem", back_populates="product")
 
+    # Partial index: low-stock checks only scan products that have a reorder level
+    __table_args__ = (
+        Index(
+            'ix_products_reorder_level', 'reorder_level',
+            postgresql_where=reorder_level > 0,
+            sqlite_where=reorder_level > 0
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Numeric, Date, Enum as SQLEnum, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Numeric, Date, Enum as SQLEnum, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -33,3 +33,5 @@ class PurchaseOrder(Base):
     supplier = relationship("Supplier", back_populates="purchase_orders")
     items = relationship("PurchaseOrderItem", back_populates="purchase_order", cascade="all, delete-orphan")
 
+    # Newest-first list pages
+    __table_args__ = (Index('ix_purchase_orders_created_at_id', 'created_at', 'id'),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Numeric, Date, Enum as SQLEnum, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Numeric, Date, Enum as SQLEnum, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -36,3 +36,9 @@ class SalesOrder(Base):
     customer = relationship("Customer", back_populates="sales_orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    # Sales history by period (inventory turnover reports); newest-first list pages
+    __table_args__ = (
+        Index('ix_sales_orders_order_date_status', 'order_date', 'status'),
+        Index('ix_sales_orders_created_at_id', 'created_at', 'id'),
+    )
+
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class SearchDocument(Base):
+    """Global search index: one row per searchable entity (see app.services.search_index)."""
+    __tablename__ = "search_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String(30), nullable=False)  # customer, product, supplier, lead, sales_order, purchase_order
+    entity_id = Column(Integer, nullable=False)
+    title = Column(String(255), nullable=False)
+    subtitle = Column(String(255))
+    content = Column(Text, nullable=False)  # Все искомые поля через пробел
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (UniqueConstraint('entity_type', 'entity_id', name='_search_document_entity_uc'),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -27,4 +27,5 @@ class Supplier(Base):
     # Relationships
     purchase_orders = relationship("PurchaseOrder", back_populates="supplier")
 
-
+    # List pages ordered by name
+    __table_args__ = (Index('ix_suppliers_name_id', 'name', 'id'),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -33,3 +33,5 @@ class User(Base):
     leads_assigned = relationship("Lead", back_populates="assignee", foreign_keys="Lead.assigned_to")
     opportunities_assigned = relationship("Opportunity", back_populates="assignee", foreign_keys="Opportunity.assigned_to")
 
+    # Newest-first list pages
+    __table_args__ = (Index('ix_users_created_at_id', 'created_at', 'id'),)
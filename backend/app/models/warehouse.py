@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -25,3 +25,5 @@ class Warehouse(Base):
     # Relationships
     inventory_items = relationship("Inventory", back_populates="warehouse")
 
+    # List pages ordered by name
+    __table_args__ = (Index('ix_warehouses_name_id', 'name', 'id'),)
@@ -1,4 +1,4 @@
-from . import auth, customers, products, inventory, orders, leads, upload, warehouses, suppliers, purchase_orders, users
+from . import auth, customers, products, inventory, orders, leads, upload, warehouses, suppliers, purchase_orders, users, search
 
-__all__ = ["auth", "customers", "products", "inventory", "orders", "leads", "upload", "warehouses", "suppliers", "purchase_orders", "users"]
+__all__ = ["auth", "customers", "products", "inventory", "orders", "leads", "upload", "warehouses", "suppliers", "purchase_orders", "users", "search"]
 
@@ -1,28 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Optional
 
 from app.database import get_db
 from app.models.user import User, UserRole
-from app.schemas.auth import Token
+from app.schemas.auth import Token, CurrentUser
 from app.schemas.user import UserCreate, UserResponse
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import verify_password_async, get_password_hash_async, create_access_token
 from app.core.dependencies import get_current_user
 from app.core.permissions import require_admin
+from app.core.user_cache import invalidate_user
 from app.config import settings
 
 router = APIRouter()
 
+# The password endpoints are async: bcrypt is awaited on the hashing pool and
+# only the short DB work below borrows a request thread (run_in_threadpool).
+
+
+def _load_user(db: Session, criterion) -> Optional[User]:
+    """Read a user and give the connection back to the pool.
+
+    The caller awaits bcrypt next, for seconds during a login storm; holding a
+    pooled connection meanwhile would starve other requests. Closing the
+    session leaves the user detached with its columns loaded.
+    """
+    user = db.query(User).filter(criterion).first()
+    db.close()
+    return user
+
+
+def _set_password(db: Session, user_id: int, username: str, hashed_password: str) -> None:
+    db.query(User).filter(User.id == user_id).update({User.password: hashed_password})
+    db.commit()
+    invalidate_user(username)
+
+
+def _add_user(db: Session, user: User) -> User:
+    db.add(user)
+    try:
+        db.commit()
+        db.refresh(user)
+    except Exception:
+        db.rollback()
+        raise
+    return user
+
+
+def _record_login(db: Session, user_id: int) -> None:
+    db.query(User).filter(User.id == user_id).update({User.last_login: datetime.utcnow()})
+    db.commit()
+
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
     try:
         # Check if user already exists
-        existing_user = db.query(User).filter(
-            (User.email == user_data.email) | (User.username == user_data.username)
-        ).first()
+        existing_user = await run_in_threadpool(
+            _load_user, db, (User.email == user_data.email) | (User.username == user_data.username)
+        )
         
         if existing_user:
             raise HTTPException(
@@ -31,7 +71,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         db_user = User(
             username=user_data.username,
             email=user_data.email,
@@ -40,19 +80,11 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             last_name=user_data.last_name,
             role=user_data.role if user_data.role else UserRole.VIEWER
         )
-        db.add(db_user)
-        try:
-            db.commit()
-            db.refresh(db_user)
-        except Exception as commit_error:
-            db.rollback()
-            raise commit_error
-        
-        return db_user
+        return await run_in_threadpool(_add_user, db, db_user)
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка создания пользователя: {str(e)}"
@@ -66,11 +98,11 @@ async def login(
 ):
     """Login and get access token."""
     # Find user by username or email
-    user = db.query(User).filter(
-        (User.username == form_data.username) | (User.email == form_data.username)
-    ).first()
+    user = await run_in_threadpool(
+        _load_user, db, (User.username == form_data.username) | (User.email == form_data.username)
+    )
     
-    if not user or not verify_password(form_data.password, user.password):
+    if not user or not await verify_password_async(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверное имя пользователя или пароль",
@@ -81,14 +113,12 @@ async def login(
         raise HTTPException(status_code=400, detail="Неактивный пользователь")
     
     # Update last login
-    from datetime import datetime
-    user.last_login = datetime.utcnow()
-    db.commit()
+    await run_in_threadpool(_record_login, db, user.id)
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username, "email": user.email, "role": user.role.value},
+        data={"sub": user.username, "uid": user.id, "email": user.email, "role": user.role.value},
         expires_delta=access_token_expires
     )
     
@@ -96,21 +126,37 @@ async def login(
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Get current user information."""
-    return current_user
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден"
+        )
+    return user
 
 
 @router.post("/change-password")
 async def change_password(
     old_password: str = Form(...),
     new_password: str = Form(...),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Change password for the current user."""
+    user = await run_in_threadpool(_load_user, db, User.id == current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден"
+        )
+    
     # Verify old password
-    if not verify_password(old_password, current_user.password):
+    if not await verify_password_async(old_password, user.password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Неверный текущий пароль"
@@ -130,8 +176,8 @@ async def change_password(
         )
     
     # Update password
-    current_user.password = get_password_hash(new_password)
-    db.commit()
+    hashed_password = await get_password_hash_async(new_password)
+    await run_in_threadpool(_set_password, db, user.id, user.username, hashed_password)
     
     return {"message": "Пароль успешно изменен"}
 
@@ -143,9 +189,9 @@ async def forgot_password(
 ):
     """Request password reset for a user."""
     # Find user by username or email
-    user = db.query(User).filter(
-        (User.username == username_or_email) | (User.email == username_or_email)
-    ).first()
+    user = await run_in_threadpool(
+        _load_user, db, (User.username == username_or_email) | (User.email == username_or_email)
+    )
     
     if not user:
         # Don't reveal if user exists for security
@@ -159,8 +205,8 @@ async def forgot_password(
     temp_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
     
     # Update user password
-    user.password = get_password_hash(temp_password)
-    db.commit()
+    hashed_password = await get_password_hash_async(temp_password)
+    await run_in_threadpool(_set_password, db, user.id, user.username, hashed_password)
     
     # In production, you would send this via email
     # For now, return it in the response (only for development)
@@ -176,13 +222,13 @@ async def forgot_password(
 async def reset_user_password(
     user_id: int,
     new_password: str,
-    current_user: User = Depends(require_admin()),  # Только ADMIN
+    current_user: CurrentUser = Depends(require_admin()),  # Только ADMIN
     db: Session = Depends(get_db)
 ):
     """Reset password for a user (admin only)."""
     
     # Find user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_in_threadpool(_load_user, db, User.id == user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -203,8 +249,8 @@ async def reset_user_password(
         )
     
     # Update password
-    user.password = get_password_hash(new_password)
-    db.commit()
+    hashed_password = await get_password_hash_async(new_password)
+    await run_in_threadpool(_set_password, db, user.id, user.username, hashed_password)
     
     return {"message": f"Пароль для пользователя {user.username} успешно сброшен"}
 
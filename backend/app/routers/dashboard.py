@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.services.dashboard import get_dashboard_summary
+from app.core.dependencies import get_current_user
+from app.schemas.auth import CurrentUser
+
+router = APIRouter()
+
+
+@router.get("/summary")
+def get_summary(
+    days: int = Query(30, ge=1, le=366, description="Период выручки по дням"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Dashboard figures: revenue by day, orders and leads by status, inventory value, customer and product counts."""
+    return get_dashboard_summary(db, days=days)
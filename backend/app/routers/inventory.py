@@ -1,23 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
+from decimal import Decimal
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models.inventory import Inventory
 from app.models.product import Product
 from app.models.warehouse import Warehouse
+from app.models.inventory_movement import InventoryMovement, MovementType
+from app.schemas.inventory import InventoryMovement as InventoryMovementSchema
+from app.services.stock import apply_movements
+from app.services.replenishment import available_quantity, find_low_stock
+from app.services.inventory_reports import get_inventory_report
 from app.core.dependencies import get_current_user
+from app.core.responses import dumps, json_response
+from app.schemas.auth import CurrentUser
 from app.core.permissions import require_role, WAREHOUSE_AND_ABOVE, ALL_ROLES
 from app.models.user import User, UserRole
 
 router = APIRouter()
 
+INVENTORY_PAGE_SIZE = 100
+INVENTORY_STREAM_BATCH_SIZE = 500
+
 
 @router.get("/warehouses")
-async def get_all_warehouses(
+def get_all_warehouses(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get all warehouses."""
     warehouses = db.query(Warehouse).filter(Warehouse.is_active == True).all()
@@ -29,28 +42,154 @@ class InventoryAdjust(BaseModel):
     warehouse_id: int
     quantity: float
     type: str  # "add", "subtract", or "set"
-    reserved_quantity: Optional[float] = 0
+    reserved_quantity: Optional[float] = None
+
+
+def _quantity_change(current, adjustment_type: str, adjustment_quantity: float) -> Optional[Decimal]:
+    """Turn an "add"/"subtract"/"set" adjustment into a quantity delta."""
+    current = Decimal(str(current))
+    adjustment_qty = Decimal(str(adjustment_quantity))
+    if adjustment_type == "add":
+        return adjustment_qty
+    if adjustment_type == "subtract":
+        return max(Decimal("0"), current - adjustment_qty) - current
+    if adjustment_type == "set":
+        return adjustment_qty - current
+    return None
+
+
+def _inventory_list_query(
+    db: Session,
+    warehouse_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    low_stock: bool = False,
+    search: Optional[str] = None
+):
+    """Narrow projection of inventory rows with product and warehouse columns, ordered by id."""
+    query = db.query(
+        Inventory.id,
+        Inventory.product_id,
+        Inventory.warehouse_id,
+        Inventory.quantity,
+        Inventory.reserved_quantity,
+        Inventory.location,
+        Inventory.last_updated,
+        Product.name.label("product_name"),
+        Product.sku.label("product_sku"),
+        Product.unit.label("product_unit"),
+        Product.category_id.label("product_category_id"),
+        Product.reorder_level.label("product_reorder_level"),
+        Warehouse.name.label("warehouse_name")
+    ).join(Product, Inventory.product_id == Product.id).join(Warehouse, Inventory.warehouse_id == Warehouse.id)
+
+    if warehouse_id:
+        query = query.filter(Inventory.warehouse_id == warehouse_id)
+
+    if category_id:
+        query = query.filter(Product.category_id == category_id)
+
+    if low_stock:
+        # Same measure as find_low_stock: stock not reserved by orders
+        query = query.filter(Product.reorder_level > 0, func.round(available_quantity(), 3) <= Product.reorder_level)
+
+    if search:
+        query = query.filter(
+            or_(
+                Product.name.ilike(f"%{search}%"),
+                Product.sku.ilike(f"%{search}%")
+            )
+        )
+
+    return query.order_by(Inventory.id)
+
+
+def _inventory_row(row) -> dict:
+    """Shape a projected row like the serialized Inventory object (nested product/warehouse)."""
+    return {
+        "id": row.id,
+        "product_id": row.product_id,
+        "warehouse_id": row.warehouse_id,
+        "quantity": row.quantity,
+        "reserved_quantity": row.reserved_quantity or 0,
+        "location": row.location,
+        "last_updated": row.last_updated,
+        "product": {
+            "id": row.product_id,
+            "name": row.product_name,
+            "sku": row.product_sku,
+            "unit": row.product_unit,
+            "category_id": row.product_category_id,
+            "reorder_level": row.product_reorder_level
+        },
+        "warehouse": {
+            "id": row.warehouse_id,
+            "name": row.warehouse_name
+        }
+    }
+
+
+def _stream_inventory(filters: dict, after_id: Optional[int], limit: Optional[int]):
+    """Yield NDJSON lines straight from a server-side cursor.
+
+    Uses its own session so the connection stays open for the whole response
+    and rows are fetched in batches instead of being loaded up front.
+    """
+    db = SessionLocal()
+    try:
+        query = _inventory_list_query(db, **filters)
+        if after_id:
+            query = query.filter(Inventory.id > after_id)
+        if limit:
+            query = query.limit(limit)
+        rows = query.execution_options(stream_results=True, yield_per=INVENTORY_STREAM_BATCH_SIZE)
+        for row in rows:
+            yield dumps(_inventory_row(row)) + b"\n"
+    finally:
+        db.close()
 
 
 @router.get("/")
-async def get_all_inventory(
+def get_all_inventory(
+    after_id: Optional[int] = Query(None, description="ID последней полученной записи (для следующей страницы)"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Размер страницы (по умолчанию 100)"),
+    warehouse_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    low_stock: bool = False,
+    search: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Get all inventory items with related product and warehouse data."""
-    from sqlalchemy.orm import joinedload
-    inventory = db.query(Inventory).options(
-        joinedload(Inventory.product),
-        joinedload(Inventory.warehouse)
-    ).all()
-    return inventory
+    """Get inventory items with product and warehouse data (keyset pagination by id).
+
+    format=ndjson streams every matching row after after_id, one JSON object per
+    line; there limit is only applied when passed explicitly.
+    """
+    filters = {
+        "warehouse_id": warehouse_id,
+        "category_id": category_id,
+        "low_stock": low_stock,
+        "search": search
+    }
+
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_inventory(filters, after_id, limit),
+            media_type="application/x-ndjson"
+        )
+
+    query = _inventory_list_query(db, **filters)
+    if after_id:
+        query = query.filter(Inventory.id > after_id)
+
+    return json_response([_inventory_row(row) for row in query.limit(limit or INVENTORY_PAGE_SIZE)])
 
 
 @router.get("/warehouse/{warehouse_id}")
-async def get_inventory_by_warehouse(
+def get_inventory_by_warehouse(
     warehouse_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get inventory for a specific warehouse."""
     inventory = db.query(Inventory).filter(Inventory.warehouse_id == warehouse_id).all()
@@ -58,10 +197,10 @@ async def get_inventory_by_warehouse(
 
 
 @router.get("/product/{product_id}")
-async def get_inventory_by_product(
+def get_inventory_by_product(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get inventory for a specific product."""
     inventory = db.query(Inventory).filter(Inventory.product_id == product_id).all()
@@ -78,10 +217,10 @@ class InventoryUpdate(BaseModel):
 
 
 @router.post("/adjust")
-async def adjust_inventory(
+def adjust_inventory(
     adjust_data: InventoryAdjust,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Adjust inventory levels. Only updates existing inventory items.
     New inventory items are created automatically when purchase orders are received."""
@@ -96,22 +235,16 @@ async def adjust_inventory(
             detail="Запись инвентаря не найдена. Товары автоматически добавляются в инвентарь при получении заявок на закупку."
         )
     
+    quantity_change = _quantity_change(inventory.quantity, adjust_data.type, adjust_data.quantity)
+    if quantity_change is None:
+        raise HTTPException(status_code=400, detail="Invalid adjustment type. Use 'add', 'subtract', or 'set'")
+    
     # Update reserved_quantity if provided
+    reserved_change = Decimal("0")
     if adjust_data.reserved_quantity is not None:
-        inventory.reserved_quantity = adjust_data.reserved_quantity
-    
-    from decimal import Decimal
-    if adjust_data.type == "add":
-        inventory.quantity += Decimal(str(adjust_data.quantity))
-    elif adjust_data.type == "subtract":
-        inventory.quantity = max(Decimal("0"), inventory.quantity - Decimal(str(adjust_data.quantity)))
-    elif adjust_data.type == "set":
-        inventory.quantity = Decimal(str(adjust_data.quantity))
-    else:
-        raise HTTPException(status_code=400, detail="Invalid adjustment type. Use 'add', 'subtract', or 'set'")
+        reserved_change = Decimal(str(adjust_data.reserved_quantity)) - Decimal(str(inventory.reserved_quantity or 0))
     
-    from datetime import datetime
-    inventory.last_updated = datetime.utcnow()
+    apply_movements(db, MovementType.ADJUST, {inventory.id: (quantity_change, reserved_change)}, user_id=current_user.id)
     
     db.commit()
     db.refresh(inventory)
@@ -119,11 +252,11 @@ async def adjust_inventory(
 
 
 @router.put("/{inventory_id}")
-async def update_inventory(
+def update_inventory(
     inventory_id: int,
     update_data: InventoryUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Update inventory item."""
     from sqlalchemy.orm import joinedload
@@ -135,53 +268,70 @@ async def update_inventory(
     if not inventory:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
-    from decimal import Decimal
+    quantity_change = Decimal("0")
+    reserved_change = Decimal("0")
     
     if update_data.reserved_quantity is not None:
-        inventory.reserved_quantity = Decimal(str(update_data.reserved_quantity))
+        reserved_change = Decimal(str(update_data.reserved_quantity)) - Decimal(str(inventory.reserved_quantity or 0))
     
     if update_data.adjustment_type and update_data.adjustment_quantity is not None:
-        adjustment_qty = Decimal(str(update_data.adjustment_quantity))
-        if update_data.adjustment_type == "add":
-            inventory.quantity += adjustment_qty
-        elif update_data.adjustment_type == "subtract":
-            inventory.quantity = max(Decimal("0"), inventory.quantity - adjustment_qty)
-        elif update_data.adjustment_type == "set":
-            inventory.quantity = adjustment_qty
+        quantity_change = _quantity_change(
+            inventory.quantity, update_data.adjustment_type, update_data.adjustment_quantity
+        ) or Decimal("0")
     
-    from datetime import datetime
-    inventory.last_updated = datetime.utcnow()
+    apply_movements(db, MovementType.ADJUST, {inventory.id: (quantity_change, reserved_change)}, user_id=current_user.id)
     
     db.commit()
     db.refresh(inventory)
     return inventory
 
 
-@router.get("/low-stock")
-async def get_low_stock_items(
+@router.get("/{inventory_id}/movements", response_model=List[InventoryMovementSchema])
+def get_inventory_movements(
+    inventory_id: int,
+    before_id: Optional[int] = Query(None, description="ID последнего полученного движения (для следующей страницы)"),
+    limit: int = Query(50, ge=1, le=500),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Get all low stock items."""
-    # Get all inventory items with their products
-    inventory_items = db.query(Inventory).join(Product).filter(
-        Product.reorder_level > 0
-    ).all()
+    """Get change history of an inventory item, newest first (keyset pagination by id)."""
+    if not db.query(Inventory.id).filter(Inventory.id == inventory_id).first():
+        raise HTTPException(status_code=404, detail="Inventory item not found")
     
-    low_stock = [
-        item for item in inventory_items
-        if item.quantity <= item.product.reorder_level
-    ]
+    query = db.query(InventoryMovement).filter(InventoryMovement.inventory_id == inventory_id)
+    if before_id:
+        query = query.filter(InventoryMovement.id < before_id)
     
-    return low_stock
+    return query.order_by(InventoryMovement.id.desc()).limit(limit).all()
 
 
-@router.get("/reports")
-async def get_inventory_reports(
+@router.get("/low-stock")
+def get_low_stock_items(
+    warehouse_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Get inventory reports."""
-    # Placeholder for inventory reports
-    return {"message": "Inventory reports endpoint"}
+    """Get products whose available stock (summed across warehouses) is at or below the reorder level."""
+    return find_low_stock(db, warehouse_id=warehouse_id)
 
+
+@router.get("/reorder-suggestions")
+def get_reorder_suggestions(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get active products to reorder, counting open purchase orders as incoming stock."""
+    return find_low_stock(db, include_on_order=True, active_only=True)
+
+
+@router.get("/reports")
+def get_inventory_reports(
+    report: str = Query("summary", pattern="^(summary|valuation|by_warehouse|by_category|turnover)$"),
+    days: int = Query(90, ge=1, le=3650, description="Период продаж для оборачиваемости, дней"),
+    warehouse_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get inventory reports: stock valuation, stock by warehouse and category, turnover and days of cover."""
+    return get_inventory_report(db, report=report, days=days, warehouse_id=warehouse_id, limit=limit)
@@ -1,25 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, load_only
 from typing import List, Optional
 
 from app.database import get_db
 from app.models.lead import Lead, LeadStatus
 from app.models.customer import Customer
 from app.models.opportunity import Opportunity
+from app.services.dashboard import lead_state, record_lead_change
 from app.core.dependencies import get_current_user
+from app.core.pagination import PageParams, paginate
+from app.schemas.auth import CurrentUser
+from app.schemas.lead import Lead as LeadSchema, LeadConversion, LeadCreate, LeadUpdate
 from app.core.permissions import require_role, SALES_AND_ABOVE, ALL_ROLES
 from app.models.user import User, UserRole
 
 router = APIRouter()
 
 
-@router.get("/")
-async def get_all_leads(
-    skip: int = Query(0, ge=0),
+@router.get("/", response_model=List[LeadSchema])
+def get_all_leads(
     limit: int = Query(10, ge=1, le=100),
     status_filter: Optional[str] = None,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get all leads with pagination and filtering."""
     query = db.query(Lead)
@@ -27,15 +31,14 @@ async def get_all_leads(
     if status_filter:
         query = query.filter(Lead.status == status_filter)
     
-    leads = query.offset(skip).limit(limit).all()
-    return leads
+    return paginate(query, page, [(Lead.id, False)], limit)
 
 
-@router.get("/{lead_id}")
-async def get_lead(
+@router.get("/{lead_id}", response_model=LeadSchema)
+def get_lead(
     lead_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get a lead by ID."""
     lead = db.query(Lead).filter(Lead.id == lead_id).first()
@@ -44,38 +47,40 @@ async def get_lead(
     return lead
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_lead(
-    lead_data: dict,
+@router.post("/", response_model=LeadSchema, status_code=status.HTTP_201_CREATED)
+def create_lead(
+    lead_data: LeadCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
+    current_user: CurrentUser = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
 ):
     """Create a new lead."""
-    if "assigned_to" not in lead_data:
-        lead_data["assigned_to"] = current_user.id
+    values = lead_data.model_dump(exclude_none=True)
+    values.setdefault("assigned_to", current_user.id)
     
-    db_lead = Lead(**lead_data)
+    db_lead = Lead(**values)
     db.add(db_lead)
+    record_lead_change(db, None, lead_state(db_lead))
     db.commit()
     db.refresh(db_lead)
     return db_lead
 
 
-@router.put("/{lead_id}")
-async def update_lead(
+@router.put("/{lead_id}", response_model=LeadSchema)
+def update_lead(
     lead_id: int,
-    lead_data: dict,
+    lead_data: LeadUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
+    current_user: CurrentUser = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
 ):
     """Update a lead."""
     lead = db.query(Lead).filter(Lead.id == lead_id).first()
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     
-    for field, value in lead_data.items():
-        if hasattr(lead, field):
-            setattr(lead, field, value)
+    before = lead_state(lead)
+    for field, value in lead_data.model_dump(exclude_unset=True).items():
+        setattr(lead, field, value)
+    record_lead_change(db, before, lead_state(lead))
     
     db.commit()
     db.refresh(lead)
@@ -83,37 +88,41 @@ async def update_lead(
 
 
 @router.delete("/{lead_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_lead(
+def delete_lead(
     lead_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
+    current_user: CurrentUser = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
 ):
     """Delete a lead."""
     lead = db.query(Lead).filter(Lead.id == lead_id).first()
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     
+    record_lead_change(db, lead_state(lead), None)
     db.delete(lead)
     db.commit()
     return None
 
 
-@router.put("/{lead_id}/convert")
-async def convert_lead(
+@router.put("/{lead_id}/convert", response_model=LeadConversion)
+def convert_lead(
     lead_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Convert a lead to an opportunity."""
-    lead = db.query(Lead).filter(Lead.id == lead_id).first()
+    lead = db.query(Lead).options(
+        joinedload(Lead.customer).load_only(Customer.id, Customer.company_name)
+    ).filter(Lead.id == lead_id).first()
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     
     # Update lead status
+    before = lead_state(lead)
     lead.status = LeadStatus.CONVERTED
-    db.commit()
+    record_lead_change(db, before, lead_state(lead))
     
-    # Create opportunity if value exists
+    # Create opportunity if value exists (in the same transaction)
     if lead.estimated_value:
         customer_name = lead.customer.company_name if lead.customer else "Lead"
         opportunity = Opportunity(
@@ -124,7 +133,9 @@ async def convert_lead(
             assigned_to=lead.assigned_to
         )
         db.add(opportunity)
-        db.commit()
+    db.commit()
     
+    # Reload the columns expired by the commit here, not while the response is encoded
+    db.refresh(lead)
     return {"message": "Lead converted successfully", "lead": lead}
 
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, status, Query, UploadFile
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from decimal import Decimal
 
 from app.database import get_db
@@ -10,12 +11,40 @@ from app.models.order_item import OrderItem
 from app.models.customer import Customer
 from app.models.inventory import Inventory
 from app.models.product import Product
+from app.services import numbering, order_import, order_status
+from app.services.stock import reserve_stock
+from app.services.dashboard import record_sales_order_change, sales_order_state
 from app.core.dependencies import get_current_user
+from app.core.pagination import PageParams, paginate
+from app.core.responses import json_response
+from app.schemas.auth import CurrentUser
+from app.schemas.order import SalesOrder as SalesOrderSchema, SalesOrderListEntry
 from app.core.permissions import require_role, SALES_AND_ABOVE, WAREHOUSE_AND_ABOVE, ALL_ROLES
 from app.models.user import User, UserRole
 
 router = APIRouter()
 
+# Columns read for ?view=list
+ORDER_LIST_COLUMNS = (
+    SalesOrder.id, SalesOrder.order_number, SalesOrder.customer_id, SalesOrder.order_date, SalesOrder.status,
+    SalesOrder.subtotal, SalesOrder.tax, SalesOrder.discount, SalesOrder.total, SalesOrder.created_at
+)
+ORDER_LIST_PRODUCT_COLUMNS = (
+    Product.id, Product.sku, Product.name, Product.unit, Product.dimensions, Product.length_mm, Product.width_mm
+)
+
+
+def _order_query(db: Session):
+    """Orders with everything SalesOrderSchema reads loaded up front."""
+    return db.query(SalesOrder).options(
+        joinedload(SalesOrder.customer),
+        selectinload(SalesOrder.items).selectinload(OrderItem.product)
+    )
+
+
+def _load_order(db: Session, order_id: int) -> Optional[SalesOrder]:
+    return _order_query(db).filter(SalesOrder.id == order_id).first()
+
 
 class OrderItemCreate(BaseModel):
     product_id: int
@@ -35,39 +64,44 @@ class OrderCreate(BaseModel):
 
 
 @router.get("/")
-async def get_all_orders(
-    skip: int = Query(0, ge=0),
+def get_all_orders(
     limit: int = Query(10, ge=1, le=100),
     status_filter: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|list)$", description="list - сокращенный ответ для таблицы заказов"),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Get all orders with pagination and filtering."""
-    from sqlalchemy.orm import joinedload
-    query = db.query(SalesOrder).options(
-        joinedload(SalesOrder.customer),
-        joinedload(SalesOrder.items).joinedload(OrderItem.product)
-    )
+    """Get all orders with pagination and filtering.
+
+    Items are loaded with one extra IN query per page instead of a JOIN, so
+    LIMIT applies to orders and rows are not multiplied by their items.
+    """
+    if view == "list":
+        query = db.query(SalesOrder).options(
+            load_only(*ORDER_LIST_COLUMNS),
+            joinedload(SalesOrder.customer).load_only(Customer.id, Customer.company_name),
+            selectinload(SalesOrder.items).selectinload(OrderItem.product).load_only(*ORDER_LIST_PRODUCT_COLUMNS)
+        )
+    else:
+        query = _order_query(db)
     
     if status_filter:
         query = query.filter(SalesOrder.status == status_filter)
     
-    orders = query.order_by(SalesOrder.created_at.desc()).offset(skip).limit(limit).all()
-    return orders
+    orders = paginate(query, page, [(SalesOrder.created_at, True), (SalesOrder.id, True)], limit)
+    schema = SalesOrderListEntry if view == "list" else SalesOrderSchema
+    return json_response([schema.model_validate(order) for order in orders], page.response)
 
 
-@router.get("/{order_id}")
-async def get_order(
+@router.get("/{order_id}", response_model=SalesOrderSchema)
+def get_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get an order by ID with related data."""
-    from sqlalchemy.orm import joinedload
-    order = db.query(SalesOrder).options(
-        joinedload(SalesOrder.customer),
-        joinedload(SalesOrder.items).joinedload(OrderItem.product)
-    ).filter(SalesOrder.id == order_id).first()
+    order = _load_order(db, order_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,17 +110,13 @@ async def get_order(
     return order
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_order(
+@router.post("/", response_model=SalesOrderSchema, status_code=status.HTTP_201_CREATED)
+def create_order(
     order_data: OrderCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
+    current_user: CurrentUser = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
 ):
     """Create a new order and reserve inventory."""
-    # Generate order number
-    import time
-    order_number = f"SO-{int(time.time() * 1000)}"
-    
     # Validate customer exists
     customer = db.query(Customer).filter(Customer.id == order_data.customer_id).first()
     if not customer:
@@ -95,12 +125,12 @@ async def create_order(
             detail="Клиент не найден"
         )
     
-    # Check inventory availability and reserve items
-    warehouse_id = order_data.warehouse_id
-    inventory_updates = []
+    order_number = numbering.next_number(db, numbering.SALES_ORDER)
     
+    # Resolve warehouse for each item (item's warehouse_id or order's warehouse_id)
+    warehouse_id = order_data.warehouse_id
+    stock_lines = []
     for item_data in order_data.items:
-        # Determine warehouse for this item (use item's warehouse_id or order's warehouse_id)
         item_warehouse_id = item_data.warehouse_id or warehouse_id
         
         if not item_warehouse_id:
@@ -108,45 +138,12 @@ async def create_order(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Не указан склад для товара ID {item_data.product_id}"
             )
-        
-        # Check product exists
-        product = db.query(Product).filter(Product.id == item_data.product_id).first()
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Товар с ID {item_data.product_id} не найден"
-            )
-        
-        # Check inventory
-        inventory = db.query(Inventory).filter(
-            Inventory.product_id == item_data.product_id,
-            Inventory.warehouse_id == item_warehouse_id
-        ).first()
-        
-        if not inventory:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Товар '{product.name}' отсутствует на складе ID {item_warehouse_id}"
-            )
-        
-        # Check available quantity (quantity - reserved_quantity)
-        # Convert to Decimal for comparison
-        item_quantity = Decimal(str(item_data.quantity))
-        available = Decimal(str(inventory.quantity)) - Decimal(str(inventory.reserved_quantity))
-        if available < item_quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Недостаточно товара '{product.name}' на складе. Доступно: {available} {product.unit or 'шт'}, требуется: {item_quantity} {product.unit or 'шт'}"
-            )
-        
-        # Reserve inventory (increase reserved_quantity)
-        inventory.reserved_quantity = Decimal(str(inventory.reserved_quantity)) + item_quantity
-        inventory_updates.append((inventory, item_quantity))
+        stock_lines.append((item_data.product_id, item_warehouse_id, item_data.quantity))
     
     # Calculate totals (quantity × unit_price = total for each item)
-    subtotal = sum(Decimal(str(item.unit_price)) * Decimal(str(item.quantity)) for item in order_data.items)
-    tax = subtotal * Decimal("0.1")  # 10% tax
-    total = subtotal + tax - Decimal(str(order_data.discount))
+    subtotal, tax, total = order_import.order_totals(
+        ((item.quantity, item.unit_price) for item in order_data.items), order_data.discount
+    )
     
     # Create order
     db_order = SalesOrder(
@@ -163,133 +160,140 @@ async def create_order(
     )
     db.add(db_order)
     db.flush()  # Get the order ID
+    record_sales_order_change(db, None, sales_order_state(db_order))
     
-    # Create order items
+    # Check availability and reserve all items at once
+    reserve_stock(db, stock_lines, "sales_order", db_order.id, current_user.id)
+    
+    # Create order items in one INSERT
+    order_items = []
     for item_data in order_data.items:
         item_quantity = Decimal(str(item_data.quantity))
         item_unit_price = Decimal(str(item_data.unit_price))
         item_discount = Decimal(str(item_data.discount))
-        item_total = item_unit_price * item_quantity - item_discount
-        order_item = OrderItem(
-            order_id=db_order.id,
-            product_id=item_data.product_id,
-            quantity=item_quantity,
-            unit_price=item_unit_price,
-            discount=item_discount,
-            total=item_total
-        )
-        db.add(order_item)
+        order_items.append({
+            "order_id": db_order.id,
+            "product_id": item_data.product_id,
+            "quantity": item_quantity,
+            "unit_price": item_unit_price,
+            "discount": item_discount,
+            "total": order_import.line_total(item_quantity, item_unit_price, item_discount),
+            "warehouse_id": item_data.warehouse_id or warehouse_id
+        })
+    if order_items:
+        db.execute(insert(OrderItem), order_items)
     
+    order_id = db_order.id
     try:
         db.commit()
-        db.refresh(db_order)
-        return db_order
+        return _load_order(db, order_id)
     except Exception as e:
+        # Rolling back also releases the reservations made above
         db.rollback()
-        # Rollback inventory reservations
-        for inventory, quantity in inventory_updates:
-            reserved_qty = Decimal(str(inventory.reserved_quantity))
-            qty = Decimal(str(quantity))
-            inventory.reserved_quantity = reserved_qty - qty
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка создания заказа: {str(e)}"
         )
 
 
+@router.post("/import")
+def import_orders(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|json|ndjson)$", description="Формат файла, по умолчанию по расширению"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(require_role(SALES_AND_ABOVE))  # ADMIN, MANAGER, SALES
+):
+    """Bulk-create orders from a CSV, JSON or NDJSON feed and reserve their stock.
+
+    Rows that fail validation or cannot be reserved are reported with their
+    row number and do not stop the import.
+    """
+    file_format = format or order_import.detect_format(file.filename, file.content_type)
+    if file_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не удалось определить формат файла, укажите format=csv|json|ndjson"
+        )
+    return order_import.import_orders(db, order_import.read_orders(file.file, file_format), current_user.id)
+
+
 class OrderStatusUpdate(BaseModel):
     status: str
-    warehouse_id: Optional[int] = None  # Склад для отгрузки
+    warehouse_id: Optional[int] = None  # Склад для строк заказа, у которых склад не записан
+
+
+class OrderStatusBatchUpdate(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    status: str
+    warehouse_id: Optional[int] = None  # Склад для строк заказа, у которых склад не записан
+
+
+# HTTP status of a failed single-order change by error code (400 otherwise)
+STATUS_ERROR_CODES = {
+    order_status.NOT_FOUND: status.HTTP_404_NOT_FOUND,
+    order_status.CONFLICT: status.HTTP_409_CONFLICT,
+}
+
+
+def _parse_status(value: str) -> OrderStatus:
+    try:
+        return OrderStatus(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Неверный статус заказа"
+        )
+
+
+@router.post("/status:batch")
+def update_order_statuses(
+    batch: OrderStatusBatchUpdate,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.SALES, UserRole.WAREHOUSE]))  # Все кроме VIEWER (WAREHOUSE для отгрузки)
+):
+    """Change the status of many orders in one transaction.
+
+    Stock of all orders is settled together; orders that cannot be moved are
+    reported in their own result and do not block the others.
+    """
+    new_status = _parse_status(batch.status)
+    results = order_status.change_order_statuses(
+        db, batch.order_ids, new_status, batch.warehouse_id, current_user.id
+    )
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка обновления статусов заказов: {str(e)}"
+        )
+    succeeded = sum(1 for result in results if result["ok"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
 
 
-@router.put("/{order_id}/status")
-async def update_order_status(
+@router.put("/{order_id}/status", response_model=SalesOrderSchema)
+def update_order_status(
     order_id: int,
     status_data: OrderStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.SALES, UserRole.WAREHOUSE]))  # Все кроме VIEWER (WAREHOUSE для отгрузки)
+    current_user: CurrentUser = Depends(require_role([UserRole.ADMIN, UserRole.MANAGER, UserRole.SALES, UserRole.WAREHOUSE]))  # Все кроме VIEWER (WAREHOUSE для отгрузки)
 ):
     """Update order status and manage inventory accordingly."""
-    order = db.query(SalesOrder).filter(SalesOrder.id == order_id).first()
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Заказ не найден"
-        )
-    
-    try:
-        new_status = OrderStatus(status_data.status)
-    except ValueError:
+    new_status = _parse_status(status_data.status)
+    result = order_status.change_order_statuses(
+        db, [order_id], new_status, status_data.warehouse_id, current_user.id
+    )[0]
+    if not result["ok"]:
+        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Неверный статус заказа"
+            status_code=STATUS_ERROR_CODES.get(result["error"], status.HTTP_400_BAD_REQUEST),
+            detail=result["detail"]
         )
     
-    old_status = order.status
-    
-    # Get order items with products
-    order_items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
-    
-    # Handle inventory based on status change
-    warehouse_id = status_data.warehouse_id
-    
-    if new_status == OrderStatus.CANCELLED and old_status != OrderStatus.CANCELLED:
-        # Release reserved inventory when cancelling
-        for item in order_items:
-            # Try to find inventory - check if warehouse_id is provided, otherwise find any inventory for this product
-            if warehouse_id:
-                inventory = db.query(Inventory).filter(
-                    Inventory.product_id == item.product_id,
-                    Inventory.warehouse_id == warehouse_id
-                ).first()
-            else:
-                # Find first available inventory for this product
-                inventory = db.query(Inventory).filter(
-                    Inventory.product_id == item.product_id
-                ).first()
-            
-            if inventory:
-                item_qty = Decimal(str(item.quantity))
-                reserved_qty = Decimal(str(inventory.reserved_quantity))
-                if reserved_qty >= item_qty:
-                    inventory.reserved_quantity = reserved_qty - item_qty
-    
-    elif new_status in [OrderStatus.SHIPPED, OrderStatus.DELIVERED] and old_status not in [OrderStatus.SHIPPED, OrderStatus.DELIVERED]:
-        # Deduct inventory when shipping/delivering
-        for item in order_items:
-            if warehouse_id:
-                inventory = db.query(Inventory).filter(
-                    Inventory.product_id == item.product_id,
-                    Inventory.warehouse_id == warehouse_id
-                ).first()
-            else:
-                # Find first available inventory for this product
-                inventory = db.query(Inventory).filter(
-                    Inventory.product_id == item.product_id
-                ).first()
-            
-            if inventory:
-                item_qty = Decimal(str(item.quantity))
-                reserved_qty = Decimal(str(inventory.reserved_quantity))
-                qty = Decimal(str(inventory.quantity))
-                
-                # Check if enough reserved quantity
-                if reserved_qty < item_qty:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Недостаточно зарезервированного товара для заказа"
-                    )
-                
-                # Deduct from both quantity and reserved_quantity
-                inventory.quantity = qty - item_qty
-                inventory.reserved_quantity = reserved_qty - item_qty
-    
-    order.status = new_status
-    
     try:
         db.commit()
-        db.refresh(order)
-        return order
+        return _load_order(db, order_id)
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -299,16 +303,17 @@ async def update_order_status(
 
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_order(
+def delete_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Delete an order."""
     order = db.query(SalesOrder).filter(SalesOrder.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    record_sales_order_change(db, sales_order_state(order), None)
     db.delete(order)
     db.commit()
     return None
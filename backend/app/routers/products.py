@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from typing import List, Optional
 
 from app.database import get_db
 from app.models.product import Product
 from app.models.category import Category
 from app.schemas.product import Product as ProductSchema, ProductCreate, ProductUpdate
+from app.services.product_search import ranked_product_matches
+from app.services.dashboard import product_state, record_product_change
+from app.services.inventory_reports import clear_inventory_report_cache
 from app.core.dependencies import get_current_user
+from app.core.pagination import PageParams, paginate
+from app.schemas.auth import CurrentUser
 from app.core.permissions import require_role, MANAGER_AND_ADMIN, ALL_ROLES
 from app.models.user import User, UserRole
 
@@ -15,25 +19,24 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[ProductSchema])
-async def get_all_products(
-    skip: int = Query(0, ge=0),
+def get_all_products(
     limit: int = Query(10, ge=1, le=1000),
     search: Optional[str] = None,
     category_id: Optional[int] = None,
     is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get all products with pagination and filtering."""
     query = db.query(Product)
+    sort = [(Product.id, False)]
     
-    if search:
-        query = query.filter(
-            or_(
-                Product.name.ilike(f"%{search}%"),
-                Product.sku.ilike(f"%{search}%")
-            )
-        )
+    if search and search.strip():
+        # Ranked, index-backed search (see app.services.product_search)
+        matches = ranked_product_matches(db, search)
+        query = query.join(matches, matches.c.id == Product.id)
+        sort = [(matches.c.score, True), (Product.id, False)]
     
     if category_id:
         query = query.filter(Product.category_id == category_id)
@@ -41,15 +44,14 @@ async def get_all_products(
     if is_active is not None:
         query = query.filter(Product.is_active == is_active)
     
-    products = query.offset(skip).limit(limit).all()
-    return products
+    return paginate(query, page, sort, limit)
 
 
 @router.get("/{product_id}", response_model=ProductSchema)
-async def get_product(
+def get_product(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get a product by ID."""
     product = db.query(Product).filter(Product.id == product_id).first()
@@ -59,10 +61,10 @@ async def get_product(
 
 
 @router.post("/", response_model=ProductSchema, status_code=status.HTTP_201_CREATED)
-async def create_product(
+def create_product(
     product_data: ProductCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(MANAGER_AND_ADMIN))  # ADMIN, MANAGER
+    current_user: CurrentUser = Depends(require_role(MANAGER_AND_ADMIN))  # ADMIN, MANAGER
 ):
     """Create a new product."""
     # Check if SKU already exists
@@ -77,17 +79,18 @@ async def create_product(
         product_dict['category_id'] = None
     db_product = Product(**product_dict)
     db.add(db_product)
+    record_product_change(db, None, None, product_state(db_product))
     db.commit()
     db.refresh(db_product)
     return db_product
 
 
 @router.put("/{product_id}", response_model=ProductSchema)
-async def update_product(
+def update_product(
     product_id: int,
     product_data: ProductUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(MANAGER_AND_ADMIN))  # ADMIN, MANAGER
+    current_user: CurrentUser = Depends(require_role(MANAGER_AND_ADMIN))  # ADMIN, MANAGER
 ):
     """Update a product."""
     product = db.query(Product).filter(Product.id == product_id).first()
@@ -106,35 +109,40 @@ async def update_product(
         if existing:
             raise HTTPException(status_code=409, detail="Product with this SKU already exists")
     
+    before = product_state(product)
     for field, value in update_data.items():
         setattr(product, field, value)
+    record_product_change(db, product.id, before, product_state(product))
     
     db.commit()
+    clear_inventory_report_cache()
     db.refresh(product)
     return product
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_product(
+def delete_product(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(MANAGER_AND_ADMIN))  # ADMIN, MANAGER
+    current_user: CurrentUser = Depends(require_role(MANAGER_AND_ADMIN))  # ADMIN, MANAGER
 ):
     """Delete a product."""
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    record_product_change(db, product.id, product_state(product), None)
     db.delete(product)
     db.commit()
+    clear_inventory_report_cache()
     return None
 
 
 @router.get("/category/{category_id}", response_model=List[ProductSchema])
-async def get_products_by_category(
+def get_products_by_category(
     category_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get all products in a category."""
     products = db.query(Product).filter(Product.category_id == category_id).all()
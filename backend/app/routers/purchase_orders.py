@@ -1,37 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
 from typing import List, Optional
 from decimal import Decimal
-import time
 
 from app.database import get_db
 from app.models.purchase_order import PurchaseOrder, PurchaseOrderStatus
 from app.models.purchase_order_item import PurchaseOrderItem
 from app.models.supplier import Supplier
 from app.models.product import Product
-from app.models.inventory import Inventory
-from app.schemas.purchase_order import PurchaseOrder as PurchaseOrderSchema, PurchaseOrderCreate, PurchaseOrderUpdate
+from app.services import numbering, receiving
+from app.services.dashboard import purchase_order_state, record_purchase_order_change
+from app.schemas.purchase_order import (
+    PurchaseOrder as PurchaseOrderSchema, PurchaseOrderCreate, PurchaseOrderListEntry, PurchaseOrderUpdate,
+    PurchaseOrderReceipt, PurchaseOrderReceiptLine, PurchaseOrderReceiveBatch
+)
 from app.core.dependencies import get_current_user
+from app.core.pagination import PageParams, paginate
+from app.core.responses import json_response
+from app.schemas.auth import CurrentUser
 from app.core.permissions import require_role, WAREHOUSE_AND_ABOVE, ALL_ROLES
 from app.models.user import User, UserRole
 
 router = APIRouter()
 
+# Columns read for ?view=list
+PURCHASE_ORDER_LIST_COLUMNS = (
+    PurchaseOrder.id, PurchaseOrder.po_number, PurchaseOrder.supplier_id, PurchaseOrder.order_date,
+    PurchaseOrder.expected_date, PurchaseOrder.status, PurchaseOrder.subtotal, PurchaseOrder.tax,
+    PurchaseOrder.total, PurchaseOrder.created_at
+)
+PURCHASE_ORDER_LIST_PRODUCT_COLUMNS = (
+    Product.id, Product.sku, Product.name, Product.unit, Product.dimensions, Product.length_mm, Product.width_mm
+)
 
-@router.get("/", response_model=List[PurchaseOrderSchema])
-async def get_all_purchase_orders(
-    skip: int = Query(0, ge=0),
+
+@router.get("/")
+def get_all_purchase_orders(
     limit: int = Query(100, ge=1, le=1000),
     status_filter: Optional[str] = None,
     supplier_id: Optional[int] = None,
+    view: str = Query("full", pattern="^(full|list)$", description="list - сокращенный ответ для таблицы заявок"),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Get all purchase orders."""
-    query = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.supplier),
-        joinedload(PurchaseOrder.items).joinedload(PurchaseOrderItem.product)
-    )
+    """Get all purchase orders.
+
+    Items are loaded with one extra IN query per page instead of a JOIN, so
+    LIMIT applies to purchase orders and rows are not multiplied by their items.
+    """
+    query = db.query(PurchaseOrder)
+    if view == "list":
+        query = query.options(
+            load_only(*PURCHASE_ORDER_LIST_COLUMNS),
+            joinedload(PurchaseOrder.supplier).load_only(Supplier.id, Supplier.name),
+            selectinload(PurchaseOrder.items).selectinload(PurchaseOrderItem.product).load_only(
+                *PURCHASE_ORDER_LIST_PRODUCT_COLUMNS
+            )
+        )
+    else:
+        query = query.options(
+            joinedload(PurchaseOrder.supplier),
+            selectinload(PurchaseOrder.items).selectinload(PurchaseOrderItem.product)
+        )
     
     if status_filter:
         try:
@@ -43,15 +74,16 @@ async def get_all_purchase_orders(
     if supplier_id:
         query = query.filter(PurchaseOrder.supplier_id == supplier_id)
     
-    orders = query.order_by(PurchaseOrder.created_at.desc()).offset(skip).limit(limit).all()
-    return orders
+    orders = paginate(query, page, [(PurchaseOrder.created_at, True), (PurchaseOrder.id, True)], limit)
+    schema = PurchaseOrderListEntry if view == "list" else PurchaseOrderSchema
+    return json_response([schema.model_validate(order) for order in orders], page.response)
 
 
 @router.get("/{order_id}", response_model=PurchaseOrderSchema)
-async def get_purchase_order(
+def get_purchase_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get a purchase order by ID."""
     order = db.query(PurchaseOrder).options(
@@ -68,15 +100,12 @@ async def get_purchase_order(
 
 
 @router.post("/", response_model=PurchaseOrderSchema, status_code=status.HTTP_201_CREATED)
-async def create_purchase_order(
+def create_purchase_order(
     order_data: PurchaseOrderCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Create a new purchase order."""
-    # Generate PO number
-    po_number = f"PO-{int(time.time() * 1000)}"
-    
     # Validate supplier exists
     supplier = db.query(Supplier).filter(Supplier.id == order_data.supplier_id).first()
     if not supplier:
@@ -85,6 +114,8 @@ async def create_purchase_order(
             detail="Поставщик не найден"
         )
     
+    po_number = numbering.next_number(db, numbering.PURCHASE_ORDER)
+    
     # Validate products and calculate totals
     subtotal = Decimal("0.00")
     items_to_create = []
@@ -125,6 +156,7 @@ async def create_purchase_order(
     )
     db.add(db_order)
     db.flush()  # Get the order ID
+    record_purchase_order_change(db, None, purchase_order_state(db_order))
     
     # Create order items
     for item_data in items_to_create:
@@ -147,11 +179,11 @@ async def create_purchase_order(
 
 
 @router.put("/{order_id}", response_model=PurchaseOrderSchema)
-async def update_purchase_order(
+def update_purchase_order(
     order_id: int,
     order_data: PurchaseOrderUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Update a purchase order."""
     order = db.query(PurchaseOrder).filter(PurchaseOrder.id == order_id).first()
@@ -160,30 +192,19 @@ async def update_purchase_order(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Заявка на закупку не найдена"
         )
+    before = purchase_order_state(order)
     
-    # If status is being changed to RECEIVED, process inventory
+    # If status is being changed to RECEIVED, receive everything still outstanding
     if order_data.status and order_data.status.lower() == "received":
         if order.status != PurchaseOrderStatus.RECEIVED:
-            # Add items to inventory
-            for item in order.items:
-                # Find or create inventory entry
-                inventory = db.query(Inventory).filter(
-                    Inventory.product_id == item.product_id,
-                    Inventory.warehouse_id == 1  # Default warehouse, можно сделать настраиваемым
-                ).first()
-                
-                if not inventory:
-                    inventory = Inventory(
-                        product_id=item.product_id,
-                        warehouse_id=1,
-                        quantity=Decimal("0.00"),
-                        reserved_quantity=Decimal("0.00")
-                    )
-                    db.add(inventory)
-                
-                # Add received quantity to inventory
-                received = item.received_quantity if item.received_quantity > 0 else item.quantity
-                inventory.quantity += received
+            if not order_data.warehouse_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Укажите склад для поступления товара (warehouse_id)"
+                )
+            _receive_one(db, PurchaseOrderReceipt(purchase_order_id=order_id, warehouse_id=order_data.warehouse_id), current_user.id)
+            db.refresh(order)
+            before = purchase_order_state(order)
     
     # Update order fields
     if order_data.supplier_id:
@@ -244,6 +265,7 @@ async def update_purchase_order(
         order.tax = subtotal * Decimal("0.12")
         order.total = order.subtotal + order.tax
     
+    record_purchase_order_change(db, before, purchase_order_state(order))
     db.commit()
     db.refresh(order)
     
@@ -257,10 +279,10 @@ async def update_purchase_order(
 
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_purchase_order(
+def delete_purchase_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Delete a purchase order."""
     order = db.query(PurchaseOrder).filter(PurchaseOrder.id == order_id).first()
@@ -277,71 +299,64 @@ async def delete_purchase_order(
             detail="Нельзя удалить полученную заявку на закупку"
         )
     
+    record_purchase_order_change(db, purchase_order_state(order), None)
     db.delete(order)
     db.commit()
     return None
 
 
-@router.post("/{order_id}/receive", response_model=PurchaseOrderSchema)
-async def receive_purchase_order(
-    order_id: int,
-    warehouse_id: int = Query(1, description="ID склада для поступления товара"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
-):
-    """Mark purchase order as received and add items to inventory."""
-    order = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.items)
-    ).filter(PurchaseOrder.id == order_id).first()
-    
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Заявка на закупку не найдена"
-        )
-    
-    if order.status == PurchaseOrderStatus.RECEIVED:
+# HTTP status of a failed single-order receipt by error code (400 otherwise)
+RECEIPT_ERROR_CODES = {
+    receiving.NOT_FOUND: status.HTTP_404_NOT_FOUND,
+}
+
+
+def _receive_one(db: Session, receipt: PurchaseOrderReceipt, user_id: int) -> None:
+    result = receiving.receive_purchase_orders(db, [receipt], user_id=user_id)[0]
+    if not result["ok"]:
+        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Заявка уже получена"
+            status_code=RECEIPT_ERROR_CODES.get(result["error"], status.HTTP_400_BAD_REQUEST),
+            detail=result["detail"]
         )
-    
-    # Validate warehouse
-    from app.models.warehouse import Warehouse
-    warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
-    if not warehouse:
+
+
+@router.post("/receive:batch")
+def receive_purchase_orders(
+    batch: PurchaseOrderReceiveBatch,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+):
+    """Receive goods for many purchase orders in one transaction.
+
+    Lines may be received partially and split across warehouses; an order
+    becomes received once all of its lines are. Orders that cannot be
+    received are reported in their own result and do not block the others.
+    """
+    results = receiving.receive_purchase_orders(db, batch.receipts, batch.warehouse_id, current_user.id)
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Склад не найден"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка приемки заявок: {str(e)}"
         )
-    
-    # Add items to inventory
-    for item in order.items:
-        # Find or create inventory entry
-        inventory = db.query(Inventory).filter(
-            Inventory.product_id == item.product_id,
-            Inventory.warehouse_id == warehouse_id
-        ).first()
-        
-        if not inventory:
-            inventory = Inventory(
-                product_id=item.product_id,
-                warehouse_id=warehouse_id,
-                quantity=Decimal("0.00"),
-                reserved_quantity=Decimal("0.00")
-            )
-            db.add(inventory)
-        
-        # Add quantity to inventory (use received_quantity if set, otherwise use quantity)
-        received = item.received_quantity if item.received_quantity > 0 else item.quantity
-        inventory.quantity += received
-        item.received_quantity = received
-    
-    # Update order status
-    order.status = PurchaseOrderStatus.RECEIVED
-    
+    succeeded = sum(1 for result in results if result["ok"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+@router.post("/{order_id}/receive", response_model=PurchaseOrderSchema)
+def receive_purchase_order(
+    order_id: int,
+    warehouse_id: int = Query(..., description="ID склада для поступления товара"),
+    receipt: Optional[List[PurchaseOrderReceiptLine]] = Body(None, description="Строки для частичной приемки, без них принимается весь остаток"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+):
+    """Receive goods for a purchase order (everything outstanding or the given lines)."""
+    _receive_one(db, PurchaseOrderReceipt(purchase_order_id=order_id, warehouse_id=warehouse_id, lines=receipt), current_user.id)
     db.commit()
-    db.refresh(order)
     
     # Reload with relationships
     order = db.query(PurchaseOrder).options(
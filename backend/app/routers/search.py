@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.schemas.search import SearchResults
+from app.services.search_index import search
+from app.core.dependencies import get_current_user
+from app.schemas.auth import CurrentUser
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SearchResults)
+def global_search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(5, ge=1, le=50, description="Результатов на каждый тип"),
+    types: Optional[str] = Query(None, description="Типы через запятую: customer,product,supplier,lead,sales_order,purchase_order"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Search customers, products, suppliers, leads and orders in one request."""
+    entity_types = [value.strip() for value in types.split(",") if value.strip()] if types else None
+    return search(db, q, limit=limit, types=entity_types)
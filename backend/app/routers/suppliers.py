@@ -6,6 +6,8 @@ from app.database import get_db
 from app.models.supplier import Supplier
 from app.schemas.supplier import Supplier as SupplierSchema, SupplierCreate, SupplierUpdate
 from app.core.dependencies import get_current_user
+from app.core.pagination import PageParams, paginate
+from app.schemas.auth import CurrentUser
 from app.core.permissions import require_role, WAREHOUSE_AND_ABOVE, ALL_ROLES
 from app.models.user import User, UserRole
 
@@ -13,13 +15,13 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[SupplierSchema])
-async def get_all_suppliers(
-    skip: int = Query(0, ge=0),
+def get_all_suppliers(
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = None,
     is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get all suppliers."""
     query = db.query(Supplier)
@@ -35,15 +37,14 @@ async def get_all_suppliers(
     if is_active is not None:
         query = query.filter(Supplier.is_active == is_active)
     
-    suppliers = query.order_by(Supplier.name).offset(skip).limit(limit).all()
-    return suppliers
+    return paginate(query, page, [(Supplier.name, False), (Supplier.id, False)], limit)
 
 
 @router.get("/{supplier_id}", response_model=SupplierSchema)
-async def get_supplier(
+def get_supplier(
     supplier_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get a supplier by ID."""
     supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
@@ -56,10 +57,10 @@ async def get_supplier(
 
 
 @router.post("/", response_model=SupplierSchema, status_code=status.HTTP_201_CREATED)
-async def create_supplier(
+def create_supplier(
     supplier_data: SupplierCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Create a new supplier."""
     # Check if code already exists
@@ -78,11 +79,11 @@ async def create_supplier(
 
 
 @router.put("/{supplier_id}", response_model=SupplierSchema)
-async def update_supplier(
+def update_supplier(
     supplier_id: int,
     supplier_data: SupplierUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Update a supplier."""
     supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
@@ -111,10 +112,10 @@ async def update_supplier(
 
 
 @router.delete("/{supplier_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_supplier(
+def delete_supplier(
     supplier_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Delete a supplier."""
     supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
@@ -1,77 +1,130 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse
 from sqlalchemy.orm import Session
 import os
-import uuid
-from pathlib import Path
 from typing import Optional
 
 from app.database import get_db
 from app.core.dependencies import get_current_user
+from app.schemas.auth import CurrentUser
 from app.core.permissions import require_role, MANAGER_AND_ADMIN
 from app.models.user import User
+from app.services import product_images
+from app.services.storage import get_storage
 
 router = APIRouter()
 
-# Create uploads directory if it doesn't exist
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-PRODUCT_IMAGES_DIR = UPLOAD_DIR / "products"
-PRODUCT_IMAGES_DIR.mkdir(exist_ok=True)
-
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-
 
 @router.post("/product-image")
 async def upload_product_image(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(MANAGER_AND_ADMIN))  # ADMIN, MANAGER (только те, кто может управлять товарами)
+    current_user: CurrentUser = Depends(require_role(MANAGER_AND_ADMIN))  # ADMIN, MANAGER (только те, кто может управлять товарами)
 ):
-    """Upload a product image."""
-    # Validate file extension
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Неподдерживаемый формат файла. Разрешенные форматы: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-    
-    # Read file content
-    content = await file.read()
-    
-    # Validate file size
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE / 1024 / 1024}MB"
-        )
-    
-    # Generate unique filename
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}{file_ext}"
-    file_path = PRODUCT_IMAGES_DIR / filename
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(content)
+    """Upload a product image; identical images are stored once."""
+    filename = await product_images.save_upload(file)
     
     # Return file URL
     image_url = f"/api/upload/product-image/{filename}"
     return {"image_url": image_url, "filename": filename}
 
 
+def _etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+def _not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+async def _serve(key: str, media_type: Optional[str], etag: Optional[str], cache_control: str,
+                 if_none_match: Optional[str]) -> Optional[Response]:
+    """Response with a stored file, None if it is not stored."""
+    storage = get_storage()
+    path = storage.local_path(key)
+    if path is None:
+        # Object storage: the client downloads the file directly
+        if not await run_in_threadpool(product_images.is_stored, key):
+            return None
+        expires_in = storage.url_expires_in()
+        if expires_in is not None and cache_control == product_images.IMMUTABLE_CACHE_CONTROL:
+            # The link in the redirect expires, the file behind it does not
+            cache_control = f"public, max-age={expires_in // 2}"
+        headers = {"Cache-Control": cache_control}
+        if etag:
+            headers["ETag"] = etag
+        return RedirectResponse(storage.url(key), status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers=headers)
+
+    # One stat() serves as the existence check and for the response headers;
+    # FileResponse answers Range / If-Range requests itself
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    headers = {"Cache-Control": cache_control}
+    if etag:
+        headers["ETag"] = etag
+    response = FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
+    # Without an ETag of our own (legacy uploads) FileResponse derives one from mtime and size
+    if _etag_matches(if_none_match, response.headers.get("etag")):
+        return _not_modified(response.headers["etag"], cache_control)
+    return response
+
+
 @router.get("/product-image/{filename}")
-async def get_product_image(filename: str):
-    """Get a product image by filename."""
-    file_path = PRODUCT_IMAGES_DIR / filename
-    
-    if not file_path.exists():
+async def get_product_image(
+    filename: str,
+    size: Optional[str] = Query(None, pattern="^(grid|detail|retina)$", description="Уменьшенная копия в WebP, без параметра - оригинал"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get a product image by filename, optionally as a WebP thumbnail.
+
+    Content-addressed files never change: they are cached as immutable and
+    revalidated by ETag without touching the storage. With object storage
+    the response redirects to the file in the storage.
+    """
+    key = product_images.original_key(filename)
+    if key is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Изображение не найдено"
         )
     
-    return FileResponse(file_path)
-
+    immutable = product_images.is_content_addressed(filename)
+    if immutable:
+        etag = product_images.image_etag(filename, size)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag, product_images.IMMUTABLE_CACHE_CONTROL)
+    
+    if size:
+        response = await _serve(
+            product_images.variant_key(filename, size), "image/webp",
+            product_images.image_etag(filename, size) if immutable else None,
+            product_images.IMMUTABLE_CACHE_CONTROL if immutable else product_images.REVALIDATE_CACHE_CONTROL,
+            if_none_match
+        )
+        if response is not None:
+            return response
+        # Not built yet (upload in progress or uploaded before variants existed):
+        # serve the original, which must not be cached under this URL for long
+        cache_control = product_images.REVALIDATE_CACHE_CONTROL
+    else:
+        cache_control = product_images.IMMUTABLE_CACHE_CONTROL if immutable else product_images.REVALIDATE_CACHE_CONTROL
+    
+    response = await _serve(
+        key, None, product_images.image_etag(filename) if immutable else None, cache_control, if_none_match
+    )
+    if response is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Изображение не найдено"
+        )
+    if size:
+        # Only once the original is known to exist, so unknown names cannot queue work
+        product_images.schedule_variants(filename)
+    return response
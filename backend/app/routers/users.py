@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -6,21 +7,24 @@ from app.database import get_db
 from app.models.user import User, UserRole
 from app.schemas.user import User as UserSchema, UserCreate, UserResponse, UserUpdate
 from app.core.dependencies import get_current_user
+from app.core.pagination import PageParams, paginate
+from app.schemas.auth import CurrentUser
 from app.core.permissions import require_admin
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
+from app.core.user_cache import invalidate_user
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UserResponse])
-async def get_all_users(
-    skip: int = Query(0, ge=0),
+def get_all_users(
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = None,
     role_filter: Optional[str] = None,
     is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin())  # Только ADMIN
+    current_user: CurrentUser = Depends(require_admin())  # Только ADMIN
 ):
     """Get all users (admin only)."""
     query = db.query(User)
@@ -44,15 +48,14 @@ async def get_all_users(
     if is_active is not None:
         query = query.filter(User.is_active == is_active)
     
-    users = query.order_by(User.created_at.desc()).offset(skip).limit(limit).all()
-    return users
+    return paginate(query, page, [(User.created_at, True), (User.id, True)], limit)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(
+def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin())  # Только ADMIN
+    current_user: CurrentUser = Depends(require_admin())  # Только ADMIN
 ):
     """Get a user by ID (admin only)."""
     user = db.query(User).filter(User.id == user_id).first()
@@ -64,17 +67,28 @@ async def get_user(
     return user
 
 
+def _find_existing_user(db: Session, user_data: UserCreate) -> Optional[User]:
+    """Look up a clashing user and return the connection to the pool before hashing."""
+    user = db.query(User).filter(
+        (User.email == user_data.email) | (User.username == user_data.username)
+    ).first()
+    db.close()
+    return user
+
+
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin())  # Только ADMIN
+    current_user: CurrentUser = Depends(require_admin())  # Только ADMIN
 ):
-    """Create a new user (admin only)."""
+    """Create a new user (admin only).
+
+    Async so the bcrypt hash is awaited on the hashing pool; the DB work runs
+    on the request threadpool.
+    """
     # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    existing_user = await run_in_threadpool(_find_existing_user, db, user_data)
     
     if existing_user:
         raise HTTPException(
@@ -96,7 +110,7 @@ async def create_user(
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -105,6 +119,10 @@ async def create_user(
         last_name=user_data.last_name,
         role=user_data.role if user_data.role else UserRole.VIEWER
     )
+    return await run_in_threadpool(_insert_user, db, db_user)
+
+
+def _insert_user(db: Session, db_user: User) -> User:
     db.add(db_user)
     
     try:
@@ -125,9 +143,36 @@ async def update_user(
     user_id: int,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin())  # Только ADMIN
+    current_user: CurrentUser = Depends(require_admin())  # Только ADMIN
 ):
-    """Update a user (admin only)."""
+    """Update a user (admin only).
+
+    A new password is validated and hashed on the hashing pool first; the
+    rest of the update runs on the request threadpool.
+    """
+    hashed_password = None
+    if user_data.password:
+        if len(user_data.password) > 72:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Пароль не должен превышать 72 символа"
+            )
+        if len(user_data.password) < 6:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Пароль должен содержать минимум 6 символов"
+            )
+        hashed_password = await get_password_hash_async(user_data.password)
+    return await run_in_threadpool(_apply_user_update, db, user_id, user_data, hashed_password, current_user)
+
+
+def _apply_user_update(
+    db: Session,
+    user_id: int,
+    user_data: UserUpdate,
+    hashed_password: Optional[str],
+    current_user: CurrentUser
+) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -163,21 +208,10 @@ async def update_user(
     # Update fields
     update_data = user_data.model_dump(exclude_unset=True)
     
-    # Handle password update separately
-    if "password" in update_data:
-        password = update_data.pop("password")
-        if password:
-            if len(password) > 72:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Пароль не должен превышать 72 символа"
-                )
-            if len(password) < 6:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Пароль должен содержать минимум 6 символов"
-                )
-            user.password = get_password_hash(password)
+    # Handle password update separately (hashed by update_user)
+    update_data.pop("password", None)
+    if hashed_password:
+        user.password = hashed_password
     
     # Handle role update
     if "role" in update_data and update_data["role"]:
@@ -190,12 +224,14 @@ async def update_user(
                     detail=f"Неверная роль: {update_data['role']}"
                 )
     
+    old_username = user.username
     for field, value in update_data.items():
         setattr(user, field, value)
     
     try:
         db.commit()
         db.refresh(user)
+        invalidate_user(old_username, user.username)
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -207,10 +243,10 @@ async def update_user(
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(
+def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin())  # Только ADMIN
+    current_user: CurrentUser = Depends(require_admin())  # Только ADMIN
 ):
     """Delete a user (admin only)."""
     user = db.query(User).filter(User.id == user_id).first()
@@ -227,7 +263,9 @@ async def delete_user(
             detail="Нельзя удалить свой собственный аккаунт"
         )
     
+    username = user.username
     db.delete(user)
     db.commit()
+    invalidate_user(username)
     return None
 
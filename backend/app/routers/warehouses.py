@@ -8,6 +8,8 @@ from app.models.warehouse import Warehouse
 from app.models.inventory import Inventory
 from app.schemas.warehouse import Warehouse as WarehouseSchema, WarehouseCreate, WarehouseUpdate
 from app.core.dependencies import get_current_user
+from app.core.pagination import PageParams, paginate
+from app.schemas.auth import CurrentUser
 from app.core.permissions import require_role, WAREHOUSE_AND_ABOVE, ALL_ROLES
 from app.models.user import User, UserRole
 
@@ -15,13 +17,13 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[WarehouseSchema])
-async def get_all_warehouses(
-    skip: int = Query(0, ge=0),
+def get_all_warehouses(
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = None,
     is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get all warehouses with pagination and filtering."""
     query = db.query(Warehouse)
@@ -38,15 +40,14 @@ async def get_all_warehouses(
     if is_active is not None:
         query = query.filter(Warehouse.is_active == is_active)
     
-    warehouses = query.order_by(Warehouse.name).offset(skip).limit(limit).all()
-    return warehouses
+    return paginate(query, page, [(Warehouse.name, False), (Warehouse.id, False)], limit)
 
 
 @router.get("/{warehouse_id}", response_model=WarehouseSchema)
-async def get_warehouse(
+def get_warehouse(
     warehouse_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get warehouse by ID."""
     warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
@@ -59,10 +60,10 @@ async def get_warehouse(
 
 
 @router.post("/", response_model=WarehouseSchema, status_code=status.HTTP_201_CREATED)
-async def create_warehouse(
+def create_warehouse(
     warehouse_data: WarehouseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Create a new warehouse."""
     # Check if warehouse with same code already exists
@@ -93,11 +94,11 @@ async def create_warehouse(
 
 
 @router.put("/{warehouse_id}", response_model=WarehouseSchema)
-async def update_warehouse(
+def update_warehouse(
     warehouse_id: int,
     warehouse_data: WarehouseUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Update warehouse."""
     warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
@@ -137,10 +138,10 @@ async def update_warehouse(
 
 
 @router.delete("/{warehouse_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_warehouse(
+def delete_warehouse(
     warehouse_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
+    current_user: CurrentUser = Depends(require_role(WAREHOUSE_AND_ABOVE))  # ADMIN, MANAGER, WAREHOUSE
 ):
     """Delete warehouse."""
     warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
@@ -1,7 +1,7 @@
 from app.schemas.user import User, UserCreate, UserResponse
 from app.schemas.customer import Customer, CustomerCreate, CustomerUpdate
 from app.schemas.product import Product, ProductCreate, ProductUpdate
-from app.schemas.auth import Token, TokenData
+from app.schemas.auth import Token, TokenData, CurrentUser
 
 __all__ = [
     "User",
@@ -15,4 +15,5 @@ __all__ = [
     "ProductUpdate",
     "Token",
     "TokenData",
+    "CurrentUser",
 ]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from app.models.user import UserRole
 
 
 class Token(BaseModel):
@@ -10,3 +11,10 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
 
+
+class CurrentUser(BaseModel):
+    """Authenticated user principal returned by get_current_user."""
+    id: int
+    username: str
+    role: UserRole
+    is_active: bool = True
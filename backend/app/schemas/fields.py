@@ -0,0 +1,9 @@
+from decimal import Decimal
+from typing import Annotated
+
+from pydantic import PlainSerializer
+
+# Money and quantity columns, sent as JSON numbers. Responses rendered by
+# app.core.responses keep the Decimal and its exact digits; pydantic's own JSON
+# output (routes with response_model) has no exact number form and uses float.
+DecimalNumber = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from app.models.inventory_movement import MovementType
+from app.schemas.fields import DecimalNumber
+
+
+class InventoryMovement(BaseModel):
+    id: int
+    inventory_id: int
+    movement_type: MovementType
+    quantity_change: DecimalNumber
+    reserved_change: DecimalNumber
+    reference_type: Optional[str] = None
+    reference_id: Optional[int] = None
+    note: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,61 @@
+from pydantic import BaseModel, field_validator
+from typing import Optional
+from datetime import datetime
+
+from app.models.lead import LeadPriority, LeadStatus
+from app.schemas.fields import DecimalNumber
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+class LeadBase(BaseModel):
+    customer_id: Optional[int] = None
+    source: Optional[str] = None
+    status: Optional[LeadStatus] = LeadStatus.NEW
+    priority: Optional[LeadPriority] = LeadPriority.MEDIUM
+    estimated_value: Optional[DecimalNumber] = None
+    notes: Optional[str] = None
+    assigned_to: Optional[int] = None
+
+    @field_validator('status', 'priority', mode='before')
+    @classmethod
+    def validate_enum(cls, v):
+        """Accept status and priority in any case."""
+        return _lower(v)
+
+
+class LeadCreate(LeadBase):
+    pass
+
+
+class LeadUpdate(BaseModel):
+    customer_id: Optional[int] = None
+    source: Optional[str] = None
+    status: Optional[LeadStatus] = None
+    priority: Optional[LeadPriority] = None
+    estimated_value: Optional[DecimalNumber] = None
+    notes: Optional[str] = None
+    assigned_to: Optional[int] = None
+
+    @field_validator('status', 'priority', mode='before')
+    @classmethod
+    def validate_enum(cls, v):
+        """Accept status and priority in any case."""
+        return _lower(v)
+
+
+class Lead(LeadBase):
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LeadConversion(BaseModel):
+    """Result of PUT /api/leads/{id}/convert."""
+    message: str
+    lead: Lead
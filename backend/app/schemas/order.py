@@ -0,0 +1,116 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.schemas.customer import Customer as CustomerSchema
+from app.schemas.fields import DecimalNumber
+from app.schemas.product import Product as ProductSchema, ProductBrief
+
+
+class OrderItem(BaseModel):
+    id: int
+    order_id: int
+    product_id: int
+    warehouse_id: Optional[int] = None
+    quantity: DecimalNumber  # В кв.м
+    unit_price: DecimalNumber
+    discount: Optional[DecimalNumber] = None
+    total: DecimalNumber
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    product: Optional[ProductSchema] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SalesOrder(BaseModel):
+    """Sales order with its customer and item lines (product included)."""
+    id: int
+    order_number: str
+    customer_id: int
+    order_date: date
+    status: str
+    subtotal: DecimalNumber
+    tax: DecimalNumber
+    discount: Optional[DecimalNumber] = None
+    total: DecimalNumber
+    shipping_address: Optional[str] = None
+    notes: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+    customer: Optional[CustomerSchema] = None
+    items: List[OrderItem] = []
+
+    class Config:
+        from_attributes = True
+
+
+class CustomerBrief(BaseModel):
+    id: int
+    company_name: str
+
+    class Config:
+        from_attributes = True
+
+
+class OrderItemListEntry(BaseModel):
+    id: int
+    product_id: int
+    quantity: DecimalNumber  # В кв.м
+    unit_price: DecimalNumber
+    discount: Optional[DecimalNumber] = None
+    total: DecimalNumber
+    product: Optional[ProductBrief] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SalesOrderListEntry(BaseModel):
+    """Sales order as shown in the orders list (GET /api/orders?view=list)."""
+    id: int
+    order_number: str
+    customer_id: int
+    order_date: date
+    status: str
+    subtotal: DecimalNumber
+    tax: DecimalNumber
+    discount: Optional[DecimalNumber] = None
+    total: DecimalNumber
+    created_at: datetime
+    customer: Optional[CustomerBrief] = None
+    items: List[OrderItemListEntry] = []
+
+    class Config:
+        from_attributes = True
+
+
+class ImportOrderItem(BaseModel):
+    """Order line of a bulk import: the product by id or by SKU."""
+    product_id: Optional[int] = None
+    sku: Optional[str] = None
+    quantity: Decimal = Field(..., gt=0)  # Поддержка кв.м
+    unit_price: Decimal = Field(..., ge=0)
+    discount: Decimal = Decimal("0.00")
+    warehouse_id: Optional[int] = None  # Склад строки, иначе склад заказа
+
+    @model_validator(mode="after")
+    def check_product(self):
+        if self.product_id is None and not self.sku:
+            raise ValueError("product_id или sku обязателен")
+        return self
+
+
+class ImportOrder(BaseModel):
+    """Sales order of a bulk import (POST /api/orders/import)."""
+    order_ref: Optional[str] = None  # Номер заказа во внешней системе
+    customer_id: int
+    items: List[ImportOrderItem] = Field(..., min_length=1)
+    order_date: Optional[date] = None
+    warehouse_id: Optional[int] = None
+    shipping_address: Optional[str] = None
+    notes: Optional[str] = None
+    discount: Decimal = Decimal("0.00")
@@ -1,18 +1,20 @@
-from pydantic import BaseModel, field_serializer
-from typing import Optional, Union
+from pydantic import BaseModel
+from typing import Optional
 from datetime import datetime
 from decimal import Decimal
 
+from app.schemas.fields import DecimalNumber
+
 
 class ProductBase(BaseModel):
     sku: str
     name: str
     description: Optional[str] = None
     category_id: Optional[int] = None
-    price: Union[Decimal, float]
-    cost: Optional[Union[Decimal, float]] = 0.00
+    price: DecimalNumber
+    cost: Optional[DecimalNumber] = Decimal("0.00")
     unit: Optional[str] = "piece"
-    weight: Optional[Union[Decimal, float]] = None
+    weight: Optional[DecimalNumber] = None
     dimensions: Optional[str] = None
     length_mm: Optional[int] = None  # Длина плитки в миллиметрах
     width_mm: Optional[int] = None  # Ширина плитки в миллиметрах
@@ -20,15 +22,6 @@ class ProductBase(BaseModel):
     is_active: Optional[bool] = True
     reorder_level: Optional[int] = 0
     reorder_quantity: Optional[int] = 0
-    
-    @field_serializer('price', 'cost', 'weight')
-    def serialize_decimal(self, value: Optional[Union[Decimal, float]], _info):
-        """Convert Decimal to float for JSON serialization."""
-        if value is None:
-            return None
-        if isinstance(value, Decimal):
-            return float(value)
-        return value
 
 
 class ProductCreate(ProductBase):
@@ -61,3 +54,17 @@ class Product(ProductBase):
     class Config:
         from_attributes = True
 
+
+
+class ProductBrief(BaseModel):
+    """Product columns shown in order lists."""
+    id: int
+    sku: str
+    name: str
+    unit: Optional[str] = None
+    dimensions: Optional[str] = None
+    length_mm: Optional[int] = None
+    width_mm: Optional[int] = None
+
+    class Config:
+        from_attributes = True
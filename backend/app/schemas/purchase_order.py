@@ -1,18 +1,20 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import date, datetime
 from decimal import Decimal
 
+from app.schemas.fields import DecimalNumber
+
 
 # Import nested schemas
-from app.schemas.product import Product as ProductSchema
+from app.schemas.product import Product as ProductSchema, ProductBrief
 from app.schemas.supplier import Supplier as SupplierSchema
 
 
 class PurchaseOrderItemBase(BaseModel):
     product_id: int
-    quantity: Decimal  # В кв.м
-    unit_price: Decimal
+    quantity: DecimalNumber  # В кв.м
+    unit_price: DecimalNumber
 
 
 class PurchaseOrderItemCreate(PurchaseOrderItemBase):
@@ -22,8 +24,8 @@ class PurchaseOrderItemCreate(PurchaseOrderItemBase):
 class PurchaseOrderItem(PurchaseOrderItemBase):
     id: int
     purchase_order_id: int
-    total: Decimal
-    received_quantity: Decimal
+    total: DecimalNumber
+    received_quantity: DecimalNumber
     created_at: datetime
     updated_at: datetime
     product: Optional[ProductSchema] = None
@@ -49,6 +51,7 @@ class PurchaseOrderUpdate(BaseModel):
     status: Optional[str] = None
     notes: Optional[str] = None
     items: Optional[List[PurchaseOrderItemCreate]] = None
+    warehouse_id: Optional[int] = None  # Склад поступления при переводе в статус received
 
 
 class PurchaseOrder(PurchaseOrderBase):
@@ -56,9 +59,9 @@ class PurchaseOrder(PurchaseOrderBase):
     po_number: str
     order_date: date
     status: str
-    subtotal: Decimal
-    tax: Decimal
-    total: Decimal
+    subtotal: DecimalNumber
+    tax: DecimalNumber
+    total: DecimalNumber
     created_by: Optional[int] = None
     created_at: datetime
     updated_at: datetime
@@ -69,3 +72,63 @@ class PurchaseOrder(PurchaseOrderBase):
         from_attributes = True
 
 
+
+
+class SupplierBrief(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
+
+class PurchaseOrderItemListEntry(BaseModel):
+    id: int
+    product_id: int
+    quantity: DecimalNumber  # В кв.м
+    unit_price: DecimalNumber
+    total: DecimalNumber
+    received_quantity: DecimalNumber
+    product: Optional[ProductBrief] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PurchaseOrderListEntry(BaseModel):
+    """Purchase order as shown in the purchase orders list (GET /api/purchase-orders?view=list)."""
+    id: int
+    po_number: str
+    supplier_id: int
+    order_date: date
+    expected_date: Optional[date] = None
+    status: str
+    subtotal: DecimalNumber
+    tax: DecimalNumber
+    total: DecimalNumber
+    created_at: datetime
+    supplier: Optional[SupplierBrief] = None
+    items: List[PurchaseOrderItemListEntry] = []
+
+    class Config:
+        from_attributes = True
+
+
+class PurchaseOrderReceiptLine(BaseModel):
+    """Received quantity of a purchase order line: the line by id or by product."""
+    item_id: Optional[int] = None
+    product_id: Optional[int] = None
+    quantity: Decimal = Field(..., gt=0)  # В кв.м
+    warehouse_id: Optional[int] = None  # Склад строки, иначе склад приемки
+
+
+class PurchaseOrderReceipt(BaseModel):
+    """Receipt of one purchase order; without lines everything outstanding is received."""
+    purchase_order_id: int
+    warehouse_id: Optional[int] = None
+    lines: Optional[List[PurchaseOrderReceiptLine]] = None
+
+
+class PurchaseOrderReceiveBatch(BaseModel):
+    receipts: List[PurchaseOrderReceipt] = Field(..., min_length=1, max_length=500)
+    warehouse_id: Optional[int] = None  # Склад для приемок без своего склада
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class SearchHit(BaseModel):
+    type: str  # customer, product, supplier, lead, sales_order, purchase_order
+    id: int
+    title: str
+    subtitle: Optional[str] = None
+    score: float
+
+
+class SearchResults(BaseModel):
+    query: str
+    counts: Dict[str, int]  # Всего совпадений по каждому типу
+    hits: List[SearchHit]
@@ -0,0 +1,352 @@
+"""
+Показатели панели управления.
+
+Агрегаты хранятся в dashboard_stats: одна строка на пару (показатель, ключ)
+со счетчиком и суммой. Операции записи заказов, заявок на закупку, движений
+остатков, лидов, клиентов и товаров не обновляют эти строки сами, а
+добавляют приращения в dashboard_stat_deltas в той же транзакции, что и само
+изменение: обычный INSERT не блокирует общие строки (стоимость склада,
+выручка за день), поэтому параллельные записи не ждут друг друга и не
+взаимоблокируются, а откат транзакции откатывает и приращения.
+
+Накопленные приращения раз в DASHBOARD_FOLD_INTERVAL_SECONDS переносятся в
+dashboard_stats (fold_dashboard_deltas); панель управления читает агрегаты
+вместе с еще не перенесенными приращениями, поэтому показатели не отстают.
+
+После изменений в обход приложения агрегаты пересчитываются из исходных
+таблиц командой rebuild_dashboard_stats.py.
+"""
+import enum
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.customer import Customer
+from app.models.dashboard_stat import DashboardStat, DashboardStatDelta
+from app.models.inventory import Inventory
+from app.models.lead import Lead, LeadStatus
+from app.models.product import Product
+from app.models.purchase_order import PurchaseOrder, PurchaseOrderStatus
+from app.models.sales_order import OrderStatus, SalesOrder
+
+# Metrics (key in brackets)
+REVENUE_BY_DAY = "revenue_by_day"  # [order date] orders and total of non-cancelled sales orders
+SALES_ORDERS_BY_STATUS = "sales_orders_by_status"  # [status] orders and total
+PURCHASE_ORDERS_BY_STATUS = "purchase_orders_by_status"  # [status] orders and total
+LEADS_BY_STATUS = "leads_by_status"  # [status] leads and estimated value
+INVENTORY_VALUE = "inventory_value"  # [""] stock on hand valued at Product.cost
+ENTITY_COUNT = "entity_count"  # [customers, products] number of rows
+
+OPEN_ORDER_STATUSES = (OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.PROCESSING)
+OPEN_PURCHASE_ORDER_STATUSES = (PurchaseOrderStatus.PENDING, PurchaseOrderStatus.ORDERED)
+OPEN_LEAD_STATUSES = (LeadStatus.NEW, LeadStatus.CONTACTED, LeadStatus.QUALIFIED)
+
+# (metric, key, count change, amount change)
+Delta = Tuple[str, str, int, Decimal]
+
+
+def _key(value) -> str:
+    if isinstance(value, enum.Enum):
+        return str(value.value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value) if value is not None else ""
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _upsert(db: Session):
+    return postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+
+def _merge(deltas: Iterable[Delta]) -> Dict[Tuple[str, str], List]:
+    merged: Dict[Tuple[str, str], List] = {}
+    for metric, key, count, amount in deltas:
+        entry = merged.setdefault((metric, key), [0, Decimal("0")])
+        entry[0] += count
+        entry[1] += _decimal(amount)
+    return merged
+
+
+def apply_deltas(db: Session, deltas: Iterable[Delta]) -> None:
+    """Record changes to the aggregates in the current transaction (appended, no row locks)."""
+    rows = [
+        {"metric": metric, "key": key, "count": count, "amount": amount}
+        for (metric, key), (count, amount) in _merge(deltas).items()
+        if count or amount
+    ]
+    if rows:
+        db.execute(insert(DashboardStatDelta), rows)
+
+
+def fold_dashboard_deltas(engine: Engine) -> int:
+    """Move the committed deltas into dashboard_stats. Returns the number of deltas folded.
+
+    Deltas of transactions still in progress are not visible to the DELETE and
+    stay for the next run; concurrent runs never fold the same delta twice.
+    """
+    with Session(bind=engine) as db:
+        folded = db.execute(
+            delete(DashboardStatDelta).returning(
+                DashboardStatDelta.metric, DashboardStatDelta.key,
+                DashboardStatDelta.count, DashboardStatDelta.amount
+            )
+        ).all()
+        # Sorted, so concurrent runs lock the aggregate rows in the same order
+        rows = [
+            {"metric": metric, "key": key, "count": count, "amount": amount}
+            for (metric, key), (count, amount) in sorted(_merge(folded).items())
+            if count or amount
+        ]
+        if rows:
+            statement = _upsert(db)(DashboardStat).values(rows)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[DashboardStat.metric, DashboardStat.key],
+                set_={
+                    "count": DashboardStat.count + statement.excluded["count"],
+                    # SQLite stores Numeric as floating point; no-op on PostgreSQL
+                    "amount": func.round(DashboardStat.amount + statement.excluded.amount, 2),
+                    "updated_at": func.now(),
+                }
+            ))
+        db.commit()
+    return len(folded)
+
+
+def _state_deltas(before: Optional[Tuple], after: Optional[Tuple], build) -> List[Delta]:
+    deltas: List[Delta] = []
+    if before is not None:
+        deltas += [(metric, key, -count, -amount) for metric, key, count, amount in build(*before)]
+    if after is not None:
+        deltas += build(*after)
+    return deltas
+
+
+def sales_order_state(order: SalesOrder) -> Tuple:
+    return order.status, order.order_date, _decimal(order.total)
+
+
+def _sales_order_deltas(order_status, order_date, total) -> List[Delta]:
+    deltas = [(SALES_ORDERS_BY_STATUS, _key(order_status), 1, total)]
+    if _key(order_status) != OrderStatus.CANCELLED.value:
+        deltas.append((REVENUE_BY_DAY, _key(order_date), 1, total))
+    return deltas
+
+
+def record_sales_order_change(db: Session, before: Optional[Tuple], after: Optional[Tuple]) -> None:
+    """Update aggregates for a sales order state change (None = did not exist / deleted)."""
+    record_sales_order_changes(db, [(before, after)])
+
+
+def record_sales_order_changes(db: Session, changes: Iterable[Tuple[Optional[Tuple], Optional[Tuple]]]) -> None:
+    """Update aggregates for several (before, after) sales order state changes in one statement."""
+    deltas: List[Delta] = []
+    for before, after in changes:
+        deltas += _state_deltas(before, after, _sales_order_deltas)
+    apply_deltas(db, deltas)
+
+
+def purchase_order_state(order: PurchaseOrder) -> Tuple:
+    return order.status, _decimal(order.total)
+
+
+def _purchase_order_deltas(order_status, total) -> List[Delta]:
+    return [(PURCHASE_ORDERS_BY_STATUS, _key(order_status), 1, total)]
+
+
+def record_purchase_order_change(db: Session, before: Optional[Tuple], after: Optional[Tuple]) -> None:
+    record_purchase_order_changes(db, [(before, after)])
+
+
+def record_purchase_order_changes(db: Session, changes: Iterable[Tuple[Optional[Tuple], Optional[Tuple]]]) -> None:
+    """Update aggregates for several (before, after) purchase order state changes in one statement."""
+    deltas: List[Delta] = []
+    for before, after in changes:
+        deltas += _state_deltas(before, after, _purchase_order_deltas)
+    apply_deltas(db, deltas)
+
+
+def _lead_status(value) -> LeadStatus:
+    # update_lead assigns raw request values: "qualified" or "QUALIFIED"
+    if value is None:
+        return LeadStatus.NEW
+    if isinstance(value, LeadStatus) or value in LeadStatus._value2member_map_:
+        return LeadStatus(value)
+    return LeadStatus[value]
+
+
+def lead_state(lead: Lead) -> Tuple:
+    return _lead_status(lead.status), _decimal(lead.estimated_value)
+
+
+def _lead_deltas(lead_status, estimated_value) -> List[Delta]:
+    return [(LEADS_BY_STATUS, _key(lead_status), 1, estimated_value)]
+
+
+def record_lead_change(db: Session, before: Optional[Tuple], after: Optional[Tuple]) -> None:
+    apply_deltas(db, _state_deltas(before, after, _lead_deltas))
+
+
+def record_customer_count_change(db: Session, change: int) -> None:
+    apply_deltas(db, [(ENTITY_COUNT, "customers", change, Decimal("0"))])
+
+
+def product_state(product: Product) -> Tuple:
+    return (_decimal(product.cost),)
+
+
+def record_product_change(
+    db: Session,
+    product_id: Optional[int],
+    before: Optional[Tuple],
+    after: Optional[Tuple]
+) -> None:
+    """Count products and revalue their stock when the cost changes."""
+    deltas: List[Delta] = [(ENTITY_COUNT, "products", (after is not None) - (before is not None), Decimal("0"))]
+    old_cost = before[0] if before is not None else Decimal("0")
+    new_cost = after[0] if after is not None else Decimal("0")
+    if product_id is not None and old_cost != new_cost:
+        quantity = db.query(func.sum(Inventory.quantity)).filter(Inventory.product_id == product_id).scalar()
+        deltas.append((INVENTORY_VALUE, "", 0, (new_cost - old_cost) * _decimal(quantity)))
+    apply_deltas(db, deltas)
+
+
+def record_stock_change(db: Session, quantity_changes: Dict[int, Decimal]) -> None:
+    """Revalue stock for {inventory_id: quantity_change} at the current product cost."""
+    quantity_changes = {inventory_id: change for inventory_id, change in quantity_changes.items() if change}
+    if not quantity_changes:
+        return
+    costs = db.query(Inventory.id, Product.cost).join(
+        Product, Inventory.product_id == Product.id
+    ).filter(Inventory.id.in_(list(quantity_changes)))
+    value = sum(
+        (_decimal(quantity_changes[row.id]) * _decimal(row.cost) for row in costs),
+        Decimal("0")
+    )
+    apply_deltas(db, [(INVENTORY_VALUE, "", 0, value)])
+
+
+def _grouped(db: Session, metric: str, key_column, count, amount, *criteria) -> List[dict]:
+    query = select(key_column, count, amount).where(*criteria).group_by(key_column)
+    return [
+        {"metric": metric, "key": _key(row[0]), "count": row[1] or 0, "amount": _decimal(row[2])}
+        for row in db.execute(query)
+        if row[0] is not None
+    ]
+
+
+def rebuild_dashboard_stats(engine: Engine) -> int:
+    """Recompute every aggregate from the source tables. Returns the row count."""
+    with Session(bind=engine) as db:
+        if engine.dialect.name == "postgresql":
+            # Writers and folds wait until the rebuilt rows are committed and
+            # then add their changes on top, so nothing is counted twice or lost
+            db.execute(text("LOCK TABLE dashboard_stat_deltas, dashboard_stats IN EXCLUSIVE MODE"))
+
+        rows = (
+            _grouped(
+                db, REVENUE_BY_DAY, SalesOrder.order_date, func.count(SalesOrder.id),
+                func.sum(func.coalesce(SalesOrder.total, 0)), SalesOrder.status != OrderStatus.CANCELLED
+            )
+            + _grouped(
+                db, SALES_ORDERS_BY_STATUS, SalesOrder.status, func.count(SalesOrder.id),
+                func.sum(func.coalesce(SalesOrder.total, 0))
+            )
+            + _grouped(
+                db, PURCHASE_ORDERS_BY_STATUS, PurchaseOrder.status, func.count(PurchaseOrder.id),
+                func.sum(func.coalesce(PurchaseOrder.total, 0))
+            )
+            + _grouped(
+                db, LEADS_BY_STATUS, func.coalesce(Lead.status, LeadStatus.NEW.name), func.count(Lead.id),
+                func.sum(func.coalesce(Lead.estimated_value, 0))
+            )
+        )
+        inventory_value = db.execute(
+            select(func.sum(Inventory.quantity * func.coalesce(Product.cost, 0)))
+            .select_from(Inventory).join(Product, Inventory.product_id == Product.id)
+        ).scalar()
+        rows.append({"metric": INVENTORY_VALUE, "key": "", "count": 0, "amount": _decimal(inventory_value)})
+        for entity, model in (("customers", Customer), ("products", Product)):
+            count = db.execute(select(func.count(model.id))).scalar()
+            rows.append({"metric": ENTITY_COUNT, "key": entity, "count": count or 0, "amount": Decimal("0")})
+
+        # Pending deltas are already part of the recomputed figures
+        db.execute(delete(DashboardStatDelta))
+        db.execute(delete(DashboardStat))
+        db.execute(insert(DashboardStat), rows)
+        db.commit()
+    return len(rows)
+
+
+def ensure_dashboard_stats(engine: Engine) -> None:
+    """Fill the aggregates on first start."""
+    with engine.connect() as conn:
+        filled = conn.execute(select(DashboardStat.id).limit(1)).first()
+    if not filled:
+        rebuild_dashboard_stats(engine)
+
+
+def _by_status(stats: Dict[Tuple[str, str], List], metric: str, statuses, open_statuses) -> dict:
+    by_status = {}
+    for status_value in statuses:
+        count, amount = stats.get((metric, status_value.value), (0, Decimal("0")))
+        by_status[status_value.value] = {"count": count, "amount": amount.quantize(Decimal("0.01"))}
+    return {
+        "total": sum(entry["count"] for entry in by_status.values()),
+        "open": sum(by_status[status_value.value]["count"] for status_value in open_statuses),
+        "open_amount": sum(
+            (by_status[status_value.value]["amount"] for status_value in open_statuses), Decimal("0.00")
+        ),
+        "by_status": by_status,
+    }
+
+
+def get_dashboard_summary(db: Session, days: int = 30) -> dict:
+    """All dashboard figures in one read; revenue covers the last `days` days including today."""
+    since = date.today() - timedelta(days=days - 1)
+    # Aggregates plus the deltas not folded in yet
+    stats = _merge(
+        [(stat.metric, stat.key, stat.count, stat.amount) for stat in db.query(DashboardStat).filter(
+            or_(DashboardStat.metric != REVENUE_BY_DAY, DashboardStat.key >= since.isoformat())
+        )]
+        + db.query(
+            DashboardStatDelta.metric, DashboardStatDelta.key,
+            func.sum(DashboardStatDelta.count), func.sum(DashboardStatDelta.amount)
+        ).filter(
+            or_(DashboardStatDelta.metric != REVENUE_BY_DAY, DashboardStatDelta.key >= since.isoformat())
+        ).group_by(DashboardStatDelta.metric, DashboardStatDelta.key).all()
+    )
+
+    by_day = []
+    for offset in range(days):
+        day = (since + timedelta(days=offset)).isoformat()
+        count, amount = stats.get((REVENUE_BY_DAY, day), (0, Decimal("0")))
+        by_day.append({"date": day, "orders": count, "revenue": amount.quantize(Decimal("0.01"))})
+
+    inventory_value = stats.get((INVENTORY_VALUE, ""), (0, Decimal("0")))[1]
+    customers = stats.get((ENTITY_COUNT, "customers"), (0, Decimal("0")))[0]
+    products = stats.get((ENTITY_COUNT, "products"), (0, Decimal("0")))[0]
+    return {
+        "days": days,
+        "revenue": {
+            "total": sum((entry["revenue"] for entry in by_day), Decimal("0.00")),
+            "orders": sum(entry["orders"] for entry in by_day),
+            "by_day": by_day,
+        },
+        "sales_orders": _by_status(stats, SALES_ORDERS_BY_STATUS, OrderStatus, OPEN_ORDER_STATUSES),
+        "purchase_orders": _by_status(
+            stats, PURCHASE_ORDERS_BY_STATUS, PurchaseOrderStatus, OPEN_PURCHASE_ORDER_STATUSES
+        ),
+        "leads": _by_status(stats, LEADS_BY_STATUS, LeadStatus, OPEN_LEAD_STATUSES),
+        "inventory": {"value": inventory_value.quantize(Decimal("0.01"))},
+        "customers": customers,
+        "products": products,
+    }
@@ -0,0 +1,264 @@
+"""
+Отчеты по складу: стоимость запасов, остатки по складам и категориям,
+оборачиваемость и запас в днях.
+
+Отчеты считаются агрегатами SQL без загрузки ORM-объектов. Результаты
+кэшируются по набору параметров на INVENTORY_REPORT_CACHE_TTL_SECONDS; ключ
+кэша включает id последнего движения в inventory_movements и время последнего
+изменения товаров, поэтому любое изменение остатков (через журнал движений)
+или себестоимости сразу делает старые записи недействительными, в том числе в
+других процессах. Изменение товара через API, кроме того, очищает кэш своего
+процесса сразу (updated_at хранится с точностью до секунды).
+
+С warehouse_id продажи в отчете об оборачиваемости берутся только со строк
+заказов этого склада (order_items.warehouse_id).
+"""
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.category import Category
+from app.models.inventory import Inventory
+from app.models.inventory_movement import InventoryMovement
+from app.models.order_item import OrderItem
+from app.models.product import Product
+from app.models.sales_order import OrderStatus, SalesOrder
+from app.models.warehouse import Warehouse
+
+# Orders whose items have left the warehouse
+SOLD_ORDER_STATUSES = (OrderStatus.SHIPPED, OrderStatus.DELIVERED)
+
+_lock = threading.Lock()
+_cache: Dict[Tuple, Tuple[float, Any]] = {}
+
+
+def _decimal(value, places: str = "0.01") -> Decimal:
+    return Decimal(str(value or 0)).quantize(Decimal(places))
+
+
+def _quantity(value) -> Decimal:
+    return _decimal(value, "0.001")
+
+
+def _available():
+    return Inventory.quantity - func.coalesce(Inventory.reserved_quantity, 0)
+
+
+def _stock_value():
+    return Inventory.quantity * func.coalesce(Product.cost, 0)
+
+
+def _stock_columns():
+    return (
+        func.count(func.distinct(Inventory.product_id)).label("sku_count"),
+        func.sum(Inventory.quantity).label("quantity"),
+        func.sum(func.coalesce(Inventory.reserved_quantity, 0)).label("reserved"),
+        func.sum(_available()).label("available"),
+        func.sum(_stock_value()).label("value"),
+    )
+
+
+def _stock_row(row) -> dict:
+    return {
+        "sku_count": row.sku_count or 0,
+        "quantity": _quantity(row.quantity),
+        "reserved": _quantity(row.reserved),
+        "available": _quantity(row.available),
+        "value": _decimal(row.value),
+    }
+
+
+def _sold(days: int, warehouse_id: Optional[int] = None):
+    """Quantity sold per product over the last `days` days, from one warehouse if given."""
+    since = date.today() - timedelta(days=days)
+    query = select(
+        OrderItem.product_id,
+        func.sum(OrderItem.quantity).label("sold_quantity")
+    ).join(
+        SalesOrder, OrderItem.order_id == SalesOrder.id
+    ).where(
+        SalesOrder.order_date >= since,
+        SalesOrder.status.in_(SOLD_ORDER_STATUSES)
+    ).group_by(OrderItem.product_id)
+    if warehouse_id:
+        query = query.where(OrderItem.warehouse_id == warehouse_id)
+    return query.subquery()
+
+
+def stock_valuation(db: Session, warehouse_id: Optional[int] = None) -> dict:
+    """Totals of stock on hand valued at Product.cost."""
+    query = select(*_stock_columns()).select_from(Inventory).join(Product, Inventory.product_id == Product.id)
+    if warehouse_id:
+        query = query.where(Inventory.warehouse_id == warehouse_id)
+    return _stock_row(db.execute(query).one())
+
+
+def stock_by_warehouse(db: Session, warehouse_id: Optional[int] = None) -> list:
+    query = select(
+        Warehouse.id, Warehouse.name, *_stock_columns()
+    ).select_from(Inventory).join(
+        Product, Inventory.product_id == Product.id
+    ).join(
+        Warehouse, Inventory.warehouse_id == Warehouse.id
+    ).group_by(Warehouse.id, Warehouse.name).order_by(Warehouse.name)
+    if warehouse_id:
+        query = query.where(Inventory.warehouse_id == warehouse_id)
+    return [
+        {"warehouse_id": row.id, "warehouse_name": row.name, **_stock_row(row)}
+        for row in db.execute(query)
+    ]
+
+
+def stock_by_category(db: Session, warehouse_id: Optional[int] = None) -> list:
+    query = select(
+        Category.id, Category.name, *_stock_columns()
+    ).select_from(Inventory).join(
+        Product, Inventory.product_id == Product.id
+    ).outerjoin(
+        Category, Product.category_id == Category.id
+    ).group_by(Category.id, Category.name).order_by(Category.name)
+    if warehouse_id:
+        query = query.where(Inventory.warehouse_id == warehouse_id)
+    return [
+        {"category_id": row.id, "category_name": row.name, **_stock_row(row)}
+        for row in db.execute(query)
+    ]
+
+
+def stock_turnover(db: Session, days: int = 90, warehouse_id: Optional[int] = None, limit: int = 100) -> dict:
+    """Turnover and days of cover per product over the last `days` days.
+
+    turnover = cost of goods sold / current stock value for the period;
+    days_of_cover = available stock / average daily sales. Products are
+    ordered by days of cover, fastest to run out first; products without
+    sales in the period come last. With warehouse_id both stock and sales
+    are those of that warehouse.
+    """
+    sold = _sold(days, warehouse_id)
+    stock = select(
+        Inventory.product_id,
+        func.sum(Inventory.quantity).label("quantity"),
+        func.sum(_available()).label("available")
+    ).group_by(Inventory.product_id)
+    if warehouse_id:
+        stock = stock.where(Inventory.warehouse_id == warehouse_id)
+    stock = stock.subquery()
+
+    cost = func.coalesce(Product.cost, 0)
+    sold_quantity = func.coalesce(sold.c.sold_quantity, 0)
+    available = func.coalesce(stock.c.available, 0)
+    daily_sales = sold_quantity * 1.0 / days  # * 1.0 avoids integer division on SQLite
+    days_of_cover = func.nullif(available, 0) / func.nullif(daily_sales, 0)
+
+    query = select(
+        Product.id,
+        Product.sku,
+        Product.name,
+        stock.c.quantity,
+        available.label("available"),
+        (func.coalesce(stock.c.quantity, 0) * cost).label("stock_value"),
+        sold_quantity.label("sold_quantity"),
+        (sold_quantity * cost).label("cogs"),
+        days_of_cover.label("days_of_cover")
+    ).join(
+        stock, stock.c.product_id == Product.id
+    ).outerjoin(
+        sold, sold.c.product_id == Product.id
+    ).order_by(
+        days_of_cover.is_(None), days_of_cover, Product.id
+    ).limit(limit)
+
+    totals = db.execute(
+        select(
+            func.sum(sold.c.sold_quantity * func.coalesce(Product.cost, 0)).label("cogs")
+        ).select_from(sold).join(Product, sold.c.product_id == Product.id)
+    ).one()
+    stock_value = stock_valuation(db, warehouse_id)["value"]
+    cogs = _decimal(totals.cogs)
+
+    items = []
+    for row in db.execute(query):
+        value = _decimal(row.stock_value)
+        item_cogs = _decimal(row.cogs)
+        items.append({
+            "product_id": row.id,
+            "sku": row.sku,
+            "name": row.name,
+            "quantity": _quantity(row.quantity),
+            "available": _quantity(row.available),
+            "stock_value": value,
+            "sold_quantity": _quantity(row.sold_quantity),
+            "cogs": item_cogs,
+            "turnover": _decimal(item_cogs / value) if value else None,
+            "days_of_cover": _decimal(row.days_of_cover, "0.1") if row.days_of_cover is not None else None,
+        })
+
+    return {
+        "days": days,
+        "cogs": cogs,
+        "stock_value": stock_value,
+        "turnover": _decimal(cogs / stock_value) if stock_value else None,
+        "annualized_turnover": _decimal(cogs / stock_value * 365 / days) if stock_value else None,
+        "items": items,
+    }
+
+
+def _build_report(db: Session, report: str, days: int, warehouse_id: Optional[int], limit: int):
+    if report == "valuation":
+        return stock_valuation(db, warehouse_id)
+    if report == "by_warehouse":
+        return stock_by_warehouse(db, warehouse_id)
+    if report == "by_category":
+        return stock_by_category(db, warehouse_id)
+    if report == "turnover":
+        return stock_turnover(db, days, warehouse_id, limit)
+    return {
+        "valuation": stock_valuation(db, warehouse_id),
+        "by_warehouse": stock_by_warehouse(db, warehouse_id),
+        "by_category": stock_by_category(db, warehouse_id),
+    }
+
+
+def get_inventory_report(
+    db: Session,
+    report: str = "summary",
+    days: int = 90,
+    warehouse_id: Optional[int] = None,
+    limit: int = 100
+):
+    """Return a report, served from the cache while inventory and products are unchanged."""
+    version = tuple(db.execute(select(
+        select(func.max(InventoryMovement.id)).scalar_subquery(),
+        select(func.max(Product.updated_at)).scalar_subquery()
+    )).one())
+    key = (report, days, warehouse_id, limit, date.today(), version)
+
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] >= time.monotonic():
+            return entry[1]
+
+    result = _build_report(db, report, days, warehouse_id, limit)
+
+    if settings.INVENTORY_REPORT_CACHE_TTL_SECONDS > 0:
+        with _lock:
+            # Entries for older versions can never be hit again
+            stale = [cached for cached in _cache if cached[-1] != version]
+            for cached in stale:
+                del _cache[cached]
+            if len(_cache) >= settings.INVENTORY_REPORT_CACHE_MAX_SIZE:
+                _cache.clear()
+            _cache[key] = (time.monotonic() + settings.INVENTORY_REPORT_CACHE_TTL_SECONDS, result)
+    return result
+
+
+def clear_inventory_report_cache() -> None:
+    """Drop cached reports, e.g. after a product cost change."""
+    with _lock:
+        _cache.clear()
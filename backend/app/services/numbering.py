@@ -0,0 +1,123 @@
+"""
+Нумерация документов: заказы клиентов и заказы поставщикам.
+
+Номера выдает последовательность PostgreSQL (document_number_<тип>), а на
+SQLite - счетчик в таблице document_counters, который увеличивается атомарным
+UPDATE ... RETURNING. Каждый процесс забирает блок из
+DOCUMENT_NUMBER_BLOCK_SIZE номеров отдельной короткой транзакцией и выдает их
+из памяти, поэтому номера не повторяются и известны до начала работы над
+документом, а параллельные запросы не ждут друг друга. Номера откатанных
+транзакций и неиспользованный остаток блока при перезапуске пропускаются:
+в нумерации возможны пропуски, но не повторы.
+
+Формат номера задается в настройках для каждого типа документа: {number} -
+порядковый номер, {date} - текущая дата (например "SO-{date:%Y}-{number:06d}").
+
+На SQLite блок нужно брать до первой записи в сессии запроса: иначе счетчик
+ждет блокировку, которую держит сам запрос.
+
+Блоки берутся через отдельный пул соединений: запросы, ожидающие номер,
+уже держат соединения основного пула, и при его исчерпании выдача номеров
+ждала бы сама себя.
+"""
+import threading
+from collections import deque
+from datetime import date
+from typing import Deque, Dict, List, Tuple
+
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.document_counter import DocumentCounter
+
+SALES_ORDER = "sales_order"
+PURCHASE_ORDER = "purchase_order"
+
+# Settings with the number format of each document type
+NUMBER_FORMATS = {
+    SALES_ORDER: "SALES_ORDER_NUMBER_FORMAT",
+    PURCHASE_ORDER: "PURCHASE_ORDER_NUMBER_FORMAT",
+}
+
+_lock = threading.Lock()
+_blocks: Dict[Tuple[str, str], Deque[int]] = {}
+_allocation_engines: Dict[str, Engine] = {}
+
+
+def _sequence_name(document_type: str) -> str:
+    return f"document_number_{document_type}"
+
+
+def _insert_counters(conn) -> None:
+    insert = pg_insert if conn.dialect.name == "postgresql" else sqlite_insert
+    conn.execute(
+        insert(DocumentCounter)
+        .values([{"name": document_type, "value": 0} for document_type in NUMBER_FORMATS])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+
+
+def _allocation_engine(engine: Engine) -> Engine:
+    """Engine for taking blocks, with a pool of its own (same settings and connect hooks)."""
+    key = str(engine.url)
+    if key not in _allocation_engines:
+        _allocation_engines[key] = create_engine(engine.url, pool=engine.pool.recreate())
+    return _allocation_engines[key]
+
+
+def _allocate(engine: Engine, document_type: str, count: int) -> List[int]:
+    """Take `count` new numbers from the database in a transaction of their own."""
+    with _allocation_engine(engine).begin() as conn:
+        if conn.dialect.name == "postgresql":
+            return sorted(conn.execute(
+                text(f"SELECT nextval('{_sequence_name(document_type)}') FROM generate_series(1, :count)"),
+                {"count": count}
+            ).scalars())
+
+        counter = (
+            update(DocumentCounter)
+            .where(DocumentCounter.name == document_type)
+            .values(value=DocumentCounter.value + count)
+            .returning(DocumentCounter.value)
+        )
+        last = conn.execute(counter).scalar()
+        if last is None:
+            _insert_counters(conn)
+            last = conn.execute(counter).scalar()
+        return list(range(last - count + 1, last + 1))
+
+
+def format_number(document_type: str, number: int) -> str:
+    return getattr(settings, NUMBER_FORMATS[document_type]).format(number=number, date=date.today())
+
+
+def next_numbers(db: Session, document_type: str, count: int) -> List[str]:
+    """Reserve `count` document numbers of a type, formatted and in increasing order."""
+    if document_type not in NUMBER_FORMATS:
+        raise ValueError(f"Unknown document type: {document_type}")
+    engine = db.get_bind()
+    key = (str(engine.url), document_type)
+    with _lock:
+        block = _blocks.setdefault(key, deque())
+        if len(block) < count:
+            block.extend(_allocate(engine, document_type, max(settings.DOCUMENT_NUMBER_BLOCK_SIZE, count - len(block))))
+        numbers = [block.popleft() for _ in range(count)]
+    return [format_number(document_type, number) for number in numbers]
+
+
+def next_number(db: Session, document_type: str) -> str:
+    return next_numbers(db, document_type, 1)[0]
+
+
+def ensure_document_numbering(engine: Engine) -> None:
+    """Create the number sequences (PostgreSQL) or counters (SQLite)."""
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            for document_type in NUMBER_FORMATS:
+                conn.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {_sequence_name(document_type)}"))
+        else:
+            _insert_counters(conn)
@@ -0,0 +1,361 @@
+"""
+Массовый импорт заказов клиентов из файлов CSV, JSON и NDJSON.
+
+Файл читается потоково и обрабатывается пачками по IMPORT_BATCH_SIZE
+заказов. На пачку выполняется несколько запросов: клиенты и товары (кэш на
+весь импорт), строки остатков, вставка заказов и строк (executemany),
+резервирование одним условным UPDATE и журнал движений. Каждая пачка -
+отдельная транзакция. Ошибки проверки, неизвестные товары и нехватка остатков
+записываются в отчет для своей строки файла и не прерывают импорт.
+
+Заказы вставляются в обход событий ORM, поэтому документы глобального поиска
+и показатели панели управления обновляются явно.
+
+CSV: одна строка на позицию заказа, позиции одного заказа идут подряд с
+одинаковым order_ref. Колонки: order_ref, customer_id, order_date,
+shipping_address, notes, order_discount (уровень заказа, из первой строки),
+product_id или sku, quantity, unit_price, discount, warehouse_id (позиция).
+JSON: массив заказов (или {"orders": [...]}) в формате ImportOrder,
+NDJSON: по одному заказу в строке.
+"""
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.customer import Customer
+from app.models.inventory import Inventory
+from app.models.order_item import OrderItem
+from app.models.product import Product
+from app.models.sales_order import OrderStatus, SalesOrder
+from app.schemas.order import ImportOrder
+from app.services import numbering
+from app.services.dashboard import record_sales_order_changes
+from app.services.search_index import index_inserted
+from app.services.stock import reserve_allocations
+
+IMPORT_BATCH_SIZE = 500
+TAX_RATE = Decimal("0.1")  # 10% налог
+
+FORMATS = ("csv", "json", "ndjson")
+_EXTENSIONS = {".csv": "csv", ".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+_ORDER_COLUMNS = ("order_ref", "customer_id", "order_date", "shipping_address", "notes")
+_ITEM_COLUMNS = ("product_id", "sku", "quantity", "unit_price", "discount", "warehouse_id")
+
+# (row number in the file, order_ref, order data or parse error message)
+SourceOrder = Tuple[int, Optional[str], Any]
+
+
+def line_total(quantity: Decimal, unit_price: Decimal, discount: Decimal) -> Decimal:
+    return Decimal(str(unit_price)) * Decimal(str(quantity)) - Decimal(str(discount))
+
+
+def order_totals(items: Iterable[Tuple[Decimal, Decimal]], discount: Decimal) -> Tuple[Decimal, Decimal, Decimal]:
+    """Subtotal, tax and total of an order from (quantity, unit_price) of its lines."""
+    subtotal = sum((Decimal(str(unit_price)) * Decimal(str(quantity)) for quantity, unit_price in items), Decimal("0"))
+    tax = subtotal * TAX_RATE
+    return subtotal, tax, subtotal + tax - Decimal(str(discount or 0))
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    for extension, file_format in _EXTENSIONS.items():
+        if filename and filename.lower().endswith(extension):
+            return file_format
+    if content_type:
+        if "csv" in content_type:
+            return "csv"
+        if "ndjson" in content_type or "jsonl" in content_type:
+            return "ndjson"
+        if "json" in content_type:
+            return "json"
+    return None
+
+
+def _csv_orders(stream: IO[bytes]) -> Iterator[SourceOrder]:
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    columns = set(reader.fieldnames or ())
+    required = {"customer_id", "quantity", "unit_price"}
+    if not required <= columns or not columns & {"product_id", "sku"}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV должен содержать колонки customer_id, product_id или sku, quantity, unit_price"
+        )
+
+    current_ref, order, first_line = None, None, 0
+    for record in reader:
+        values = {key: value.strip() for key, value in record.items() if key and value and value.strip()}
+        order_ref = values.get("order_ref")
+        if order is not None and (order_ref is None or order_ref != current_ref):
+            yield first_line, current_ref, order
+            order = None
+        if order is None:
+            current_ref, first_line = order_ref, reader.line_num
+            order = {key: values[key] for key in _ORDER_COLUMNS if key in values}
+            if "order_discount" in values:
+                order["discount"] = values["order_discount"]
+            order["items"] = []
+        order["items"].append({key: values[key] for key in _ITEM_COLUMNS if key in values})
+    if order is not None:
+        yield first_line, current_ref, order
+
+
+def _ndjson_orders(stream: IO[bytes]) -> Iterator[SourceOrder]:
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8-sig"), start=1):
+        if not line.strip():
+            continue
+        try:
+            order = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Некорректный JSON: {e}"
+            continue
+        yield line_number, order.get("order_ref") if isinstance(order, dict) else None, order
+
+
+def _json_orders(stream: IO[bytes]) -> Iterator[SourceOrder]:
+    # A JSON array cannot be read incrementally; large feeds should use NDJSON
+    try:
+        document = json.load(io.TextIOWrapper(stream, encoding="utf-8-sig"))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Некорректный JSON: {e}")
+    orders = document.get("orders") if isinstance(document, dict) else document
+    if not isinstance(orders, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="JSON должен содержать массив заказов"
+        )
+    for index, order in enumerate(orders, start=1):
+        yield index, order.get("order_ref") if isinstance(order, dict) else None, order
+
+
+def read_orders(stream: IO[bytes], file_format: str) -> Iterator[SourceOrder]:
+    """Parse an import file into orders without reading it into memory (except JSON arrays)."""
+    if file_format == "csv":
+        return _csv_orders(stream)
+    if file_format == "ndjson":
+        return _ndjson_orders(stream)
+    return _json_orders(stream)
+
+
+def _validation_message(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+class _Catalog:
+    """Customers and products referenced by the import, each looked up once."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.customers: Dict[int, bool] = {}
+        self.products: Dict[int, Any] = {}
+        self.skus: Dict[str, Optional[int]] = {}
+
+    def load(self, orders: List[ImportOrder]) -> None:
+        customer_ids = {order.customer_id for order in orders} - self.customers.keys()
+        if customer_ids:
+            found = set(self.db.execute(select(Customer.id).where(Customer.id.in_(customer_ids))).scalars())
+            for customer_id in customer_ids:
+                self.customers[customer_id] = customer_id in found
+
+        items = [item for order in orders for item in order.items]
+        product_ids = {item.product_id for item in items if item.product_id is not None} - self.products.keys()
+        skus = {item.sku for item in items if item.product_id is None} - self.skus.keys()
+        if product_ids or skus:
+            rows = self.db.execute(
+                select(Product.id, Product.sku, Product.name, Product.unit).where(
+                    or_(Product.id.in_(product_ids), Product.sku.in_(skus))
+                )
+            ).all()
+            for row in rows:
+                self.products[row.id] = row
+                self.skus[row.sku] = row.id
+            for product_id in product_ids:
+                self.products.setdefault(product_id, None)
+            for sku in skus:
+                self.skus.setdefault(sku, None)
+
+    def product(self, item):
+        product_id = item.product_id if item.product_id is not None else self.skus.get(item.sku)
+        return self.products.get(product_id) if product_id is not None else None
+
+
+def _resolve(catalog: _Catalog, order: ImportOrder):
+    """Order lines as (product, warehouse_id, item), or an error message."""
+    if not catalog.customers.get(order.customer_id):
+        return None, "Клиент не найден"
+    lines = []
+    for item in order.items:
+        product = catalog.product(item)
+        if product is None:
+            reference = f"ID {item.product_id}" if item.product_id is not None else f"'{item.sku}'"
+            return None, f"Товар {reference} не найден"
+        warehouse_id = item.warehouse_id or order.warehouse_id
+        if not warehouse_id:
+            return None, f"Не указан склад для товара ID {product.id}"
+        lines.append((product, warehouse_id, item))
+    return lines, None
+
+
+def _allocate(db: Session, prepared: List[dict]) -> Tuple[List[dict], List[Tuple[dict, str]]]:
+    """Assign free stock to orders in file order; returns accepted and rejected orders."""
+    keys = {(product.id, warehouse_id) for entry in prepared for product, warehouse_id, _ in entry["lines"]}
+    stock = {}
+    if keys:
+        stock = {
+            (row.product_id, row.warehouse_id): [row.id, Decimal(str(row.quantity)) - Decimal(str(row.reserved_quantity or 0))]
+            for row in db.query(
+                Inventory.id, Inventory.product_id, Inventory.warehouse_id, Inventory.quantity, Inventory.reserved_quantity
+            ).filter(tuple_(Inventory.product_id, Inventory.warehouse_id).in_(list(keys)))
+        }
+
+    accepted, rejected = [], []
+    for entry in prepared:
+        requested: Dict[Tuple[int, int], Decimal] = {}
+        products = {}
+        for product, warehouse_id, item in entry["lines"]:
+            key = (product.id, warehouse_id)
+            requested[key] = requested.get(key, Decimal("0")) + item.quantity
+            products[key] = product
+
+        error = None
+        for key, quantity in requested.items():
+            product = products[key]
+            if key not in stock:
+                error = f"Товар '{product.name}' отсутствует на складе ID {key[1]}"
+                break
+            available = stock[key][1]
+            if available < quantity:
+                unit = product.unit or 'шт'
+                error = f"Недостаточно товара '{product.name}' на складе. Доступно: {available} {unit}, требуется: {quantity} {unit}"
+                break
+        if error:
+            rejected.append((entry, error))
+            continue
+
+        allocation: Dict[int, Decimal] = {}
+        for key, quantity in requested.items():
+            stock[key][1] -= quantity
+            allocation[stock[key][0]] = allocation.get(stock[key][0], Decimal("0")) + quantity
+        accepted.append({**entry, "allocation": allocation})
+    return accepted, rejected
+
+
+def _insert_orders(db: Session, accepted: List[dict], user_id: Optional[int]) -> Optional[List[dict]]:
+    """Insert and reserve accepted orders; None if stock changed concurrently."""
+    today = date.today()
+    order_rows = []
+    for entry, order_number in zip(accepted, numbering.next_numbers(db, numbering.SALES_ORDER, len(accepted))):
+        order = entry["order"]
+        subtotal, tax, total = order_totals(((item.quantity, item.unit_price) for item in order.items), order.discount)
+        order_rows.append({
+            "order_number": order_number,
+            "customer_id": order.customer_id,
+            "order_date": order.order_date or today,
+            "status": OrderStatus.PENDING,
+            "subtotal": subtotal,
+            "tax": tax,
+            "discount": order.discount,
+            "total": total,
+            "shipping_address": order.shipping_address,
+            "notes": order.notes,
+            "created_by": user_id
+        })
+    order_ids = db.execute(
+        insert(SalesOrder).returning(SalesOrder.id, sort_by_parameter_order=True), order_rows
+    ).scalars().all()
+
+    item_rows = [
+        {
+            "order_id": order_id,
+            "product_id": product.id,
+            "warehouse_id": warehouse_id,
+            "quantity": item.quantity,
+            "unit_price": item.unit_price,
+            "discount": item.discount,
+            "total": line_total(item.quantity, item.unit_price, item.discount)
+        }
+        for order_id, entry in zip(order_ids, accepted)
+        for product, warehouse_id, item in entry["lines"]
+    ]
+    db.execute(insert(OrderItem), item_rows)
+
+    allocations = {order_id: entry["allocation"] for order_id, entry in zip(order_ids, accepted)}
+    if not reserve_allocations(db, allocations, "sales_order", user_id):
+        return None
+
+    created = [{**row, "id": order_id} for order_id, row in zip(order_ids, order_rows)]
+    index_inserted(db, SalesOrder, [SimpleNamespace(**row) for row in created])
+    record_sales_order_changes(db, [
+        (None, (row["status"], row["order_date"], row["total"])) for row in created
+    ])
+    return created
+
+
+def _import_batch(db: Session, catalog: _Catalog, batch: List[SourceOrder], user_id: Optional[int], report: dict) -> None:
+    candidates = []
+    for row, order_ref, data in batch:
+        if isinstance(data, str):
+            report["errors"].append({"row": row, "order_ref": order_ref, "error": data})
+            continue
+        try:
+            candidates.append((row, ImportOrder.model_validate(data)))
+        except ValidationError as e:
+            report["errors"].append({"row": row, "order_ref": order_ref, "error": _validation_message(e)})
+
+    catalog.load([order for _, order in candidates])
+    prepared = []
+    for row, order in candidates:
+        lines, error = _resolve(catalog, order)
+        if error:
+            report["errors"].append({"row": row, "order_ref": order.order_ref, "error": error})
+        else:
+            prepared.append({"row": row, "order": order, "lines": lines})
+
+    # A concurrent request may take stock between reading and reserving it:
+    # the batch is rolled back and allocated again from fresh stock levels
+    for _ in range(2):
+        accepted, rejected = _allocate(db, prepared)
+        created = _insert_orders(db, accepted, user_id) if accepted else []
+        if created is not None:
+            db.commit()
+            break
+        db.rollback()
+    else:
+        accepted, rejected, created = [], [(entry, "Остатки изменились во время импорта, повторите импорт заказа") for entry in prepared], []
+
+    for entry, error in rejected:
+        report["errors"].append({"row": entry["row"], "order_ref": entry["order"].order_ref, "error": error})
+    for entry, row in zip(accepted, created):
+        report["orders"].append({
+            "row": entry["row"],
+            "order_ref": entry["order"].order_ref,
+            "order_id": row["id"],
+            "order_number": row["order_number"]
+        })
+
+
+def import_orders(db: Session, source: Iterable[SourceOrder], user_id: Optional[int] = None) -> dict:
+    """Create orders from parsed import rows; returns created orders and per-row errors."""
+    catalog = _Catalog(db)
+    report = {"orders": [], "errors": []}
+    batch: List[SourceOrder] = []
+    for source_order in source:
+        batch.append(source_order)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            _import_batch(db, catalog, batch, user_id, report)
+            batch = []
+    if batch:
+        _import_batch(db, catalog, batch, user_id, report)
+
+    report["errors"].sort(key=lambda error: error["row"])
+    return {"imported": len(report["orders"]), "failed": len(report["errors"]), **report}
@@ -0,0 +1,255 @@
+"""
+Смена статусов заказов с расчетом по складу.
+
+Статусы меняются пачкой: заказы, их строки и строки остатков загружаются
+несколькими запросами на всю пачку, статус переключается условным UPDATE
+(только если его не изменили после чтения), а отгрузка и снятие резерва
+выполняются одним UPDATE сервиса stock для всех заказов сразу. Заказы,
+которые нельзя перевести (нет резерва, статус изменен параллельно), не
+мешают остальным: для каждого заказа возвращается свой результат.
+
+Строка заказа помнит склад, на котором она зарезервирована
+(order_items.warehouse_id). Для строк, созданных до появления этого поля,
+используется склад из запроса, а без него - первая строка остатков товара.
+В базах, созданных до этого поля, столбец добавляется при запуске
+(ensure_order_item_warehouses, как миграция 010).
+"""
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import inspect, text, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.inventory import Inventory
+from app.models.order_item import OrderItem
+from app.models.sales_order import OrderStatus, SalesOrder
+from app.services.dashboard import record_sales_order_changes, sales_order_state
+from app.services.stock import find_inventory_rows, release_reserved, ship_reserved
+
+# The order holds its reservation in these statuses
+RESERVED_STATUSES = (OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.PROCESSING)
+SHIPPED_STATUSES = (OrderStatus.SHIPPED, OrderStatus.DELIVERED)
+
+# Error codes of per-order results
+NOT_FOUND = "not_found"
+INVALID_TRANSITION = "invalid_transition"
+INSUFFICIENT_STOCK = "insufficient_stock"
+CONFLICT = "conflict"
+
+RELEASE = "release"
+SHIP = "ship"
+
+
+def _result(order_id: int, order_status: Optional[OrderStatus], error: Optional[str] = None,
+            detail: Optional[str] = None) -> dict:
+    return {
+        "order_id": order_id,
+        "ok": error is None,
+        "status": order_status.value if order_status else None,
+        "error": error,
+        "detail": detail
+    }
+
+
+def _settlement(old_status: OrderStatus, new_status: OrderStatus) -> Optional[str]:
+    if old_status not in RESERVED_STATUSES:
+        return None
+    if new_status == OrderStatus.CANCELLED:
+        return RELEASE
+    if new_status in SHIPPED_STATUSES:
+        return SHIP
+    return None
+
+
+def _allocate(
+    db: Session,
+    order_ids: List[int],
+    warehouse_id: Optional[int]
+) -> Tuple[Dict[int, Dict[int, Decimal]], Dict[int, List[int]], Dict[int, Decimal]]:
+    """Inventory rows of the order lines.
+
+    Returns {order_id: {inventory_id: quantity}}, {order_id: [product_id without
+    an inventory row]} and the reserved quantity of every row involved.
+    """
+    allocations: Dict[int, Dict[int, Decimal]] = {order_id: {} for order_id in order_ids}
+    missing: Dict[int, List[int]] = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return allocations, missing, {}
+
+    lines = db.query(
+        OrderItem.order_id, OrderItem.product_id, OrderItem.warehouse_id, OrderItem.quantity
+    ).filter(OrderItem.order_id.in_(order_ids)).all()
+
+    keys = {
+        (line.product_id, line.warehouse_id or warehouse_id)
+        for line in lines if line.warehouse_id or warehouse_id
+    }
+    by_key = {}
+    if keys:
+        by_key = {
+            (row.product_id, row.warehouse_id): row.id
+            for row in db.query(Inventory.id, Inventory.product_id, Inventory.warehouse_id).filter(
+                tuple_(Inventory.product_id, Inventory.warehouse_id).in_(list(keys))
+            )
+        }
+    unplaced = {line.product_id for line in lines if not (line.warehouse_id or warehouse_id)}
+    first_rows = find_inventory_rows(db, unplaced) if unplaced else {}
+
+    for line in lines:
+        line_warehouse_id = line.warehouse_id or warehouse_id
+        if line_warehouse_id:
+            inventory_id = by_key.get((line.product_id, line_warehouse_id))
+        else:
+            inventory_id = first_rows.get(line.product_id)
+        if inventory_id is None:
+            missing[line.order_id].append(line.product_id)
+            continue
+        quantities = allocations[line.order_id]
+        quantities[inventory_id] = quantities.get(inventory_id, Decimal("0")) + Decimal(str(line.quantity))
+
+    inventory_ids = {inventory_id for quantities in allocations.values() for inventory_id in quantities}
+    reserved = {}
+    if inventory_ids:
+        reserved = {
+            row.id: Decimal(str(row.reserved_quantity or 0))
+            for row in db.query(Inventory.id, Inventory.reserved_quantity).filter(Inventory.id.in_(inventory_ids))
+        }
+    return allocations, missing, reserved
+
+
+def _switch_status(db: Session, orders: Dict[int, SalesOrder], order_ids: List[int],
+                   new_status: OrderStatus) -> Set[int]:
+    """Set the status of orders nobody changed since they were read; returns their ids."""
+    by_status: Dict[OrderStatus, List[int]] = {}
+    for order_id in order_ids:
+        by_status.setdefault(orders[order_id].status, []).append(order_id)
+
+    switched: Set[int] = set()
+    for old_status, ids in by_status.items():
+        switched.update(db.execute(
+            update(SalesOrder)
+            .where(SalesOrder.id.in_(ids), SalesOrder.status == old_status)
+            .values(status=new_status)
+            .returning(SalesOrder.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+    return switched
+
+
+def change_order_statuses(
+    db: Session,
+    order_ids: Iterable[int],
+    new_status: OrderStatus,
+    warehouse_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> List[dict]:
+    """Move orders to `new_status` and settle their stock; returns one result per order.
+
+    Cancelling an order with a reservation releases it, shipping or delivering
+    deducts the reserved quantities from stock. The caller commits.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    orders = {order.id: order for order in db.query(SalesOrder).filter(SalesOrder.id.in_(order_ids))}
+
+    results: Dict[int, dict] = {}
+    actions: Dict[int, Optional[str]] = {}
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            results[order_id] = _result(order_id, None, NOT_FOUND, "Заказ не найден")
+        elif order.status == new_status:
+            results[order_id] = _result(order_id, order.status)
+        elif order.status == OrderStatus.CANCELLED:
+            results[order_id] = _result(
+                order_id, order.status, INVALID_TRANSITION, "Отмененный заказ нельзя перевести в другой статус"
+            )
+        else:
+            actions[order_id] = _settlement(order.status, new_status)
+
+    allocations, missing, reserved = _allocate(
+        db, [order_id for order_id, action in actions.items() if action], warehouse_id
+    )
+
+    # Check reservations in memory, in request order, so one short order
+    # does not fail the others
+    for order_id, action in actions.items():
+        quantities = allocations.get(order_id, {})
+        if action == SHIP:
+            if missing[order_id]:
+                results[order_id] = _result(
+                    order_id, orders[order_id].status, INSUFFICIENT_STOCK,
+                    f"Товар ID {missing[order_id][0]} отсутствует на складе"
+                )
+                continue
+            if any(reserved[inventory_id] < quantity for inventory_id, quantity in quantities.items()):
+                results[order_id] = _result(
+                    order_id, orders[order_id].status, INSUFFICIENT_STOCK,
+                    "Недостаточно зарезервированного товара для заказа"
+                )
+                continue
+        elif action == RELEASE:
+            # Lines without a matching reservation are left as they are
+            quantities = {
+                inventory_id: quantity for inventory_id, quantity in quantities.items()
+                if reserved[inventory_id] >= quantity
+            }
+            allocations[order_id] = quantities
+        for inventory_id, quantity in quantities.items():
+            reserved[inventory_id] -= quantity
+
+    accepted = [order_id for order_id in actions if order_id not in results]
+    before = {order_id: sales_order_state(orders[order_id]) for order_id in accepted}
+    switched = _switch_status(db, orders, accepted, new_status)
+    for order_id in accepted:
+        if order_id not in switched:
+            results[order_id] = _result(
+                order_id, orders[order_id].status, CONFLICT, "Статус заказа был изменен другим запросом"
+            )
+
+    release_reserved(
+        db,
+        {order_id: allocations[order_id] for order_id in accepted if order_id in switched and actions[order_id] == RELEASE},
+        "sales_order", user_id
+    )
+    ship_reserved(
+        db,
+        {order_id: allocations[order_id] for order_id in accepted if order_id in switched and actions[order_id] == SHIP},
+        "sales_order", user_id
+    )
+    record_sales_order_changes(db, [
+        (before[order_id], (new_status,) + before[order_id][1:])
+        for order_id in accepted if order_id in switched
+    ])
+
+    for order_id in accepted:
+        if order_id in switched:
+            results[order_id] = _result(order_id, new_status)
+    return [results[order_id] for order_id in order_ids]
+
+
+# Existing lines: warehouse of the reservation recorded in the inventory ledger
+_BACKFILL_ORDER_ITEM_WAREHOUSES = """
+UPDATE order_items SET warehouse_id = (
+    SELECT inventory.warehouse_id
+    FROM inventory_movements
+    JOIN inventory ON inventory.id = inventory_movements.inventory_id
+    WHERE inventory_movements.reference_type = 'sales_order'
+      AND inventory_movements.reference_id = order_items.order_id
+      AND CAST(inventory_movements.movement_type AS VARCHAR(20)) IN ('RESERVE', 'reserve')
+      AND inventory.product_id = order_items.product_id
+    ORDER BY inventory_movements.id
+    LIMIT 1
+)
+WHERE warehouse_id IS NULL
+"""
+
+
+def ensure_order_item_warehouses(engine: Engine) -> None:
+    """Add order_items.warehouse_id to databases created before it (create_all does not alter tables)."""
+    columns = {column["name"] for column in inspect(engine).get_columns("order_items")}
+    if "warehouse_id" in columns:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE order_items ADD COLUMN warehouse_id INTEGER REFERENCES warehouses(id)"))
+        conn.execute(text(_BACKFILL_ORDER_ITEM_WAREHOUSES))
@@ -0,0 +1,171 @@
+"""
+Хранение изображений товаров.
+
+Загрузка пишется во временный файл потоково, кусками по UPLOAD_CHUNK_SIZE, без
+блокировки цикла событий; размер проверяется по мере поступления данных.
+Затем файл помещается в хранилище (app.services.storage) под ключом
+products/<SHA-256 содержимого>, поэтому одинаковые изображения сохраняются
+один раз.
+
+Для каталога по оригиналу в фоновом пуле потоков (PRODUCT_IMAGE_WORKERS)
+строятся уменьшенные копии в WebP: grid (сетка товаров), detail (карточка) и
+retina (карточка на экранах высокой плотности). Пока копия не готова, отдается
+оригинал, а для старых загрузок копии строятся при первом запросе.
+
+Содержимое файла с именем-хешем не меняется, поэтому такие файлы и их копии
+отдаются с Cache-Control immutable и ETag из хеша: повторный запрос с
+If-None-Match получает 304 без обращения к хранилищу.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.storage import IMMUTABLE_CACHE_CONTROL, get_storage
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_IMAGES_PREFIX = "products"
+VARIANTS_PREFIX = "products/variants"
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Variant name -> longest side in pixels
+IMAGE_VARIANTS = {"grid": 200, "detail": 800, "retina": 1600}
+WEBP_QUALITY = 80
+
+# Content-addressed originals: SHA-256 of the content and the extension
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}\.(jpg|png|gif|webp)$")
+# Legacy uploads (random names) and originals served in place of a missing variant
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PRODUCT_IMAGE_WORKERS,
+    thread_name_prefix="product-image"
+)
+_pending_lock = threading.Lock()
+_pending = set()
+# Keys known to be stored; content-addressed objects are never replaced
+_stored = set()
+
+
+def original_key(filename: str) -> Optional[str]:
+    """Storage key of an original, None for names outside the images prefix."""
+    if Path(filename).name != filename or filename.startswith("."):
+        return None
+    return f"{PRODUCT_IMAGES_PREFIX}/{filename}"
+
+
+def variant_key(filename: str, size: str) -> str:
+    return f"{VARIANTS_PREFIX}/{Path(filename).stem}_{size}.webp"
+
+
+def is_stored(key: str) -> bool:
+    """Whether the storage has `key`; remembered once seen, so S3 is asked once per key."""
+    if key in _stored:
+        return True
+    if get_storage().exists(key):
+        _stored.add(key)
+        return True
+    return False
+
+
+def is_content_addressed(filename: str) -> bool:
+    return CONTENT_ADDRESSED_NAME.match(filename) is not None
+
+
+def image_etag(filename: str, size: Optional[str] = None) -> str:
+    """Strong ETag of a content-addressed original or one of its variants."""
+    stem = Path(filename).stem
+    return f'"{stem}-{size}"' if size else f'"{stem}"'
+
+
+async def save_upload(file: UploadFile) -> str:
+    """Stream an upload into the storage and return its content-addressed file name."""
+    extension = Path(file.filename or "").suffix.lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неподдерживаемый формат файла. Разрешенные форматы: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    if extension == ".jpeg":
+        extension = ".jpg"
+
+    digest = hashlib.sha256()
+    size = 0
+    descriptor, temporary = tempfile.mkstemp(prefix="upload-")
+    os.close(descriptor)
+    try:
+        async with await anyio.open_file(temporary, "wb") as target:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE / 1024 / 1024}MB"
+                    )
+                digest.update(chunk)
+                await target.write(chunk)
+
+        filename = f"{digest.hexdigest()}{extension}"
+        key = original_key(filename)
+        # The same image may already be stored
+        if not await anyio.to_thread.run_sync(is_stored, key):
+            content_type = mimetypes.guess_type(filename)[0]
+            await anyio.to_thread.run_sync(get_storage().put_file, key, Path(temporary), content_type)
+            _stored.add(key)
+    finally:
+        await anyio.Path(temporary).unlink(missing_ok=True)
+
+    schedule_variants(filename)
+    return filename
+
+
+def _write_variants(filename: str) -> None:
+    storage = get_storage()
+    try:
+        with storage.local_copy(original_key(filename)) as source, Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+            for size, pixels in IMAGE_VARIANTS.items():
+                key = variant_key(filename, size)
+                if is_stored(key):
+                    continue
+                variant = image.copy()
+                variant.thumbnail((pixels, pixels), Image.Resampling.LANCZOS)
+                descriptor, temporary = tempfile.mkstemp(prefix="variant-", suffix=".webp")
+                os.close(descriptor)
+                try:
+                    variant.save(temporary, "WEBP", quality=WEBP_QUALITY, method=4)
+                    storage.put_file(key, Path(temporary), "image/webp")
+                finally:
+                    Path(temporary).unlink(missing_ok=True)
+                _stored.add(key)
+    except Exception:
+        logger.exception("Failed to build image variants for %s", filename)
+    finally:
+        with _pending_lock:
+            _pending.discard(filename)
+
+
+def schedule_variants(filename: str) -> None:
+    """Build the WebP variants of a stored original in the background (once at a time)."""
+    with _pending_lock:
+        if filename in _pending:
+            return
+        _pending.add(filename)
+    _executor.submit(_write_variants, filename)
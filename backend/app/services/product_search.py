@@ -0,0 +1,126 @@
+"""
+Поиск товаров по названию и артикулу.
+
+PostgreSQL: GIN-индексы pg_trgm по products.name и products.sku, которые
+обслуживают ILIKE '%...%'; ранжирование по similarity().
+SQLite: теневая таблица FTS5 (products_fts, токенизатор trigram) с внешним
+содержимым, синхронизируется триггерами на вставку, изменение и удаление
+товаров; ранжирование по bm25().
+
+В обоих случаях точное совпадение артикула и совпадение по началу артикула
+поднимаются в начало выдачи. Запросы короче трех символов не используют
+индекс (триграммы) и выполняются обычным ILIKE.
+"""
+from sqlalchemy import Float, Integer, case, func, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+
+MIN_INDEXED_QUERY_LENGTH = 3
+
+_SQLITE_SETUP = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, sku, content='products', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, sku ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku); "
+    "INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku); END",
+)
+
+_POSTGRESQL_INDEXES = ("ix_products_name_trgm", "ix_products_sku_trgm")
+
+_POSTGRESQL_SETUP = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_products_sku_trgm ON products USING gin (sku gin_trgm_ops)",
+)
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the search index structures if they do not exist yet."""
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+            ).first()
+            for statement in _SQLITE_SETUP:
+                conn.execute(text(statement))
+            if not exists:
+                # Index products that were created before the table existed
+                conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            for statement in _POSTGRESQL_SETUP:
+                conn.execute(text(statement))
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    """Rebuild the search index from the products table."""
+    ensure_search_index(engine)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('optimize')"))
+        elif engine.dialect.name == "postgresql":
+            for index_name in _POSTGRESQL_INDEXES:
+                conn.execute(text(f"REINDEX INDEX {index_name}"))
+
+
+def _sku_boost(search: str):
+    return case(
+        (func.lower(Product.sku) == search.lower(), 3.0),
+        (Product.sku.ilike(f"{search}%"), 2.0),
+        else_=0.0
+    )
+
+
+def _ilike_condition(search: str):
+    return or_(
+        Product.name.ilike(f"%{search}%"),
+        Product.sku.ilike(f"%{search}%")
+    )
+
+
+def _ilike_matches(search: str):
+    return select(
+        Product.id.label("id"),
+        _sku_boost(search).label("score")
+    ).where(_ilike_condition(search))
+
+
+def _postgresql_matches(search: str):
+    # ILIKE is served by the gin_trgm_ops indexes
+    return select(
+        Product.id.label("id"),
+        (_sku_boost(search) + func.similarity(Product.name, search)).label("score")
+    ).where(_ilike_condition(search))
+
+
+def _sqlite_matches(search: str):
+    phrase = '"' + search.replace('"', '""') + '"'
+    fts = text(
+        "SELECT rowid AS id, bm25(products_fts, 1.0, 2.0) AS rank "
+        "FROM products_fts WHERE products_fts MATCH :phrase"
+    ).bindparams(phrase=phrase).columns(id=Integer, rank=Float).subquery("fts")
+    # bm25() is negative, better matches are more negative
+    return select(
+        fts.c.id.label("id"),
+        (_sku_boost(search) - fts.c.rank).label("score")
+    ).join(Product, Product.id == fts.c.id)
+
+
+def ranked_product_matches(db: Session, search: str):
+    """Subquery of (id, score) for products matching `search`; higher score ranks first."""
+    search = search.strip()
+    if len(search) < MIN_INDEXED_QUERY_LENGTH:
+        return _ilike_matches(search).subquery("product_matches")
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return _sqlite_matches(search).subquery("product_matches")
+    if dialect == "postgresql":
+        return _postgresql_matches(search).subquery("product_matches")
+    return _ilike_matches(search).subquery("product_matches")
@@ -0,0 +1,205 @@
+"""
+Приемка товара по заказам поставщикам.
+
+Принимать можно частично: для строки заявки указывается полученное количество
+и склад, одну строку можно разложить по нескольким складам. Одним вызовом
+принимаются сразу несколько заявок (контейнер с товаром по десяткам заявок).
+Число запросов не зависит от числа заявок и строк: заявки и строки читаются
+двумя запросами, полученное количество строк записывается одним условным
+UPDATE, а остатки пополняются одним INSERT ... ON CONFLICT сервиса stock.
+
+Заявка переходит в статус received, когда по всем строкам получено заказанное
+количество. Заявки с ошибками (не найдена, отменена, принимается больше, чем
+осталось получить) не мешают остальным: для каждой заявки возвращается свой
+результат.
+"""
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+
+from app.models.purchase_order import PurchaseOrder, PurchaseOrderStatus
+from app.models.purchase_order_item import PurchaseOrderItem
+from app.models.warehouse import Warehouse
+from app.schemas.purchase_order import PurchaseOrderReceipt
+from app.services.dashboard import purchase_order_state, record_purchase_order_changes
+from app.services.stock import StockKey, receive_stock
+
+# Error codes of per-order results
+NOT_FOUND = "not_found"
+INVALID_TRANSITION = "invalid_transition"
+INVALID_RECEIPT = "invalid_receipt"
+
+
+class _ReceiptError(Exception):
+    pass
+
+
+def _result(order_id: int, order_status: Optional[PurchaseOrderStatus], error: Optional[str] = None,
+            detail: Optional[str] = None) -> dict:
+    return {
+        "purchase_order_id": order_id,
+        "ok": error is None,
+        "status": order_status.value if order_status else None,
+        "error": error,
+        "detail": detail
+    }
+
+
+def _outstanding(item) -> Decimal:
+    return Decimal(str(item.quantity)) - Decimal(str(item.received_quantity or 0))
+
+
+def _plan(receipt: PurchaseOrderReceipt, items: list, warehouses: set,
+          default_warehouse_id: Optional[int]) -> Tuple[Dict[int, Decimal], Dict[StockKey, Decimal]]:
+    """Received quantity per order line and per (product, warehouse) of one receipt."""
+    by_id = {item.id: item for item in items}
+    lines = receipt.lines
+    if lines is None:
+        lines = [
+            {"item": item, "quantity": _outstanding(item), "warehouse_id": None}
+            for item in items if _outstanding(item) > 0
+        ]
+    else:
+        resolved = []
+        for line in lines:
+            if line.item_id is not None:
+                item = by_id.get(line.item_id)
+            else:
+                # The first line of the product that still expects goods
+                candidates = [item for item in items if item.product_id == line.product_id]
+                item = next((item for item in candidates if _outstanding(item) > 0), candidates[0] if candidates else None)
+            if item is None:
+                reference = f"ID {line.item_id}" if line.item_id is not None else f"для товара ID {line.product_id}"
+                raise _ReceiptError(f"Строка заявки {reference} не найдена")
+            resolved.append({"item": item, "quantity": line.quantity, "warehouse_id": line.warehouse_id})
+        lines = resolved
+    if not lines:
+        raise _ReceiptError("По заявке нечего принимать")
+
+    received: Dict[int, Decimal] = {}
+    stock: Dict[StockKey, Decimal] = {}
+    for line in lines:
+        item = line["item"]
+        warehouse_id = line["warehouse_id"] or receipt.warehouse_id or default_warehouse_id
+        if not warehouse_id:
+            raise _ReceiptError(f"Не указан склад для товара ID {item.product_id}")
+        if warehouse_id not in warehouses:
+            raise _ReceiptError(f"Склад ID {warehouse_id} не найден")
+        received[item.id] = received.get(item.id, Decimal("0")) + line["quantity"]
+        if received[item.id] > _outstanding(item):
+            raise _ReceiptError(
+                f"Для товара ID {item.product_id} осталось получить {_outstanding(item)}, "
+                f"принимается {received[item.id]}"
+            )
+        key = (item.product_id, warehouse_id)
+        stock[key] = stock.get(key, Decimal("0")) + line["quantity"]
+    return received, stock
+
+
+def receive_purchase_orders(
+    db: Session,
+    receipts: List[PurchaseOrderReceipt],
+    warehouse_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> List[dict]:
+    """Receive goods for several purchase orders; returns one result per receipt.
+
+    `warehouse_id` is used for receipts and lines without a warehouse of
+    their own. The caller commits.
+    """
+    order_ids = [receipt.purchase_order_id for receipt in receipts]
+    orders = {
+        order.id: order
+        for order in db.query(PurchaseOrder).filter(PurchaseOrder.id.in_(order_ids))
+        .order_by(PurchaseOrder.id).with_for_update()
+    }
+    items: Dict[int, list] = {order_id: [] for order_id in orders}
+    for item in db.query(
+        PurchaseOrderItem.id, PurchaseOrderItem.purchase_order_id, PurchaseOrderItem.product_id,
+        PurchaseOrderItem.quantity, PurchaseOrderItem.received_quantity
+    ).filter(PurchaseOrderItem.purchase_order_id.in_(list(orders))).order_by(PurchaseOrderItem.id):
+        items[item.purchase_order_id].append(item)
+
+    warehouse_ids = {warehouse_id, *(receipt.warehouse_id for receipt in receipts)}
+    warehouse_ids |= {line.warehouse_id for receipt in receipts for line in receipt.lines or ()}
+    warehouse_ids.discard(None)
+    warehouses = set()
+    if warehouse_ids:
+        warehouses = {row.id for row in db.query(Warehouse.id).filter(Warehouse.id.in_(warehouse_ids))}
+
+    results: List[dict] = []
+    received: Dict[int, Decimal] = {}
+    stock: Dict[int, Dict[StockKey, Decimal]] = {}
+    completed: List[int] = []
+    seen = set()
+    for receipt in receipts:
+        order_id = receipt.purchase_order_id
+        order = orders.get(order_id)
+        if order is None:
+            results.append(_result(order_id, None, NOT_FOUND, "Заявка на закупку не найдена"))
+            continue
+        if order.status == PurchaseOrderStatus.RECEIVED:
+            results.append(_result(order_id, order.status, INVALID_TRANSITION, "Заявка уже получена"))
+            continue
+        if order.status == PurchaseOrderStatus.CANCELLED:
+            results.append(_result(order_id, order.status, INVALID_TRANSITION, "Отмененную заявку нельзя получить"))
+            continue
+        if order_id in seen:
+            results.append(_result(order_id, order.status, INVALID_RECEIPT, "Заявка указана в приемке несколько раз"))
+            continue
+        try:
+            order_received, order_stock = _plan(receipt, items[order_id], warehouses, warehouse_id)
+        except _ReceiptError as e:
+            results.append(_result(order_id, order.status, INVALID_RECEIPT, str(e)))
+            continue
+
+        seen.add(order_id)
+        received.update(order_received)
+        stock[order_id] = order_stock
+        if all(_outstanding(item) == order_received.get(item.id, Decimal("0")) for item in items[order_id]):
+            completed.append(order_id)
+        results.append(None)
+
+    if received:
+        # Guarded by the outstanding quantity, so a concurrent receipt of the
+        # same lines cannot push received_quantity past the ordered quantity
+        per_item = case(received, value=PurchaseOrderItem.id)
+        result = db.execute(
+            update(PurchaseOrderItem)
+            .where(
+                PurchaseOrderItem.id.in_(list(received)),
+                func.round(PurchaseOrderItem.quantity - func.coalesce(PurchaseOrderItem.received_quantity, 0), 3) >= per_item
+            )
+            .values(received_quantity=func.round(func.coalesce(PurchaseOrderItem.received_quantity, 0) + per_item, 3))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(received):
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Заявка изменилась во время приемки, повторите запрос"
+            )
+
+    receive_stock(db, stock, "purchase_order", user_id)
+
+    if completed:
+        db.execute(
+            update(PurchaseOrder)
+            .where(PurchaseOrder.id.in_(completed))
+            .values(status=PurchaseOrderStatus.RECEIVED)
+            .execution_options(synchronize_session=False)
+        )
+        record_purchase_order_changes(db, [
+            (purchase_order_state(orders[order_id]), (PurchaseOrderStatus.RECEIVED,) + purchase_order_state(orders[order_id])[1:])
+            for order_id in completed
+        ])
+
+    for index, receipt in enumerate(receipts):
+        if results[index] is None:
+            order_id = receipt.purchase_order_id
+            order_status = PurchaseOrderStatus.RECEIVED if order_id in completed else orders[order_id].status
+            results[index] = _result(order_id, order_status)
+    return results
@@ -0,0 +1,122 @@
+"""
+Поиск товаров с низким остатком и расчет рекомендуемого объема закупки.
+
+Все вычисления выполняются в SQL: остатки суммируются по складам
+(quantity - reserved_quantity), открытые заявки на закупку учитываются как
+товар в пути. Кандидаты отбираются по частичному индексу
+ix_products_reorder_level (только товары с reorder_level > 0), и оба
+агрегата группируют строки только этих товаров, а не всю таблицу остатков.
+"""
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.inventory import Inventory
+from app.models.product import Product
+from app.models.purchase_order import PurchaseOrder, PurchaseOrderStatus
+from app.models.purchase_order_item import PurchaseOrderItem
+
+OPEN_PURCHASE_ORDER_STATUSES = (PurchaseOrderStatus.PENDING, PurchaseOrderStatus.ORDERED)
+
+
+def available_quantity():
+    """Stock of an inventory row that is not reserved by orders."""
+    return Inventory.quantity - func.coalesce(Inventory.reserved_quantity, 0)
+
+
+def _available_stock(warehouse_id: Optional[int] = None):
+    query = select(
+        Inventory.product_id,
+        func.sum(available_quantity()).label("available")
+    ).join(
+        Product, Inventory.product_id == Product.id
+    ).where(
+        Product.reorder_level > 0
+    ).group_by(Inventory.product_id)
+    if warehouse_id:
+        query = query.where(Inventory.warehouse_id == warehouse_id)
+    return query.subquery()
+
+
+def _on_order():
+    return select(
+        PurchaseOrderItem.product_id,
+        func.sum(
+            PurchaseOrderItem.quantity - func.coalesce(PurchaseOrderItem.received_quantity, 0)
+        ).label("on_order")
+    ).join(
+        PurchaseOrder, PurchaseOrderItem.purchase_order_id == PurchaseOrder.id
+    ).join(
+        Product, PurchaseOrderItem.product_id == Product.id
+    ).where(
+        PurchaseOrder.status.in_(OPEN_PURCHASE_ORDER_STATUSES),
+        Product.reorder_level > 0
+    ).group_by(PurchaseOrderItem.product_id).subquery()
+
+
+def _to_decimal(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(Decimal("0.001"))
+
+
+def find_low_stock(
+    db: Session,
+    warehouse_id: Optional[int] = None,
+    include_on_order: bool = False,
+    active_only: bool = False
+) -> List[dict]:
+    """Products whose available stock is at or below reorder_level.
+
+    Products without any inventory row count as having no stock; with
+    warehouse_id only products stocked in that warehouse are considered.
+
+    With include_on_order, open purchase-order quantities count towards stock,
+    so products that are already being replenished are left out.
+
+    suggested_quantity tops projected stock (available + on order) up to
+    reorder_level + reorder_quantity.
+    """
+    stock = _available_stock(warehouse_id)
+    incoming = _on_order()
+    available = func.round(func.coalesce(stock.c.available, 0), 3)
+    on_order = func.round(func.coalesce(incoming.c.on_order, 0), 3)
+    compared = available + on_order if include_on_order else available
+
+    query = select(
+        Product.id,
+        Product.sku,
+        Product.name,
+        Product.unit,
+        Product.reorder_level,
+        Product.reorder_quantity,
+        available.label("available"),
+        on_order.label("on_order")
+    ).join(
+        stock, stock.c.product_id == Product.id, isouter=not warehouse_id
+    ).outerjoin(
+        incoming, incoming.c.product_id == Product.id
+    ).where(
+        Product.reorder_level > 0,
+        compared <= Product.reorder_level
+    )
+    if active_only:
+        query = query.where(Product.is_active == True)
+
+    items = []
+    for row in db.execute(query.order_by(available - Product.reorder_level, Product.id)):
+        available_qty = _to_decimal(row.available)
+        on_order_qty = _to_decimal(row.on_order)
+        target = Decimal(row.reorder_level) + Decimal(row.reorder_quantity or 0)
+        items.append({
+            "product_id": row.id,
+            "sku": row.sku,
+            "name": row.name,
+            "unit": row.unit,
+            "reorder_level": row.reorder_level,
+            "reorder_quantity": row.reorder_quantity or 0,
+            "available": available_qty,
+            "on_order": on_order_qty,
+            "suggested_quantity": max(target - available_qty - on_order_qty, Decimal("0.000"))
+        })
+    return items
@@ -0,0 +1,330 @@
+"""
+Глобальный поиск по клиентам, товарам, поставщикам, лидам и заказам.
+
+Каждая сущность представлена строкой в search_documents (заголовок,
+подзаголовок и текст для поиска). Строки обновляются обработчиками событий
+ORM (after_insert / after_update / after_delete) в той же транзакции, что и
+сама сущность. После изменений в обход ORM (массовый UPDATE, миграция данных)
+индекс перестраивается командой rebuild_search_index.py; массовые вставки
+приложения индексируются явно через index_inserted().
+
+PostgreSQL: GIN-индекс pg_trgm по search_documents.content.
+SQLite: FTS5-таблица search_documents_fts (токенизатор trigram) с внешним
+содержимым, синхронизируется триггерами на search_documents.
+
+Поиск выполняется одним запросом: оконные функции считают количество
+совпадений по каждому типу и отбирают лучшие результаты каждого типа.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, case, delete, event, func, insert, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.customer import Customer
+from app.models.lead import Lead
+from app.models.product import Product
+from app.models.purchase_order import PurchaseOrder
+from app.models.sales_order import SalesOrder
+from app.models.search_document import SearchDocument
+from app.models.supplier import Supplier
+
+MIN_INDEXED_QUERY_LENGTH = 3
+REBUILD_BATCH_SIZE = 1000
+
+# lookup(column, id) -> value of column for the row with that primary key
+Lookup = Callable[[object, Optional[int]], Optional[str]]
+Document = Tuple[str, Optional[str], str]
+
+_SQLITE_SETUP = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5("
+    "title, content, content='search_documents', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_fts_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_fts_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_fts_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO search_documents_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+)
+
+_POSTGRESQL_SETUP = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_content_trgm "
+    "ON search_documents USING gin (content gin_trgm_ops)",
+)
+
+
+def _join(*values) -> str:
+    return " ".join(str(value) for value in values if value)
+
+
+def _customer_document(customer: Customer, lookup: Lookup) -> Document:
+    return (
+        customer.company_name,
+        customer.email or customer.city,
+        _join(customer.company_name, customer.contact_person, customer.email, customer.phone,
+              customer.city, customer.tax_id)
+    )
+
+
+def _product_document(product: Product, lookup: Lookup) -> Document:
+    return product.name, product.sku, _join(product.sku, product.name)
+
+
+def _supplier_document(supplier: Supplier, lookup: Lookup) -> Document:
+    return (
+        supplier.name,
+        supplier.code,
+        _join(supplier.code, supplier.name, supplier.contact_person, supplier.email, supplier.phone, supplier.city)
+    )
+
+
+def _lead_document(lead: Lead, lookup: Lookup) -> Document:
+    customer_name = lookup(Customer.company_name, lead.customer_id)
+    return (
+        customer_name or f"Лид #{lead.id}",
+        lead.source,
+        _join(customer_name, lead.source, lead.notes)
+    )
+
+
+def _sales_order_document(order: SalesOrder, lookup: Lookup) -> Document:
+    customer_name = lookup(Customer.company_name, order.customer_id)
+    return order.order_number, customer_name, _join(order.order_number, customer_name)
+
+
+def _purchase_order_document(order: PurchaseOrder, lookup: Lookup) -> Document:
+    supplier_name = lookup(Supplier.name, order.supplier_id)
+    return order.po_number, supplier_name, _join(order.po_number, supplier_name)
+
+
+# Indexed models: entity type and document builder
+SEARCH_SOURCES = {
+    Customer: ("customer", _customer_document),
+    Product: ("product", _product_document),
+    Supplier: ("supplier", _supplier_document),
+    Lead: ("lead", _lead_document),
+    SalesOrder: ("sales_order", _sales_order_document),
+    PurchaseOrder: ("purchase_order", _purchase_order_document),
+}
+
+ENTITY_TYPES = tuple(entity_type for entity_type, _ in SEARCH_SOURCES.values())
+
+# Documents that embed another entity's name: (name attribute, dependent model, foreign key)
+SEARCH_DEPENDENTS = {
+    Customer: ("company_name", ((Lead, Lead.customer_id), (SalesOrder, SalesOrder.customer_id))),
+    Supplier: ("name", ((PurchaseOrder, PurchaseOrder.supplier_id),)),
+}
+
+
+def _document_row(entity_type: str, entity_id: int, document: Document) -> dict:
+    title, subtitle, content = document
+    return {
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "title": (title or "")[:255],
+        "subtitle": subtitle[:255] if subtitle else None,
+        "content": content
+    }
+
+
+def _connection_lookup(connection) -> Lookup:
+    def lookup(column, row_id):
+        if row_id is None:
+            return None
+        model = column.class_
+        return connection.execute(select(column).where(model.id == row_id)).scalar()
+    return lookup
+
+
+def _delete_document(connection, entity_type: str, entity_id: int) -> None:
+    connection.execute(
+        delete(SearchDocument).where(
+            SearchDocument.entity_type == entity_type,
+            SearchDocument.entity_id == entity_id
+        )
+    )
+
+
+def _write_document(connection, model, entity, lookup: Lookup) -> None:
+    entity_type, build = SEARCH_SOURCES[model]
+    _delete_document(connection, entity_type, entity.id)
+    connection.execute(insert(SearchDocument).values(**_document_row(entity_type, entity.id, build(entity, lookup))))
+
+
+def _index_entity(mapper, connection, target) -> None:
+    lookup = _connection_lookup(connection)
+    _write_document(connection, mapper.class_, target, lookup)
+
+
+def _reindex_dependents(mapper, connection, target) -> None:
+    name_attribute, dependents = SEARCH_DEPENDENTS[mapper.class_]
+    if not inspect(target).attrs[name_attribute].history.has_changes():
+        return
+    lookup = _connection_lookup(connection)
+    for model, foreign_key in dependents:
+        # Builders only read column attributes, so plain rows will do
+        for row in connection.execute(select(model.__table__).where(foreign_key == target.id)):
+            _write_document(connection, model, row, lookup)
+
+
+def _unindex_entity(mapper, connection, target) -> None:
+    entity_type, _ = SEARCH_SOURCES[mapper.class_]
+    _delete_document(connection, entity_type, target.id)
+
+
+for _model in SEARCH_SOURCES:
+    event.listen(_model, "after_insert", _index_entity)
+    event.listen(_model, "after_update", _index_entity)
+    event.listen(_model, "after_delete", _unindex_entity)
+
+for _model in SEARCH_DEPENDENTS:
+    event.listen(_model, "after_update", _reindex_dependents)
+
+
+def index_inserted(db: Session, model, rows: Iterable) -> None:
+    """Index entities inserted with a Core INSERT, which bypasses the ORM events.
+
+    `rows` need `id` and the attributes read by the model's document builder.
+    """
+    entity_type, build = SEARCH_SOURCES[model]
+    connection_lookup = _connection_lookup(db.connection())
+    names: Dict[Tuple[type, str, int], Optional[str]] = {}
+
+    def lookup(column, row_id):
+        key = (column.class_, column.key, row_id)
+        if key not in names:
+            names[key] = connection_lookup(column, row_id)
+        return names[key]
+
+    documents = [_document_row(entity_type, row.id, build(row, lookup)) for row in rows]
+    if documents:
+        db.execute(insert(SearchDocument), documents)
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the index structures and fill the index on first start."""
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            for statement in _SQLITE_SETUP:
+                conn.execute(text(statement))
+        elif engine.dialect.name == "postgresql":
+            for statement in _POSTGRESQL_SETUP:
+                conn.execute(text(statement))
+        indexed = conn.execute(select(SearchDocument.id).limit(1)).first()
+    if not indexed:
+        rebuild_search_index(engine)
+
+
+def rebuild_search_index(engine: Engine) -> int:
+    """Re-create every search document from the source tables. Returns the document count."""
+    total = 0
+    with Session(bind=engine) as db:
+        names: Dict[Tuple[type, str], Dict[int, str]] = {}
+
+        def lookup(column, row_id):
+            if row_id is None:
+                return None
+            key = (column.class_, column.key)
+            if key not in names:
+                names[key] = dict(db.execute(select(column.class_.id, column)).all())
+            return names[key].get(row_id)
+
+        db.execute(delete(SearchDocument))
+        for model, (entity_type, build) in SEARCH_SOURCES.items():
+            batch: List[dict] = []
+            for entity in db.query(model).order_by(model.id).yield_per(REBUILD_BATCH_SIZE):
+                batch.append(_document_row(entity_type, entity.id, build(entity, lookup)))
+                if len(batch) >= REBUILD_BATCH_SIZE:
+                    db.execute(insert(SearchDocument), batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                db.execute(insert(SearchDocument), batch)
+                total += len(batch)
+        db.commit()
+
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO search_documents_fts(search_documents_fts) VALUES ('rebuild')"))
+            conn.execute(text("INSERT INTO search_documents_fts(search_documents_fts) VALUES ('optimize')"))
+    return total
+
+
+def _title_boost(query: str):
+    return case(
+        (func.lower(SearchDocument.title) == query.lower(), 3.0),
+        (SearchDocument.title.ilike(f"{query}%"), 2.0),
+        else_=0.0
+    )
+
+
+def _columns(score):
+    return (
+        SearchDocument.entity_type,
+        SearchDocument.entity_id,
+        SearchDocument.title,
+        SearchDocument.subtitle,
+        score.label("score")
+    )
+
+
+def _matches(db: Session, query: str):
+    if len(query) < MIN_INDEXED_QUERY_LENGTH:
+        return select(*_columns(_title_boost(query))).where(SearchDocument.content.ilike(f"%{query}%"))
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        phrase = '"' + query.replace('"', '""') + '"'
+        fts = text(
+            "SELECT rowid AS id, bm25(search_documents_fts, 2.0, 1.0) AS rank "
+            "FROM search_documents_fts WHERE search_documents_fts MATCH :phrase"
+        ).bindparams(phrase=phrase).columns(id=Integer, rank=Float).subquery("fts")
+        # bm25() is negative, better matches are more negative
+        return select(*_columns(_title_boost(query) - fts.c.rank)).join(fts, fts.c.id == SearchDocument.id)
+    if dialect == "postgresql":
+        # ILIKE is served by the gin_trgm_ops index
+        return select(
+            *_columns(_title_boost(query) + func.similarity(SearchDocument.title, query))
+        ).where(SearchDocument.content.ilike(f"%{query}%"))
+    return select(*_columns(_title_boost(query))).where(SearchDocument.content.ilike(f"%{query}%"))
+
+
+def search(db: Session, query: str, limit: int = 5, types: Optional[Iterable[str]] = None) -> dict:
+    """Best `limit` hits per entity type and the total number of matches per type."""
+    query = query.strip()
+    types = [entity_type for entity_type in (types or ENTITY_TYPES) if entity_type in ENTITY_TYPES]
+    counts = {entity_type: 0 for entity_type in types}
+    if not query or not types:
+        return {"query": query, "counts": counts, "hits": []}
+
+    matches = _matches(db, query).where(SearchDocument.entity_type.in_(types)).subquery("matches")
+    ranked = select(
+        matches,
+        func.count().over(partition_by=matches.c.entity_type).label("type_count"),
+        func.row_number().over(
+            partition_by=matches.c.entity_type,
+            order_by=(matches.c.score.desc(), matches.c.entity_id)
+        ).label("type_rank")
+    ).subquery("ranked")
+
+    rows = db.execute(
+        select(ranked)
+        .where(ranked.c.type_rank <= limit)
+        .order_by(ranked.c.score.desc(), ranked.c.entity_type, ranked.c.entity_id)
+    ).all()
+
+    hits = []
+    for row in rows:
+        counts[row.entity_type] = row.type_count
+        hits.append({
+            "type": row.entity_type,
+            "id": row.entity_id,
+            "title": row.title,
+            "subtitle": row.subtitle,
+            "score": round(float(row.score), 4)
+        })
+    return {"query": query, "counts": counts, "hits": hits}
@@ -0,0 +1,412 @@
+"""
+Сервис резервирования складских остатков.
+
+Все операции работают над набором строк заказа целиком: количество запросов
+к базе не зависит от числа позиций. Отгрузка и снятие резерва принимают
+строки сразу нескольких заказов и выполняются одним UPDATE на всю пачку.
+
+Изменения остатков выполняются условными UPDATE, которые сами проверяют
+доступное количество, поэтому параллельные запросы не могут
+перерезервировать товар. Поступления пополняют остатки
+одним INSERT ... ON CONFLICT, который заодно создает недостающие строки.
+
+Каждое изменение остатков записывается в журнал inventory_movements, а
+балансы в inventory поддерживаются инкрементально теми же UPDATE.
+"""
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, insert, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.inventory import Inventory
+from app.models.inventory_movement import InventoryMovement, MovementType
+from app.models.product import Product
+from app.services.dashboard import record_stock_change
+
+# (product_id, warehouse_id)
+StockKey = Tuple[int, int]
+# reference_id -> {inventory_id: quantity}
+Allocations = Dict[Optional[int], Dict[int, Decimal]]
+
+
+def _rounded(expression):
+    # SQLite stores Numeric as floating point; round to the column scale so
+    # 0.3 - 0.1 compares equal to 0.2 there. No-op on PostgreSQL.
+    return func.round(expression, 3)
+
+
+def _reserved():
+    return func.coalesce(Inventory.reserved_quantity, 0)
+
+
+def _per_row(quantities: Dict[int, Decimal]):
+    return case(quantities, value=Inventory.id)
+
+
+def _movement_rows(
+    movement_type: MovementType,
+    changes: Dict[int, Tuple[Decimal, Decimal]],
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    note: Optional[str] = None
+) -> List[dict]:
+    return [
+        {
+            "inventory_id": inventory_id,
+            "movement_type": movement_type,
+            "quantity_change": quantity_change,
+            "reserved_change": reserved_change,
+            "reference_type": reference_type,
+            "reference_id": reference_id,
+            "note": note,
+            "created_by": user_id
+        }
+        for inventory_id, (quantity_change, reserved_change) in changes.items()
+    ]
+
+
+def _insert_movements(db: Session, rows: List[dict]) -> None:
+    if not rows:
+        return
+    db.execute(insert(InventoryMovement), rows)
+    quantity_changes: Dict[int, Decimal] = {}
+    for row in rows:
+        quantity_changes[row["inventory_id"]] = quantity_changes.get(row["inventory_id"], Decimal("0")) + row["quantity_change"]
+    record_stock_change(db, quantity_changes)
+
+
+def record_movements(
+    db: Session,
+    movement_type: MovementType,
+    changes: Dict[int, Tuple[Decimal, Decimal]],
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    note: Optional[str] = None
+) -> None:
+    """Append ledger rows for {inventory_id: (quantity_change, reserved_change)}."""
+    _insert_movements(db, _movement_rows(movement_type, changes, reference_type, reference_id, user_id, note))
+
+
+def apply_movements(
+    db: Session,
+    movement_type: MovementType,
+    changes: Dict[int, Tuple[Decimal, Decimal]],
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    note: Optional[str] = None
+) -> None:
+    """Apply unconditional balance changes (receipts, adjustments) and log them."""
+    changes = {
+        inventory_id: (quantity_change, reserved_change)
+        for inventory_id, (quantity_change, reserved_change) in changes.items()
+        if quantity_change or reserved_change
+    }
+    if not changes:
+        return
+    quantity_changes = {inventory_id: change[0] for inventory_id, change in changes.items()}
+    reserved_changes = {inventory_id: change[1] for inventory_id, change in changes.items()}
+    db.execute(
+        update(Inventory)
+        .where(Inventory.id.in_(list(changes)))
+        .values(
+            quantity=_rounded(Inventory.quantity + _per_row(quantity_changes)),
+            reserved_quantity=_rounded(_reserved() + _per_row(reserved_changes)),
+            last_updated=func.now()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    record_movements(db, movement_type, changes, reference_type, reference_id, user_id, note)
+
+
+def receive_stock(
+    db: Session,
+    receipts: Dict[Optional[int], Dict[StockKey, Decimal]],
+    reference_type: Optional[str] = None,
+    user_id: Optional[int] = None
+) -> None:
+    """Add {reference_id: {(product_id, warehouse_id): quantity}} to stock.
+
+    One INSERT ... ON CONFLICT (product_id, warehouse_id) DO UPDATE creates the
+    missing inventory rows and adds the quantities to existing ones; the ledger
+    gets a row per reference and inventory row.
+    """
+    totals: Dict[StockKey, Decimal] = {}
+    for quantities in receipts.values():
+        for key, quantity in quantities.items():
+            totals[key] = totals.get(key, Decimal("0")) + Decimal(str(quantity))
+    if not totals:
+        return
+
+    upsert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    # Sorted, so concurrent receipts lock the rows in the same order
+    statement = upsert(Inventory).values([
+        {"product_id": product_id, "warehouse_id": warehouse_id, "quantity": quantity, "reserved_quantity": Decimal("0")}
+        for (product_id, warehouse_id), quantity in sorted(totals.items())
+    ])
+    rows = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[Inventory.product_id, Inventory.warehouse_id],
+            set_={
+                "quantity": _rounded(Inventory.quantity + statement.excluded.quantity),
+                "last_updated": func.now()
+            }
+        ).returning(Inventory.id, Inventory.product_id, Inventory.warehouse_id)
+    ).all()
+    inventory_ids = {(row.product_id, row.warehouse_id): row.id for row in rows}
+
+    movements = []
+    for reference_id, quantities in receipts.items():
+        movements += _movement_rows(
+            MovementType.RECEIVE,
+            {inventory_ids[key]: (Decimal(str(quantity)), Decimal("0")) for key, quantity in quantities.items()},
+            reference_type, reference_id, user_id
+        )
+    _insert_movements(db, movements)
+
+
+def group_stock_lines(lines: Iterable[Tuple[int, int, Decimal]]) -> Dict[StockKey, Decimal]:
+    """Sum (product_id, warehouse_id, quantity) lines per product and warehouse."""
+    grouped: Dict[StockKey, Decimal] = {}
+    for product_id, warehouse_id, quantity in lines:
+        key = (product_id, warehouse_id)
+        grouped[key] = grouped.get(key, Decimal("0")) + Decimal(str(quantity))
+    return grouped
+
+
+def _load_stock(db: Session, requested: Dict[StockKey, Decimal]):
+    product_ids = {product_id for product_id, _ in requested}
+    products = {
+        row.id: row
+        for row in db.query(Product.id, Product.name, Product.unit).filter(Product.id.in_(product_ids))
+    }
+    rows = db.query(
+        Inventory.id,
+        Inventory.product_id,
+        Inventory.warehouse_id,
+        Inventory.quantity,
+        Inventory.reserved_quantity
+    ).filter(
+        tuple_(Inventory.product_id, Inventory.warehouse_id).in_(list(requested))
+    ).all()
+    inventory = {(row.product_id, row.warehouse_id): row for row in rows}
+    return products, inventory
+
+
+def _check_availability(requested: Dict[StockKey, Decimal], products, inventory) -> None:
+    for (product_id, warehouse_id), quantity in requested.items():
+        product = products.get(product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Товар с ID {product_id} не найден"
+            )
+
+        row = inventory.get((product_id, warehouse_id))
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Товар '{product.name}' отсутствует на складе ID {warehouse_id}"
+            )
+
+        available = Decimal(str(row.quantity)) - Decimal(str(row.reserved_quantity or 0))
+        if available < quantity:
+            unit = product.unit or 'шт'
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Недостаточно товара '{product.name}' на складе. Доступно: {available} {unit}, требуется: {quantity} {unit}"
+            )
+
+
+def reserve_stock(
+    db: Session,
+    lines: Iterable[Tuple[int, int, Decimal]],
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> None:
+    """Reserve stock for order lines.
+
+    Availability is checked up front for a readable error, then enforced by a
+    single guarded UPDATE that only touches rows which still have enough free
+    stock. If a concurrent request took the stock in between, the rowcount is
+    short: the transaction is rolled back and the shortage reported.
+    """
+    requested = group_stock_lines(lines)
+    if not requested:
+        return
+
+    products, inventory = _load_stock(db, requested)
+    _check_availability(requested, products, inventory)
+
+    quantities = {inventory[key].id: quantity for key, quantity in requested.items()}
+    if not reserve_allocations(db, {reference_id: quantities}, reference_type, user_id):
+        db.rollback()
+        products, inventory = _load_stock(db, requested)
+        _check_availability(requested, products, inventory)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Остатки изменились во время резервирования, повторите запрос"
+        )
+
+
+def reserve_allocations(
+    db: Session,
+    allocations: Allocations,
+    reference_type: Optional[str] = None,
+    user_id: Optional[int] = None
+) -> bool:
+    """Reserve stock of several references in one guarded UPDATE.
+
+    Returns False, without writing the ledger, if some row no longer has
+    enough free stock for its total; the caller must roll back then.
+    """
+    totals = _totals(allocations)
+    if not totals:
+        return True
+    result = db.execute(
+        update(Inventory)
+        .where(
+            Inventory.id.in_(list(totals)),
+            _rounded(Inventory.quantity - _reserved()) >= _per_row(totals)
+        )
+        .values(reserved_quantity=_rounded(_reserved() + _per_row(totals)))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(totals):
+        return False
+
+    movements = []
+    for reference_id, quantities in allocations.items():
+        movements += _movement_rows(
+            MovementType.RESERVE,
+            {inventory_id: (Decimal("0"), quantity) for inventory_id, quantity in quantities.items()},
+            reference_type, reference_id, user_id
+        )
+    _insert_movements(db, movements)
+    return True
+
+
+def find_inventory_rows(db: Session, product_ids: Iterable[int], warehouse_id: Optional[int] = None) -> Dict[int, int]:
+    """Map product_id to the inventory row id used for settlement.
+
+    Uses the given warehouse, otherwise the first inventory row of each product.
+    """
+    query = db.query(Inventory.id, Inventory.product_id).filter(Inventory.product_id.in_(set(product_ids)))
+    if warehouse_id:
+        query = query.filter(Inventory.warehouse_id == warehouse_id)
+
+    rows: Dict[int, int] = {}
+    for row in query.order_by(Inventory.id):
+        rows.setdefault(row.product_id, row.id)
+    return rows
+
+
+def _totals(allocations: Allocations) -> Dict[int, Decimal]:
+    totals: Dict[int, Decimal] = {}
+    for quantities in allocations.values():
+        for inventory_id, quantity in quantities.items():
+            totals[inventory_id] = totals.get(inventory_id, Decimal("0")) + quantity
+    return totals
+
+
+def release_reserved(
+    db: Session,
+    allocations: Allocations,
+    reference_type: Optional[str] = None,
+    user_id: Optional[int] = None
+) -> List[int]:
+    """Release reservations of several references in one UPDATE.
+
+    Rows whose reserved quantity is smaller than the total requested release
+    are left untouched. Returns the ids of the rows that were released.
+    """
+    totals = _totals(allocations)
+    if not totals:
+        return []
+    released = db.execute(
+        update(Inventory)
+        .where(
+            Inventory.id.in_(list(totals)),
+            _rounded(_reserved()) >= _per_row(totals)
+        )
+        .values(reserved_quantity=_rounded(_reserved() - _per_row(totals)))
+        .returning(Inventory.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    movements = []
+    for reference_id, quantities in allocations.items():
+        movements += _movement_rows(
+            MovementType.RELEASE,
+            {inventory_id: (Decimal("0"), -quantity) for inventory_id, quantity in quantities.items() if inventory_id in released},
+            reference_type, reference_id, user_id
+        )
+    _insert_movements(db, movements)
+    return released
+
+
+def release_stock(
+    db: Session,
+    quantities: Dict[int, Decimal],
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> List[int]:
+    """Release reservations per inventory row id (see release_reserved)."""
+    return release_reserved(db, {reference_id: quantities}, reference_type, user_id)
+
+
+def ship_reserved(
+    db: Session,
+    allocations: Allocations,
+    reference_type: Optional[str] = None,
+    user_id: Optional[int] = None
+) -> None:
+    """Deduct shipped quantities of several references from stock and reservations in one UPDATE."""
+    totals = _totals(allocations)
+    if not totals:
+        return
+    result = db.execute(
+        update(Inventory)
+        .where(
+            Inventory.id.in_(list(totals)),
+            _rounded(_reserved()) >= _per_row(totals)
+        )
+        .values(
+            quantity=_rounded(Inventory.quantity - _per_row(totals)),
+            reserved_quantity=_rounded(_reserved() - _per_row(totals))
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(totals):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Недостаточно зарезервированного товара для заказа"
+        )
+
+    movements = []
+    for reference_id, quantities in allocations.items():
+        movements += _movement_rows(
+            MovementType.SHIP,
+            {inventory_id: (-quantity, -quantity) for inventory_id, quantity in quantities.items()},
+            reference_type, reference_id, user_id
+        )
+    _insert_movements(db, movements)
+
+
+def ship_stock(
+    db: Session,
+    quantities: Dict[int, Decimal],
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> None:
+    """Deduct shipped quantities from stock and reservations per inventory row id."""
+    ship_reserved(db, {reference_id: quantities}, reference_type, user_id)
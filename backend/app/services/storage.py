@@ -0,0 +1,165 @@
+"""
+Хранилище загруженных файлов.
+
+Файлы адресуются ключами вида "products/<имя>". Реализации:
+
+- LocalStorage - каталог UPLOAD_DIR на диске процесса (разработка, одна
+  реплика);
+- S3Storage - бакет S3 или S3-совместимое хранилище (MinIO, локальная
+  проверка через moto). Файлы крупнее S3_MULTIPART_THRESHOLD_MB загружаются
+  частями, а читают их клиенты напрямую из хранилища по публичному или
+  подписанному URL, минуя процесс API.
+
+Хранилище выбирается настройкой STORAGE_BACKEND; boto3 нужен только для s3.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.config import settings
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class Storage(ABC):
+    """Put, read and link files by key."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put_file(self, key: str, source: Path, content_type: Optional[str] = None) -> None:
+        """Store a local file under `key`; the source file is moved, not copied."""
+
+    @abstractmethod
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        """A local path with the file content for the duration of the block."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path to serve the file from this process, None if clients fetch it from url()."""
+        return None
+
+    def url(self, key: str) -> Optional[str]:
+        """URL clients can download the file from directly, None if served by the API."""
+        return None
+
+    def url_expires_in(self) -> Optional[int]:
+        """Seconds url() links stay valid, None if they do not expire."""
+        return None
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key).exists()
+
+    def put_file(self, key: str, source: Path, content_type: Optional[str] = None) -> None:
+        target = self.local_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic on the same filesystem; readers never see a partial file
+        temporary = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}")
+        shutil.move(str(source), temporary)
+        os.replace(temporary, target)
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        yield self.local_path(key)
+
+    def delete(self, key: str) -> None:
+        self.local_path(key).unlink(missing_ok=True)
+
+
+class S3Storage(Storage):
+    def __init__(self):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        if not settings.S3_BUCKET:
+            raise RuntimeError("S3_BUCKET is required for STORAGE_BACKEND=s3")
+        self.bucket = settings.S3_BUCKET
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+        )
+        threshold = settings.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024
+        self.transfer_config = TransferConfig(multipart_threshold=threshold, multipart_chunksize=threshold)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put_file(self, key: str, source: Path, content_type: Optional[str] = None) -> None:
+        # Keys are content-addressed, so the objects never change
+        extra_args = {"CacheControl": IMMUTABLE_CACHE_CONTROL}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        self.client.upload_file(str(source), self.bucket, key, ExtraArgs=extra_args, Config=self.transfer_config)
+        Path(source).unlink(missing_ok=True)
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        with tempfile.TemporaryDirectory(prefix="storage-") as directory:
+            path = Path(directory) / Path(key).name
+            self.client.download_file(self.bucket, key, str(path), Config=self.transfer_config)
+            yield path
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url_expires_in(self) -> Optional[int]:
+        return None if settings.S3_PUBLIC_BASE_URL else settings.S3_PRESIGNED_URL_TTL_SECONDS
+
+    def url(self, key: str) -> str:
+        if settings.S3_PUBLIC_BASE_URL:
+            return f"{settings.S3_PUBLIC_BASE_URL.rstrip('/')}/{key}"
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=settings.S3_PRESIGNED_URL_TTL_SECONDS
+        )
+
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    """The storage selected by STORAGE_BACKEND, created on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if settings.STORAGE_BACKEND == "s3":
+                    _storage = S3Storage()
+                elif settings.STORAGE_BACKEND == "local":
+                    _storage = LocalStorage(Path(settings.UPLOAD_DIR))
+                else:
+                    raise RuntimeError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+    return _storage
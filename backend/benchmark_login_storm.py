@@ -0,0 +1,102 @@
+"""
+Login storm benchmark: fire many concurrent logins (bcrypt at BCRYPT_ROUNDS)
+and measure how other requests fare meanwhile - GET /health on the event loop
+and GET /api/customers on the request threadpool.
+
+With bcrypt awaited on the hashing pool (PASSWORD_HASH_WORKERS threads) the
+probes stay fast however many logins wait; if logins held request threads
+while hashing, /api/customers would stall once they outnumber THREADPOOL_SIZE.
+
+Runs in process against the configured database (httpx ASGI transport), so
+the numbers exclude network and uvicorn.
+
+Usage: python benchmark_login_storm.py <username> <password> [logins] [probe interval ms]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import anyio.to_thread
+import httpx
+
+from app.config import settings
+from app.core.security import get_password_hash_stats
+from app.main import app
+
+
+def summary(samples) -> str:
+    if not samples:
+        return "no samples"
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (
+        f"{len(ordered):>5} requests  p50 {statistics.median(ordered):8.1f} ms  "
+        f"p99 {p99:8.1f} ms  max {ordered[-1]:8.1f} ms"
+    )
+
+
+async def timed_get(client, path, headers=None) -> float:
+    started_at = time.perf_counter()
+    response = await client.get(path, headers=headers)
+    response.raise_for_status()
+    return (time.perf_counter() - started_at) * 1000
+
+
+async def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    username, password = sys.argv[1], sys.argv[2]
+    logins = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    interval = (int(sys.argv[4]) if len(sys.argv) > 4 else 5) / 1000
+
+    # Same threadpool size as the lifespan hook sets under uvicorn
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    print(f"🔐 Logins: {logins}, bcrypt rounds: {settings.BCRYPT_ROUNDS}, "
+          f"hash workers: {settings.PASSWORD_HASH_WORKERS}, threadpool: {settings.THREADPOOL_SIZE}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        credentials = {"username": username, "password": password}
+        response = await client.post("/api/auth/login", data=credentials)
+        if response.status_code != 200:
+            print(f"❌ Login failed: {response.status_code} {response.text}")
+            sys.exit(1)
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        login_times = []
+        probes = {"/health": [], "/api/customers/?limit=10": []}
+        storm_over = asyncio.Event()
+
+        async def login():
+            started_at = time.perf_counter()
+            response = await client.post("/api/auth/login", data=credentials)
+            response.raise_for_status()
+            login_times.append((time.perf_counter() - started_at) * 1000)
+
+        async def probe(path):
+            while not storm_over.is_set():
+                probes[path].append(await timed_get(client, path, headers))
+                await asyncio.sleep(interval)
+
+        probe_tasks = [asyncio.create_task(probe(path)) for path in probes]
+        started_at = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started_at
+        storm_over.set()
+        await asyncio.gather(*probe_tasks)
+
+    print(f"\n⏱️  Storm took {elapsed:.1f}s")
+    print(f"   logins                    {summary(login_times)}")
+    for path, samples in probes.items():
+        print(f"   {path:<25} {summary(samples)}")
+    print(f"\n📊 Hashing pool: {get_password_hash_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Compare JSON encoding of the large list responses before and after orjson and
+compression: encode time and bytes on the wire (identity, gzip, brotli) for
+/api/inventory, /api/orders?view=list and /api/purchase-orders, using rows of
+the configured database.
+
+"before" is FastAPI's default path for these handlers (jsonable_encoder and
+json.dumps), "after" is app.core.responses.
+
+Usage: python benchmark_responses.py [page size] [repeats]
+"""
+import gzip
+import json
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from app.config import settings
+from app.core.compression import brotli
+from app.core.responses import dumps
+from app.database import SessionLocal
+from app.models import Customer, OrderItem, Product, PurchaseOrder, PurchaseOrderItem, SalesOrder, Supplier
+from app.routers.inventory import _inventory_list_query, _inventory_row
+from app.routers.orders import ORDER_LIST_COLUMNS, ORDER_LIST_PRODUCT_COLUMNS
+from app.schemas.order import SalesOrderListEntry
+from app.schemas.purchase_order import PurchaseOrder as PurchaseOrderSchema
+
+
+def inventory_page(db, limit):
+    query = _inventory_list_query(db, warehouse_id=None, category_id=None, low_stock=False, search=None)
+    return [_inventory_row(row) for row in query.limit(limit)]
+
+
+def orders_page(db, limit):
+    orders = db.query(SalesOrder).options(
+        load_only(*ORDER_LIST_COLUMNS),
+        joinedload(SalesOrder.customer).load_only(Customer.id, Customer.company_name),
+        selectinload(SalesOrder.items).selectinload(OrderItem.product).load_only(*ORDER_LIST_PRODUCT_COLUMNS)
+    ).order_by(SalesOrder.created_at.desc(), SalesOrder.id.desc()).limit(limit).all()
+    return [SalesOrderListEntry.model_validate(order) for order in orders]
+
+
+def purchase_orders_page(db, limit):
+    orders = db.query(PurchaseOrder).options(
+        joinedload(PurchaseOrder.supplier),
+        selectinload(PurchaseOrder.items).selectinload(PurchaseOrderItem.product)
+    ).order_by(PurchaseOrder.created_at.desc(), PurchaseOrder.id.desc()).limit(limit).all()
+    return [PurchaseOrderSchema.model_validate(order) for order in orders]
+
+
+def encode_before(content) -> bytes:
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def timed(encode, content, repeats):
+    """Median encode time in milliseconds and the encoded body."""
+    samples = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        body = encode(content)
+        samples.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(samples), body
+
+
+def wire_sizes(body: bytes) -> str:
+    sizes = [f"{len(body):>9,} B", f"gzip {len(gzip.compress(body, settings.GZIP_COMPRESS_LEVEL)):>8,} B"]
+    if brotli is not None:
+        sizes.append(f"br {len(brotli.compress(body, quality=settings.BROTLI_QUALITY)):>8,} B")
+    return "  ".join(sizes)
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    db_url = settings.DATABASE_URL
+    print(f"📊 Database: {db_url.split('@')[-1] if '@' in db_url else db_url}")
+    print(f"📏 Page size: {limit}, repeats: {repeats}")
+    if brotli is None:
+        print("⚠️  brotli is not installed, only gzip is measured")
+
+    endpoints = [
+        ("/api/inventory", inventory_page),
+        ("/api/orders?view=list", orders_page),
+        ("/api/purchase-orders", purchase_orders_page),
+    ]
+    db = SessionLocal()
+    try:
+        for path, build in endpoints:
+            content = build(db, limit)
+            print(f"\n🔎 {path} ({len(content)} rows)")
+            if not content:
+                print("   (no rows, skipped)")
+                continue
+            before_ms, before_body = timed(encode_before, content, repeats)
+            after_ms, after_body = timed(dumps, content, repeats)
+            print(f"   before: {before_ms:8.2f} ms  {wire_sizes(before_body)}")
+            print(f"   after:  {after_ms:8.2f} ms  {wire_sizes(after_body)}")
+            print(f"   ✅ encode {before_ms / after_ms:.1f}x faster")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -11,13 +11,15 @@ load_dotenv()
 
 from app.database import engine, Base
 from app.config import settings
+from app.services import product_search, search_index, dashboard, numbering, order_status
 
 # Import all models to ensure they are registered with Base
 # This ensures all SQLAlchemy models are loaded and registered
 from app.models import (
     User, Customer, Contact, Category, Product, Warehouse,
-    Inventory, Supplier, PurchaseOrder, PurchaseOrderItem,
-    SalesOrder, OrderItem, Lead, Opportunity
+    Inventory, InventoryMovement, Supplier, PurchaseOrder, PurchaseOrderItem,
+    SalesOrder, OrderItem, Lead, Opportunity, SearchDocument, DashboardStat, DashboardStatDelta,
+    DocumentCounter
 )
 
 def init_database():
@@ -40,6 +42,15 @@ def init_database():
         # Create all tables
         Base.metadata.create_all(bind=engine)
         print("✅ Database tables created successfully!")
+        order_status.ensure_order_item_warehouses(engine)
+        print("✅ Order line warehouses added")
+        product_search.ensure_search_index(engine)
+        search_index.ensure_search_index(engine)
+        print("✅ Search indexes created")
+        dashboard.ensure_dashboard_stats(engine)
+        print("✅ Dashboard aggregates created")
+        numbering.ensure_document_numbering(engine)
+        print("✅ Document number sequences created")
         print("\n📋 Created tables:")
         for table_name in sorted(Base.metadata.tables.keys()):
             print(f"   ✓ {table_name}")
@@ -1,132 +1,342 @@
 """
 Migrate data from SQLite to PostgreSQL.
 This script copies all data from SQLite database to PostgreSQL.
+
+Rows are read from SQLite in chunks (ordered by rowid) and loaded with
+COPY FROM STDIN, or with multi-row INSERT (executemany) when the driver is not
+psycopg2 or --insert is given. INSERT binds every value through SQLAlchemy
+types like the original row-by-row script; use it if COPY rejects a value.
+Tables are loaded in parallel in foreign-key order: a table starts as soon as
+every table it references is done. Progress is stored in PostgreSQL
+(sqlite_migration_progress) in the same transaction as each chunk, so an
+interrupted run continues from the last committed chunk. Sequences are reset
+at the end, document number sequences continue from the SQLite counters.
+
+Usage:
+    python migrate_sqlite_to_postgresql.py [--sqlite-path ./crm_ims.db]
+        [--chunk-size 50000] [--workers 4] [--insert] [--restart] [--yes]
 """
+import argparse
+import io
 import os
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import MetaData, Table, create_engine, inspect, insert, text
 
 # Load environment variables
 load_dotenv()
 
-def migrate_data():
+PROGRESS_TABLE = "sqlite_migration_progress"
+
+_print_lock = threading.Lock()
+
+
+def log(message: str):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Copy data from SQLite to PostgreSQL")
+    parser.add_argument("--sqlite-path", default="./crm_ims.db", help="Path to the SQLite database file")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per chunk (one transaction each)")
+    parser.add_argument("--workers", type=int, default=4, help="Tables loaded in parallel")
+    parser.add_argument("--insert", action="store_true",
+                        help="Load with INSERT (executemany) instead of COPY FROM STDIN")
+    parser.add_argument("--restart", action="store_true",
+                        help="Forget saved progress and TRUNCATE the destination tables first")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    return parser.parse_args()
+
+
+def _copy_value(value) -> str:
+    """Encode a value for COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bytes):
+        return "\\\\x" + value.hex()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_buffer(rows) -> io.StringIO:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def load_order(postgres_inspector, tables):
+    """Map each table to the tables it references (self-references ignored)."""
+    dependencies = {}
+    for table_name in tables:
+        referred = {
+            foreign_key["referred_table"]
+            for foreign_key in postgres_inspector.get_foreign_keys(table_name)
+        }
+        dependencies[table_name] = (referred & set(tables)) - {table_name}
+    return dependencies
+
+
+class TableCopier:
+    def __init__(self, sqlite_engine, postgres_engine, chunk_size: int, use_copy: bool = True):
+        self.sqlite_engine = sqlite_engine
+        self.postgres_engine = postgres_engine
+        self.chunk_size = chunk_size
+        self.use_copy = use_copy and postgres_engine.dialect.driver == "psycopg2"
+
+    def progress(self, table_name: str):
+        with self.postgres_engine.connect() as conn:
+            row = conn.execute(
+                text(f"SELECT last_rowid, rows_copied, completed FROM {PROGRESS_TABLE} WHERE table_name = :t"),
+                {"t": table_name}
+            ).first()
+        return row if row else (0, 0, False)
+
+    def _save_progress(self, conn, table_name, last_rowid, rows):
+        conn.execute(
+            text(
+                f"INSERT INTO {PROGRESS_TABLE} (table_name, last_rowid, rows_copied, completed, updated_at) "
+                "VALUES (:t, :last_rowid, :rows, FALSE, now()) "
+                "ON CONFLICT (table_name) DO UPDATE SET last_rowid = EXCLUDED.last_rowid, "
+                f"rows_copied = {PROGRESS_TABLE}.rows_copied + EXCLUDED.rows_copied, updated_at = now()"
+            ),
+            {"t": table_name, "last_rowid": last_rowid, "rows": rows}
+        )
+
+    def load_chunk(self, table, columns, rows, last_rowid):
+        """Load one chunk and record progress in the same transaction."""
+        with self.postgres_engine.begin() as conn:
+            if self.use_copy:
+                column_list = ", ".join(_quote(column) for column in columns)
+                cursor = conn.connection.cursor()
+                cursor.copy_expert(f"COPY {_quote(table.name)} ({column_list}) FROM STDIN", _copy_buffer(rows))
+            else:
+                conn.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+            self._save_progress(conn, table.name, last_rowid, len(rows))
+
+    def _mark_completed(self, table_name):
+        with self.postgres_engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"INSERT INTO {PROGRESS_TABLE} (table_name, completed, updated_at) VALUES (:t, TRUE, now()) "
+                    "ON CONFLICT (table_name) DO UPDATE SET completed = TRUE, updated_at = now()"
+                ),
+                {"t": table_name}
+            )
+
+    def copy_table(self, table_name: str, columns):
+        last_rowid, rows_done, completed = self.progress(table_name)
+        if completed:
+            log(f"⏭️  {table_name}: already migrated ({rows_done} rows)")
+            return 0
+
+        if last_rowid:
+            log(f"🔁 {table_name}: resuming after rowid {last_rowid} ({rows_done} rows already copied)")
+        else:
+            log(f"📤 Migrating {table_name}...")
+
+        table = Table(table_name, MetaData(), autoload_with=self.postgres_engine)
+
+        column_list = ", ".join(_quote(column) for column in columns)
+        select_chunk = text(
+            f"SELECT rowid, {column_list} FROM {_quote(table_name)} "
+            "WHERE rowid > :last_rowid ORDER BY rowid LIMIT :limit"
+        )
+
+        started_at = time.perf_counter()
+        copied = 0
+        with self.sqlite_engine.connect() as source:
+            while True:
+                chunk = source.execute(select_chunk, {"last_rowid": last_rowid, "limit": self.chunk_size}).fetchall()
+                if not chunk:
+                    break
+                last_rowid = chunk[-1][0]
+                rows = [tuple(row[1:]) for row in chunk]
+                self.load_chunk(table, columns, rows, last_rowid)
+                copied += len(rows)
+                if len(chunk) == self.chunk_size:
+                    elapsed = time.perf_counter() - started_at
+                    log(f"   … {table_name}: {rows_done + copied} rows ({copied / elapsed:,.0f} rows/s)")
+
+        self._mark_completed(table_name)
+        elapsed = time.perf_counter() - started_at
+        rate = copied / elapsed if elapsed > 0 else 0
+        log(f"   ✅ {table_name}: {copied} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+        return copied
+
+
+def reset_sequences(postgres_engine, tables):
+    """Move serial sequences past the copied ids."""
+    with postgres_engine.begin() as conn:
+        for table_name, columns in tables.items():
+            if "id" not in columns:
+                continue
+            sequence = conn.execute(
+                text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table_name}
+            ).scalar()
+            if not sequence:
+                continue
+            conn.execute(
+                text(
+                    "SELECT setval(CAST(:sequence AS regclass), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+                    f"FROM {_quote(table_name)}"
+                ),
+                {"sequence": sequence}
+            )
+            log(f"   🔢 {table_name}: sequence reset")
+
+
+def reset_document_numbers(postgres_engine):
+    """Continue document number sequences from the SQLite counters (see app/services/numbering.py)."""
+    with postgres_engine.begin() as conn:
+        counters = conn.execute(text("SELECT name, value FROM document_counters WHERE value > 0")).all()
+        for name, value in counters:
+            sequence = f"document_number_{name}"
+            conn.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {_quote(sequence)}"))
+            conn.execute(
+                text("SELECT setval(CAST(:sequence AS regclass), GREATEST(:value, last_value)) FROM " + _quote(sequence)),
+                {"sequence": sequence, "value": value}
+            )
+            log(f"   🔢 {sequence}: continues after {value}")
+
+
+def migrate_data(args):
     """Migrate data from SQLite to PostgreSQL."""
-    
+
     # SQLite source
-    sqlite_url = "sqlite:///./crm_ims.db"
-    if not os.path.exists("./crm_ims.db"):
-        print("❌ SQLite database file not found: ./crm_ims.db")
+    sqlite_url = f"sqlite:///{args.sqlite_path}"
+    if not os.path.exists(args.sqlite_path):
+        print(f"❌ SQLite database file not found: {args.sqlite_path}")
         sys.exit(1)
-    
+
     # PostgreSQL destination
     postgres_url = os.getenv("DATABASE_URL")
     if not postgres_url or not postgres_url.startswith("postgresql"):
         print("❌ PostgreSQL DATABASE_URL not found or invalid.")
         print("   Set DATABASE_URL environment variable with PostgreSQL connection string.")
         sys.exit(1)
-    
+
     print("📦 Migrating data from SQLite to PostgreSQL...")
     print(f"   Source: {sqlite_url}")
     print(f"   Destination: {postgres_url.split('@')[-1] if '@' in postgres_url else postgres_url}")
-    
-    # Create engines
-    sqlite_engine = create_engine(sqlite_url)
-    postgres_engine = create_engine(postgres_url)
-    
-    sqlite_session = sessionmaker(bind=sqlite_engine)()
-    postgres_session = sessionmaker(bind=postgres_engine)()
-    
+
+    # Create engines (one connection per worker on each side)
+    sqlite_engine = create_engine(
+        sqlite_url,
+        connect_args={"check_same_thread": False},
+        pool_size=args.workers
+    )
+    postgres_engine = create_engine(postgres_url, pool_size=args.workers, max_overflow=args.workers)
+
     try:
-        # Get list of tables
         sqlite_inspector = inspect(sqlite_engine)
         postgres_inspector = inspect(postgres_engine)
-        
-        sqlite_tables = sqlite_inspector.get_table_names()
-        postgres_tables = postgres_inspector.get_table_names()
-        
+
+        sqlite_tables = set(sqlite_inspector.get_table_names())
+        postgres_tables = set(postgres_inspector.get_table_names()) - {PROGRESS_TABLE}
+
         print(f"\n📊 Found {len(sqlite_tables)} tables in SQLite")
-        
-        # Tables to migrate (in order to respect foreign keys)
-        migration_order = [
-            'users',
-            'categories',
-            'customers',
-            'contacts',
-            'products',
-            'warehouses',
-            'suppliers',
-            'inventory',
-            'leads',
-            'opportunities',
-            'sales_orders',
-            'order_items',
-            'purchase_orders',
-            'purchase_order_items',
-        ]
-        
+        for table_name in sorted(sqlite_tables - postgres_tables):
+            print(f"⏭️  Skipping {table_name} (not in PostgreSQL)")
+
+        tables = {}
+        for table_name in sorted(sqlite_tables & postgres_tables):
+            postgres_columns = {column["name"] for column in postgres_inspector.get_columns(table_name)}
+            columns = [
+                column["name"] for column in sqlite_inspector.get_columns(table_name)
+                if column["name"] in postgres_columns
+            ]
+            tables[table_name] = columns
+
+        with postgres_engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} ("
+                "table_name VARCHAR(100) PRIMARY KEY, "
+                "last_rowid BIGINT NOT NULL DEFAULT 0, "
+                "rows_copied BIGINT NOT NULL DEFAULT 0, "
+                "completed BOOLEAN NOT NULL DEFAULT FALSE, "
+                "updated_at TIMESTAMP DEFAULT now())"
+            ))
+            if args.restart:
+                conn.execute(text(f"DELETE FROM {PROGRESS_TABLE}"))
+                if tables:
+                    conn.execute(text(
+                        "TRUNCATE TABLE " + ", ".join(_quote(name) for name in tables) + " CASCADE"
+                    ))
+                print("🧹 Progress cleared and destination tables truncated")
+
+        dependencies = load_order(postgres_inspector, tables)
+        copier = TableCopier(sqlite_engine, postgres_engine, args.chunk_size, use_copy=not args.insert)
+        method = "COPY FROM STDIN" if copier.use_copy else "INSERT (executemany)"
+        print(f"🚚 Loading {len(tables)} tables with {method}, {args.workers} in parallel\n")
+
+        started_at = time.perf_counter()
         migrated_count = 0
-        
-        for table_name in migration_order:
-            if table_name not in sqlite_tables:
-                print(f"⏭️  Skipping {table_name} (not in SQLite)")
-                continue
-            
-            if table_name not in postgres_tables:
-                print(f"⏭️  Skipping {table_name} (not in PostgreSQL)")
-                continue
-            
-            # Get data from SQLite
-            result = sqlite_session.execute(f"SELECT * FROM {table_name}")
-            rows = result.fetchall()
-            columns = result.keys()
-            
-            if not rows:
-                print(f"⏭️  Skipping {table_name} (empty)")
-                continue
-            
-            # Clear existing data in PostgreSQL (optional - comment out if you want to keep existing data)
-            # postgres_session.execute(f"TRUNCATE TABLE {table_name} CASCADE")
-            
-            # Insert data into PostgreSQL
-            print(f"📤 Migrating {table_name} ({len(rows)} rows)...")
-            
-            for row in rows:
-                values = dict(zip(columns, row))
-                # Build INSERT statement
-                columns_str = ', '.join(columns)
-                placeholders = ', '.join([f':{col}' for col in columns])
-                insert_sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
-                
-                try:
-                    postgres_session.execute(insert_sql, values)
-                except Exception as e:
-                    print(f"   ⚠️  Warning: Error inserting row into {table_name}: {e}")
-                    # Continue with next row
-                    continue
-            
-            postgres_session.commit()
-            migrated_count += len(rows)
-            print(f"   ✅ Migrated {len(rows)} rows")
-        
+        pending = dict(dependencies)
+        finished = set()
+        failed = None
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            running = {}
+            while (pending and failed is None) or running:
+                if failed is None:
+                    for table_name in [name for name, refs in pending.items() if refs <= finished]:
+                        running[pool.submit(copier.copy_table, table_name, tables[table_name])] = table_name
+                        del pending[table_name]
+                if not running:
+                    raise RuntimeError(f"Circular foreign keys between tables: {', '.join(sorted(pending))}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    table_name = running.pop(future)
+                    try:
+                        migrated_count += future.result()
+                        finished.add(table_name)
+                    except Exception as e:
+                        log(f"   ❌ {table_name}: {e}")
+                        failed = failed or e
+
+        if failed is not None:
+            print("\n❌ Migration stopped. Committed chunks are saved; run the script again to resume.")
+            sys.exit(1)
+
+        print("\n🔢 Resetting sequences...")
+        reset_sequences(postgres_engine, tables)
+        if "document_counters" in tables:
+            reset_document_numbers(postgres_engine)
+
+        elapsed = time.perf_counter() - started_at
         print(f"\n✅ Migration completed!")
-        print(f"   Total rows migrated: {migrated_count}")
-        
+        print(f"   Total rows migrated: {migrated_count} in {elapsed:.1f}s")
+
     except Exception as e:
         print(f"❌ Error during migration: {e}")
-        postgres_session.rollback()
         sys.exit(1)
     finally:
-        sqlite_session.close()
-        postgres_session.close()
+        sqlite_engine.dispose()
+        postgres_engine.dispose()
 
 
 if __name__ == "__main__":
-    response = input("⚠️  This will copy data from SQLite to PostgreSQL. Continue? (yes/no): ")
-    if response.lower() != "yes":
-        print("❌ Aborted.")
-        sys.exit(0)
-    
-    migrate_data()
+    args = parse_args()
+    if not args.yes:
+        response = input("⚠️  This will copy data from SQLite to PostgreSQL. Continue? (yes/no): ")
+        if response.lower() != "yes":
+            print("❌ Aborted.")
+            sys.exit(0)
 
+    migrate_data(args)
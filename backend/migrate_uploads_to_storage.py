@@ -0,0 +1,58 @@
+"""
+Copy uploaded files from a local directory into the configured storage.
+Run once when switching STORAGE_BACKEND from local to s3, so that images
+uploaded before the switch keep working. Files already in the storage are
+skipped, so the script can be run again after an interruption.
+
+Usage:
+    python migrate_uploads_to_storage.py [--source ./uploads]
+"""
+import argparse
+import mimetypes
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.config import settings
+from app.services.storage import get_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=settings.UPLOAD_DIR, help="Local uploads directory")
+    args = parser.parse_args()
+
+    source = Path(args.source)
+    storage = get_storage()
+    print(f"📦 Storage: {settings.STORAGE_BACKEND}")
+    print(f"📁 Source: {source.resolve()}")
+    if storage.local_path("") is not None and storage.local_path("").resolve() == source.resolve():
+        print("⚠️  Source is the storage itself, nothing to copy")
+        return
+
+    started_at = time.perf_counter()
+    copied = skipped = 0
+    for path in sorted(source.rglob("*")):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        key = path.relative_to(source).as_posix()
+        if storage.exists(key):
+            skipped += 1
+            continue
+        # put_file moves its source, so hand it a copy
+        with tempfile.TemporaryDirectory(prefix="uploads-") as directory:
+            copy = Path(directory) / path.name
+            shutil.copyfile(path, copy)
+            storage.put_file(key, copy, mimetypes.guess_type(path.name)[0])
+        copied += 1
+        print(f"   ✓ {key}")
+
+    print(f"✅ Copied {copied} files, {skipped} already stored, in {time.perf_counter() - started_at:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
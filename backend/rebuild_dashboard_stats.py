@@ -0,0 +1,27 @@
+"""
+Rebuild the dashboard aggregates (dashboard_stats) from the source tables.
+Run after bulk changes made outside the application (e.g. data migration)
+or if dashboard figures look out of date.
+"""
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import engine
+from app.config import settings
+from app.services import dashboard
+
+
+def main():
+    """Rebuild the dashboard aggregates for the configured database."""
+    db_url = settings.DATABASE_URL
+    print(f"📊 Database: {db_url.split('@')[-1] if '@' in db_url else db_url}")
+    print("🔨 Rebuilding dashboard aggregates...")
+    started_at = time.perf_counter()
+    rows = dashboard.rebuild_dashboard_stats(engine)
+    print(f"✅ Dashboard aggregates rebuilt: {rows} rows in {time.perf_counter() - started_at:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
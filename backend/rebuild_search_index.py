@@ -0,0 +1,32 @@
+"""
+Rebuild the product search index and the global search index.
+Run after bulk changes made outside the application (e.g. data migration)
+or if search results look out of date.
+"""
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import engine
+from app.config import settings
+from app.services import product_search, search_index
+
+
+def main():
+    """Rebuild the search indexes for the configured database."""
+    db_url = settings.DATABASE_URL
+    print(f"📊 Database: {db_url.split('@')[-1] if '@' in db_url else db_url}")
+    print("🔨 Rebuilding product search index...")
+    started_at = time.perf_counter()
+    product_search.rebuild_search_index(engine)
+    print(f"✅ Product search index rebuilt in {time.perf_counter() - started_at:.1f}s")
+
+    print("🔨 Rebuilding global search index...")
+    started_at = time.perf_counter()
+    documents = search_index.rebuild_search_index(engine)
+    print(f"✅ Global search index rebuilt: {documents} documents in {time.perf_counter() - started_at:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Oversell stress check: place many orders for the same product at once and
+make sure no more units are reserved than are in stock.
+
+Creates a customer, a warehouse and a product with `units` units on hand,
+then sends `orders` parallel POST /api/orders requests for one unit each.
+Exactly `units` orders must succeed (201) and the rest must be refused for
+insufficient stock (400), leaving reserved_quantity == quantity.
+
+Runs in process against the configured database (httpx ASGI transport, the
+handlers on the request threadpool), so use a scratch database: the records
+it creates are left in place.
+
+Usage: python stress_oversell.py <username> <password> [orders] [units]
+"""
+import asyncio
+import sys
+import time
+from collections import Counter
+from decimal import Decimal
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import anyio.to_thread
+import httpx
+
+from app.config import settings
+from app.database import SessionLocal
+from app.main import app
+from app.models import Inventory
+from app.services.stock import receive_stock
+
+
+def stock_up(product_id: int, warehouse_id: int, units: int) -> None:
+    """Put `units` on hand, the way a purchase order receipt does."""
+    db = SessionLocal()
+    try:
+        receive_stock(db, {None: {(product_id, warehouse_id): Decimal(units)}}, reference_type="stress_oversell")
+        db.commit()
+    finally:
+        db.close()
+
+
+def stock_level(product_id: int, warehouse_id: int):
+    db = SessionLocal()
+    try:
+        inventory = db.query(Inventory).filter(
+            Inventory.product_id == product_id, Inventory.warehouse_id == warehouse_id
+        ).one()
+        return inventory.quantity, inventory.reserved_quantity
+    finally:
+        db.close()
+
+
+async def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    username, password = sys.argv[1], sys.argv[2]
+    orders = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    units = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+
+    # Same threadpool size as the lifespan hook sets under uvicorn
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    db_url = settings.DATABASE_URL
+    print(f"📊 Database: {db_url.split('@')[-1] if '@' in db_url else db_url}")
+    print(f"🛒 Orders: {orders}, units in stock: {units}, threadpool: {settings.THREADPOOL_SIZE}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+        response = await client.post("/api/auth/login", data={"username": username, "password": password})
+        if response.status_code != 200:
+            print(f"❌ Login failed: {response.status_code} {response.text}")
+            sys.exit(1)
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        suffix = str(int(time.time() * 1000))[-8:]
+        created = {}
+        for path, payload in (
+            ("/api/customers/", {"company_name": f"Stress customer {suffix}"}),
+            ("/api/warehouses/", {"name": f"Stress warehouse {suffix}", "code": f"ST{suffix}"}),
+            ("/api/products/", {"sku": f"STRESS-{suffix}", "name": f"Stress product {suffix}", "price": "1.00"}),
+        ):
+            response = await client.post(path, json=payload, headers=headers)
+            if response.status_code != 201:
+                print(f"❌ POST {path} failed: {response.status_code} {response.text}")
+                sys.exit(1)
+            created[path] = response.json()["id"]
+        customer_id, warehouse_id, product_id = created.values()
+        await anyio.to_thread.run_sync(stock_up, product_id, warehouse_id, units)
+
+        order = {
+            "customer_id": customer_id,
+            "warehouse_id": warehouse_id,
+            "items": [{"product_id": product_id, "quantity": "1", "unit_price": "1.00"}],
+        }
+
+        async def place_order() -> int:
+            response = await client.post("/api/orders/", json=order, headers=headers)
+            return response.status_code
+
+        started_at = time.perf_counter()
+        statuses = Counter(await asyncio.gather(*(place_order() for _ in range(orders))))
+        elapsed = time.perf_counter() - started_at
+
+    quantity, reserved = await anyio.to_thread.run_sync(stock_level, product_id, warehouse_id)
+    print(f"\n⏱️  {orders} orders in {elapsed:.2f}s")
+    for status_code, count in sorted(statuses.items()):
+        print(f"   {status_code}: {count}")
+    print(f"📦 Product STRESS-{suffix}: quantity {quantity}, reserved {reserved}")
+
+    expected = Counter({201: min(orders, units), 400: max(0, orders - units)})
+    if statuses == expected and Decimal(str(reserved)) == min(orders, units):
+        print("✅ No overselling")
+    else:
+        print(f"❌ Expected {dict(expected)} and {min(orders, units)} reserved")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
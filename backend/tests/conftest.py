@@ -0,0 +1,96 @@
+"""
+Test setup: the app runs against a throwaway SQLite database.
+
+The environment is configured before app modules are imported, since the
+engine and settings are created at import time.
+"""
+import contextlib
+import io
+import itertools
+import os
+import tempfile
+
+_work_dir = tempfile.mkdtemp(prefix="crm-ims-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_work_dir}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_work_dir, "uploads")
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+# app.main reports its startup on stdout
+with contextlib.redirect_stdout(io.StringIO()):
+    from app.main import app
+
+from app.core.security import get_password_hash
+from app.database import SessionLocal, engine
+from app.models import Customer, Inventory, Product, User, Warehouse
+from app.models.user import UserRole
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    db = SessionLocal()
+    db.add(User(
+        username="admin", email="admin@example.com", password=get_password_hash("secret1"),
+        first_name="Admin", last_name="Test", role=UserRole.ADMIN
+    ))
+    db.commit()
+    db.close()
+    response = client.post("/api/auth/login", data={"username": "admin", "password": "secret1"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+_fixture_ids = itertools.count(1)
+
+
+@pytest.fixture
+def stock(db):
+    """A customer and a warehouse holding 1000 units of three products."""
+    suffix = next(_fixture_ids)
+    customer = Customer(company_name="Test customer")
+    warehouse = Warehouse(name="Test warehouse", code=f"T{suffix}")
+    db.add_all([customer, warehouse])
+    db.flush()
+    products = []
+    for i in range(3):
+        product = Product(sku=f"T{suffix}-{i}", name=f"Tile {i}", price=10, cost=6)
+        db.add(product)
+        products.append(product)
+    db.flush()
+    db.add_all([
+        Inventory(product_id=product.id, warehouse_id=warehouse.id, quantity=1000, reserved_quantity=0)
+        for product in products
+    ])
+    db.commit()
+    return {"customer_id": customer.id, "warehouse_id": warehouse.id, "product_ids": [p.id for p in products]}
+
+
+@contextlib.contextmanager
+def count_queries():
+    """Collect the SQL statements executed inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.core.compression import brotli
+from app.models import Inventory, Product
+
+
+ENCODINGS = ["gzip"] + (["br"] if brotli is not None else [])
+
+
+@pytest.fixture
+def inventory(db, stock):
+    """Enough inventory rows for a list above the compression threshold."""
+    for i in range(20):
+        product = Product(sku=f"C{stock['warehouse_id']}-{i}", name=f"Compressed tile {i}", price=10, cost=6)
+        db.add(product)
+        db.flush()
+        db.add(Inventory(product_id=product.id, warehouse_id=stock["warehouse_id"], quantity=5, reserved_quantity=0))
+    db.commit()
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("params", [{"limit": 100}, {"limit": 100, "format": "ndjson"}])
+def test_compressed_responses_decode_to_the_identity_body(client, admin_headers, inventory, encoding, params):
+    identity = client.get("/api/inventory/", params=params, headers={**admin_headers, "Accept-Encoding": "identity"})
+    assert identity.headers.get("content-encoding") is None
+    assert len(identity.content) >= 1024
+
+    compressed = client.get("/api/inventory/", params=params, headers={**admin_headers, "Accept-Encoding": encoding})
+    assert compressed.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert compressed.content == identity.content
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/health", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers.get("content-encoding") is None
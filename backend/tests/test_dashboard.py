@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from app.database import engine
+from app.models import DashboardStatDelta
+from app.services.dashboard import fold_dashboard_deltas, get_dashboard_summary, rebuild_dashboard_stats
+
+
+def test_order_changes_are_visible_before_and_after_fold(client, admin_headers, db, stock):
+    before = get_dashboard_summary(db)
+    response = client.post("/api/orders/", json={
+        "customer_id": stock["customer_id"],
+        "warehouse_id": stock["warehouse_id"],
+        "items": [{"product_id": stock["product_ids"][0], "quantity": "2", "unit_price": "12.50"}],
+    }, headers=admin_headers)
+    assert response.status_code == 201, response.text
+
+    # Not folded yet: read from the pending deltas
+    assert db.query(DashboardStatDelta).count() > 0
+    pending = get_dashboard_summary(db)
+    assert pending["sales_orders"]["total"] == before["sales_orders"]["total"] + 1
+    assert pending["revenue"]["total"] == before["revenue"]["total"] + Decimal(str(response.json()["total"]))
+
+    assert fold_dashboard_deltas(engine) > 0
+    db.expire_all()
+    assert db.query(DashboardStatDelta).count() == 0
+    assert get_dashboard_summary(db) == pending
+
+    # The fixture inserts customers and products directly, so only orders are compared
+    rebuild_dashboard_stats(engine)
+    rebuilt = get_dashboard_summary(db)
+    assert rebuilt["sales_orders"] == pending["sales_orders"]
+    assert rebuilt["revenue"] == pending["revenue"]
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+from app.models import Inventory, Product, Warehouse
+from app.services.replenishment import _available_stock, _on_order
+
+
+def test_low_stock_filter_counts_reserved_stock(client, admin_headers, db, stock):
+    product_id = stock["product_ids"][0]
+    db.query(Product).filter(Product.id == product_id).update({"reorder_level": 100})
+    db.commit()
+    params = {"warehouse_id": stock["warehouse_id"], "low_stock": True}
+
+    response = client.get("/api/inventory/", params=params, headers=admin_headers)
+    assert response.status_code == 200
+    assert [row["product_id"] for row in response.json()] == []
+
+    # 1000 on hand, 950 reserved: 50 available is below the reorder level
+    response = client.post("/api/orders/", json={
+        "customer_id": stock["customer_id"], "warehouse_id": stock["warehouse_id"],
+        "items": [{"product_id": product_id, "quantity": "950", "unit_price": "1.00"}],
+    }, headers=admin_headers)
+    assert response.status_code == 201, response.text
+
+    response = client.get("/api/inventory/", params=params, headers=admin_headers)
+    assert [row["product_id"] for row in response.json()] == [product_id]
+    low_stock = client.get("/api/inventory/low-stock", params={"warehouse_id": stock["warehouse_id"]}, headers=admin_headers)
+    assert [item["product_id"] for item in low_stock.json()] == [product_id]
+
+
+def test_low_stock_aggregates_only_reorder_candidates():
+    # Grouping all of inventory and purchase orders would scan tables the
+    # reorder_level > 0 filter could have narrowed down first
+    for subquery in (_available_stock(), _available_stock(1), _on_order()):
+        assert "products.reorder_level > " in str(subquery.element)
+
+
+def _report(client, headers, **params):
+    response = client.get("/api/inventory/reports", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_turnover_for_a_warehouse_counts_only_its_sales(client, admin_headers, db, stock):
+    product_id = stock["product_ids"][0]
+    other = Warehouse(name="Other warehouse", code=f"O{stock['warehouse_id']}")
+    db.add(other)
+    db.flush()
+    db.add(Inventory(product_id=product_id, warehouse_id=other.id, quantity=100, reserved_quantity=0))
+    db.commit()
+
+    order = client.post("/api/orders/", json={
+        "customer_id": stock["customer_id"], "warehouse_id": stock["warehouse_id"],
+        "items": [{"product_id": product_id, "quantity": "10", "unit_price": "10.00"}],
+    }, headers=admin_headers).json()
+    response = client.put(f"/api/orders/{order['id']}/status", json={"status": "shipped"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    def sold(warehouse_id):
+        report = _report(client, admin_headers, report="turnover", warehouse_id=warehouse_id)
+        return {item["product_id"]: item["sold_quantity"] for item in report["items"]}[product_id]
+
+    assert sold(stock["warehouse_id"]) == 10
+    assert sold(other.id) == 0
+
+
+def test_reports_follow_product_cost_changes(client, admin_headers, db, stock):
+    params = {"report": "valuation", "warehouse_id": stock["warehouse_id"]}
+    assert _report(client, admin_headers, **params)["value"] == 18000
+
+    response = client.put(f"/api/products/{stock['product_ids'][0]}", json={"cost": "8.00"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert _report(client, admin_headers, **params)["value"] == 20000
+
+    # Changed by another process: the cache key follows products.updated_at
+    db.query(Product).filter(Product.id == stock["product_ids"][1]).update({
+        "cost": 10, "updated_at": datetime.now() + timedelta(minutes=1)
+    })
+    db.commit()
+    assert _report(client, admin_headers, **params)["value"] == 24000
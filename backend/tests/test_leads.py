@@ -0,0 +1,41 @@
+import pytest
+
+from tests.conftest import count_queries
+
+
+@pytest.fixture
+def leads(client, admin_headers, stock):
+    """25 leads, half of them for a customer."""
+    for i in range(25):
+        response = client.post("/api/leads/", json={
+            "customer_id": stock["customer_id"] if i % 2 else None,
+            "source": "website",
+            "estimated_value": "100.00",
+        }, headers=admin_headers)
+        assert response.status_code == 201, response.text
+
+
+# The response schema has no nested relations: one SELECT from leads
+LEAD_QUERIES = 1
+
+
+def test_lead_list_query_count_does_not_grow_with_page_size(client, admin_headers, leads):
+    # Warm the authenticated user cache, so only the list itself is counted
+    client.get("/api/leads/", params={"limit": 1}, headers=admin_headers)
+    counts = {}
+    for limit in (1, 20):
+        with count_queries() as statements:
+            response = client.get("/api/leads/", params={"limit": limit}, headers=admin_headers)
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        counts[limit] = len(statements)
+    assert counts == {1: LEAD_QUERIES, 20: LEAD_QUERIES}
+
+
+def test_lead_detail_query_count(client, admin_headers, leads):
+    lead_id = client.get("/api/leads/", params={"limit": 1}, headers=admin_headers).json()[0]["id"]
+    with count_queries() as statements:
+        response = client.get(f"/api/leads/{lead_id}", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["id"] == lead_id
+    assert len(statements) == LEAD_QUERIES
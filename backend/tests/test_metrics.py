@@ -0,0 +1,22 @@
+from app.core.security import get_password_hash
+from app.database import SessionLocal
+from app.models import User
+from app.models.user import UserRole
+
+
+def test_metrics_require_admin(client, admin_headers):
+    assert client.get("/api/metrics").status_code == 401
+
+    db = SessionLocal()
+    db.add(User(
+        username="viewer", email="viewer@example.com", password=get_password_hash("secret1"),
+        first_name="View", last_name="Only", role=UserRole.VIEWER
+    ))
+    db.commit()
+    db.close()
+    token = client.post("/api/auth/login", data={"username": "viewer", "password": "secret1"}).json()["access_token"]
+    assert client.get("/api/metrics", headers={"Authorization": f"Bearer {token}"}).status_code == 403
+
+    response = client.get("/api/metrics", headers=admin_headers)
+    assert response.status_code == 200
+    assert set(response.json()) == {"threadpool", "db_pool", "password_hashing"}
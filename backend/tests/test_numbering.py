@@ -0,0 +1,16 @@
+from app.database import SessionLocal, engine
+from app.services import numbering
+
+
+def test_numbers_are_allocated_when_the_pool_is_exhausted():
+    numbering._blocks.clear()
+    # Request sessions waiting for a number hold every connection of the pool
+    held = [engine.connect() for _ in range(engine.pool.size() + engine.pool._max_overflow)]
+    db = SessionLocal()
+    try:
+        first, second = numbering.next_numbers(db, numbering.SALES_ORDER, 2)
+    finally:
+        db.close()
+        for connection in held:
+            connection.close()
+    assert first < second
@@ -0,0 +1,28 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.services.order_status import ensure_order_item_warehouses
+
+
+def test_order_item_warehouses_are_added_to_old_databases(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for statement in (
+            "CREATE TABLE warehouses (id INTEGER PRIMARY KEY)",
+            "CREATE TABLE inventory (id INTEGER PRIMARY KEY, product_id INTEGER, warehouse_id INTEGER)",
+            "CREATE TABLE inventory_movements (id INTEGER PRIMARY KEY, inventory_id INTEGER,"
+            " movement_type VARCHAR(20), reference_type VARCHAR(50), reference_id INTEGER)",
+            "CREATE TABLE order_items (id INTEGER PRIMARY KEY, order_id INTEGER, product_id INTEGER)",
+            "INSERT INTO warehouses VALUES (1), (2)",
+            "INSERT INTO inventory VALUES (10, 5, 1), (11, 5, 2)",
+            "INSERT INTO inventory_movements VALUES (1, 11, 'RESERVE', 'sales_order', 7)",
+            "INSERT INTO order_items VALUES (1, 7, 5), (2, 8, 5)",
+        ):
+            conn.execute(text(statement))
+
+    ensure_order_item_warehouses(engine)
+    ensure_order_item_warehouses(engine)
+
+    assert "warehouse_id" in {column["name"] for column in inspect(engine).get_columns("order_items")}
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, warehouse_id FROM order_items ORDER BY id")).all()
+    assert [tuple(row) for row in rows] == [(1, 2), (2, None)]
@@ -0,0 +1,44 @@
+import pytest
+
+from tests.conftest import count_queries
+
+
+@pytest.fixture
+def orders(client, admin_headers, stock):
+    """25 orders of one to three lines each."""
+    for i in range(25):
+        items = [
+            {"product_id": product_id, "quantity": "1", "unit_price": "10.00"}
+            for product_id in stock["product_ids"][:i % 3 + 1]
+        ]
+        response = client.post("/api/orders/", json={
+            "customer_id": stock["customer_id"], "warehouse_id": stock["warehouse_id"], "items": items
+        }, headers=admin_headers)
+        assert response.status_code == 201, response.text
+
+
+# Orders joined with customers, then one IN query each for items and their products
+ORDER_QUERIES = 3
+
+
+@pytest.mark.parametrize("view", ["full", "list"])
+def test_order_list_query_count_does_not_grow_with_page_size(client, admin_headers, orders, view):
+    # Warm the authenticated user cache, so only the list itself is counted
+    client.get("/api/orders/", params={"view": view, "limit": 1}, headers=admin_headers)
+    counts = {}
+    for limit in (1, 20):
+        with count_queries() as statements:
+            response = client.get("/api/orders/", params={"view": view, "limit": limit}, headers=admin_headers)
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        counts[limit] = len(statements)
+    assert counts == {1: ORDER_QUERIES, 20: ORDER_QUERIES}
+
+
+def test_order_detail_is_loaded_up_front(client, admin_headers, orders):
+    order_id = client.get("/api/orders/", params={"limit": 1}, headers=admin_headers).json()[0]["id"]
+    with count_queries() as statements:
+        response = client.get(f"/api/orders/{order_id}", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["items"]
+    assert len(statements) == ORDER_QUERIES
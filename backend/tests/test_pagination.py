@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor
+
+
+def _cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 5, 1, 12, 30), Decimal("12.50"), "SO-000001", 42, None]
+    assert decode_cursor(encode_cursor(values), len(values)) == values
+
+
+@pytest.mark.parametrize("values", [
+    ["a", [1]],
+    ["a", {"x": 1}],
+    [{"n": "not a number"}, 1],
+    [{"dt": 5}, 1],
+    [[], []],
+])
+def test_tampered_cursor_is_rejected(values):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(_cursor(values), 2)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", [_cursor(["a", [1]]), _cursor([1, 2, 3]), "not-base64!"])
+def test_list_endpoint_rejects_tampered_cursor(client, admin_headers, cursor):
+    response = client.get("/api/customers/", params={"cursor": cursor}, headers=admin_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Некорректный курсор пагинации"
@@ -0,0 +1,10 @@
+from unittest import mock
+
+from app.services import product_images
+
+
+def test_missing_image_with_size_does_not_schedule_variants(client):
+    with mock.patch.object(product_images, "schedule_variants") as schedule_variants:
+        response = client.get(f"/api/upload/product-image/{'0' * 64}.jpg", params={"size": "grid"})
+    assert response.status_code == 404
+    schedule_variants.assert_not_called()
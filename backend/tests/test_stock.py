@@ -0,0 +1,43 @@
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Inventory
+from app.services import stock as stock_service
+from tests.conftest import count_queries
+
+
+def _reserved(db, stock, product_id):
+    db.expire_all()
+    return db.query(Inventory.reserved_quantity).filter(
+        Inventory.product_id == product_id, Inventory.warehouse_id == stock["warehouse_id"]
+    ).scalar()
+
+
+def test_second_reservation_past_available_stock_is_refused(db, stock):
+    product_id = stock["product_ids"][0]
+    line = (product_id, stock["warehouse_id"], Decimal("600"))
+    stock_service.reserve_stock(db, [line])
+    db.commit()
+
+    # A concurrent request that passed its availability check before the first
+    # reservation committed: the guarded UPDATE must still refuse it
+    with mock.patch.object(stock_service, "_check_availability"):
+        with pytest.raises(HTTPException) as error:
+            stock_service.reserve_stock(db, [line])
+    assert error.value.status_code == 409
+    assert _reserved(db, stock, product_id) == Decimal("600")
+
+
+def test_reservation_query_count_does_not_grow_with_order_lines(db, stock):
+    counts = {}
+    for lines in (1, 3):
+        with count_queries() as statements:
+            stock_service.reserve_stock(db, [
+                (product_id, stock["warehouse_id"], Decimal("1")) for product_id in stock["product_ids"][:lines]
+            ])
+        db.commit()
+        counts[lines] = len(statements)
+    assert counts[3] == counts[1]
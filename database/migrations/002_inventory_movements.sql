@@ -0,0 +1,16 @@
+-- Inventory movements ledger
+-- Every change of inventory.quantity / inventory.reserved_quantity is appended here
+CREATE TABLE IF NOT EXISTS inventory_movements (
+    id SERIAL PRIMARY KEY,
+    inventory_id INTEGER NOT NULL REFERENCES inventory(id) ON DELETE CASCADE,
+    movement_type VARCHAR(20) NOT NULL CHECK (movement_type IN ('reserve', 'release', 'ship', 'receive', 'adjust')),
+    quantity_change NUMERIC(10, 3) NOT NULL DEFAULT 0,
+    reserved_change NUMERIC(10, 3) NOT NULL DEFAULT 0,
+    reference_type VARCHAR(30),
+    reference_id INTEGER,
+    note VARCHAR(255),
+    created_by INTEGER REFERENCES users(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_inventory_movements_inventory_id_id ON inventory_movements(inventory_id, id);
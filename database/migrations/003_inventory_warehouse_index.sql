@@ -0,0 +1,2 @@
+-- Keyset pagination of inventory filtered by warehouse (ORDER BY id)
+CREATE INDEX IF NOT EXISTS ix_inventory_warehouse_id_id ON inventory(warehouse_id, id);
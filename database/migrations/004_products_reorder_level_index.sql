@@ -0,0 +1,2 @@
+-- Low-stock detection only looks at products with a reorder level
+CREATE INDEX IF NOT EXISTS ix_products_reorder_level ON products(reorder_level) WHERE reorder_level > 0;
@@ -0,0 +1,3 @@
+-- Sales history aggregates for inventory turnover reports
+CREATE INDEX IF NOT EXISTS ix_sales_orders_order_date_status ON sales_orders(order_date, status);
+CREATE INDEX IF NOT EXISTS ix_order_items_order_id_product_id ON order_items(order_id, product_id, quantity);
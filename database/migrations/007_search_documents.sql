@@ -0,0 +1,15 @@
+-- Global search index (customers, products, suppliers, leads, orders)
+-- Filled by the application on startup if empty; rebuild with backend/rebuild_search_index.py
+CREATE TABLE IF NOT EXISTS search_documents (
+    id SERIAL PRIMARY KEY,
+    entity_type VARCHAR(30) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    subtitle VARCHAR(255),
+    content TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT _search_document_entity_uc UNIQUE (entity_type, entity_id)
+);
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_search_documents_content_trgm ON search_documents USING gin (content gin_trgm_ops);
@@ -0,0 +1,6 @@
+-- Keyset pagination of list endpoints (sort key + id)
+CREATE INDEX IF NOT EXISTS ix_sales_orders_created_at_id ON sales_orders(created_at, id);
+CREATE INDEX IF NOT EXISTS ix_purchase_orders_created_at_id ON purchase_orders(created_at, id);
+CREATE INDEX IF NOT EXISTS ix_users_created_at_id ON users(created_at, id);
+CREATE INDEX IF NOT EXISTS ix_suppliers_name_id ON suppliers(name, id);
+CREATE INDEX IF NOT EXISTS ix_warehouses_name_id ON warehouses(name, id);
@@ -0,0 +1,11 @@
+-- Dashboard aggregates, updated by the application in the same transaction as each change
+-- Filled by the application on startup if empty; rebuild with backend/rebuild_dashboard_stats.py
+CREATE TABLE IF NOT EXISTS dashboard_stats (
+    id SERIAL PRIMARY KEY,
+    metric VARCHAR(50) NOT NULL,
+    key VARCHAR(50) NOT NULL DEFAULT '',
+    count INTEGER NOT NULL DEFAULT 0,
+    amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT _dashboard_stat_metric_key_uc UNIQUE (metric, key)
+);
@@ -0,0 +1,17 @@
+-- Warehouse each sales order line is reserved from, used when the order is shipped or cancelled
+ALTER TABLE order_items ADD COLUMN warehouse_id INTEGER REFERENCES warehouses(id);
+
+-- Existing lines: warehouse of the reservation recorded in the inventory ledger
+UPDATE order_items SET warehouse_id = (
+    SELECT inventory.warehouse_id
+    FROM inventory_movements
+    JOIN inventory ON inventory.id = inventory_movements.inventory_id
+    WHERE inventory_movements.reference_type = 'sales_order'
+      AND inventory_movements.reference_id = order_items.order_id
+      -- enum name in tables created by the application, value in 002_inventory_movements.sql
+      AND CAST(inventory_movements.movement_type AS VARCHAR(20)) IN ('RESERVE', 'reserve')
+      AND inventory.product_id = order_items.product_id
+    ORDER BY inventory_movements.id
+    LIMIT 1
+)
+WHERE warehouse_id IS NULL;
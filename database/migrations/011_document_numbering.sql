@@ -0,0 +1,9 @@
+-- Document numbers, handed out by app/services/numbering.py in blocks per worker
+CREATE SEQUENCE IF NOT EXISTS document_number_sales_order;
+CREATE SEQUENCE IF NOT EXISTS document_number_purchase_order;
+
+-- Counters used instead of sequences on SQLite
+CREATE TABLE IF NOT EXISTS document_counters (
+    name VARCHAR(50) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
@@ -0,0 +1,9 @@
+-- Changes to the dashboard aggregates, appended by writers in their own transaction
+-- and folded into dashboard_stats by the application (app/services/dashboard.py)
+CREATE TABLE IF NOT EXISTS dashboard_stat_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    metric VARCHAR(50) NOT NULL,
+    key VARCHAR(50) NOT NULL DEFAULT '',
+    count INTEGER NOT NULL DEFAULT 0,
+    amount NUMERIC(14, 2) NOT NULL DEFAULT 0
+);
@@ -15,6 +15,8 @@ import {
   Inventory as InventoryIcon,
   ShoppingCart as ShoppingCartIcon,
   TrendingUp as TrendingUpIcon,
+  Payments as PaymentsIcon,
+  Warehouse as WarehouseIcon,
 } from '@mui/icons-material';
 import DashboardLayout from '@/components/Layout/DashboardLayout';
 import ProtectedRoute from '@/components/Auth/ProtectedRoute';
@@ -25,6 +27,8 @@ interface DashboardStats {
   products: number;
   orders: number;
   leads: number;
+  revenue: number;
+  inventoryValue: number;
 }
 
 export default function DashboardPage() {
@@ -33,6 +37,8 @@ export default function DashboardPage() {
     products: 0,
     orders: 0,
     leads: 0,
+    revenue: 0,
+    inventoryValue: 0,
   });
   const [loading, setLoading] = useState(true);
 
@@ -42,23 +48,16 @@ export default function DashboardPage() {
 
   const fetchStats = async () => {
     try {
-      const [customersRes, productsRes, ordersRes, leadsRes] = await Promise.all([
-        api.get('/customers?limit=1'),
-        api.get('/products?limit=1'),
-        api.get('/orders?limit=1'),
-        api.get('/leads?limit=1'),
-      ]);
-
-      const customers = Array.isArray(customersRes.data) ? customersRes.data : [];
-      const products = Array.isArray(productsRes.data) ? productsRes.data : [];
-      const orders = Array.isArray(ordersRes.data) ? ordersRes.data : [];
-      const leads = Array.isArray(leadsRes.data) ? leadsRes.data : [];
+      // All figures come from the pre-aggregated summary in one request
+      const { data } = await api.get('/dashboard/summary', { params: { days: 30 } });
 
       setStats({
-        customers: customers.length,
-        products: products.length,
-        orders: orders.length,
-        leads: leads.length,
+        customers: data.customers ?? 0,
+        products: data.products ?? 0,
+        orders: data.sales_orders?.total ?? 0,
+        leads: data.leads?.open ?? 0,
+        revenue: Number(data.revenue?.total ?? 0),
+        inventoryValue: Number(data.inventory?.value ?? 0),
       });
     } catch (error) {
       console.error('Error fetching stats:', error);
@@ -140,6 +139,22 @@ export default function DashboardPage() {
                   color="#43e97b"
                 />
               </Grid>
+              <Grid item xs={12} sm={6}>
+                <StatCard
+                  title="Выручка за 30 дней"
+                  value={`${stats.revenue.toFixed(2)} ТГ`}
+                  icon={<PaymentsIcon sx={{ fontSize: 48 }} />}
+                  color="#fa709a"
+                />
+              </Grid>
+              <Grid item xs={12} sm={6}>
+                <StatCard
+                  title="Стоимость запасов"
+                  value={`${stats.inventoryValue.toFixed(2)} ТГ`}
+                  icon={<WarehouseIcon sx={{ fontSize: 48 }} />}
+                  color="#30cfd0"
+                />
+              </Grid>
             </Grid>
           )}
         </Box>
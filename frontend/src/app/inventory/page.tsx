@@ -97,8 +97,20 @@ export default function InventoryPage() {
 
   const fetchInventory = async () => {
     try {
-      const response = await api.get('/inventory');
-      setInventory(Array.isArray(response.data) ? response.data : []);
+      // API отдает инвентарь страницами по id, загружаем все страницы
+      const pageSize = 1000;
+      const items: InventoryItem[] = [];
+      let afterId: number | null = null;
+      while (true) {
+        const params: Record<string, number> = { limit: pageSize };
+        if (afterId !== null) params.after_id = afterId;
+        const response = await api.get('/inventory', { params });
+        const page: InventoryItem[] = Array.isArray(response.data) ? response.data : [];
+        items.push(...page);
+        if (page.length < pageSize) break;
+        afterId = page[page.length - 1].id;
+      }
+      setInventory(items);
       setLoading(false);
     } catch (error) {
       console.error('Error fetching inventory:', error);
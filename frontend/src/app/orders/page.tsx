@@ -142,7 +142,7 @@ export default function OrdersPage() {
 
   const fetchOrders = async () => {
     try {
-      const response = await api.get('/orders');
+      const response = await api.get('/orders', { params: { view: 'list' } });
       setOrders(Array.isArray(response.data) ? response.data : []);
       setLoading(false);
     } catch (error) {
@@ -303,7 +303,7 @@ export default function ProductsPage() {
                     const price = typeof product.price === 'number' ? product.price : parseFloat(String(product.price)) || 0;
                     const cost = typeof product.cost === 'number' ? product.cost : parseFloat(String(product.cost || '0')) || 0;
                     const baseUrl = process.env.NEXT_PUBLIC_API_URL?.replace('/api', '') || 'http://localhost:8000';
-                    const imageUrl = product.image_url ? `${baseUrl}${product.image_url}` : null;
+                    const imageUrl = product.image_url ? `${baseUrl}${product.image_url}?size=grid` : null;
                     const sizeDisplay = product.length_mm && product.width_mm 
                       ? `${product.length_mm}×${product.width_mm} мм`
                       : '-';
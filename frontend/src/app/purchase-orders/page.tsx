@@ -96,7 +96,8 @@ export default function PurchaseOrdersPage() {
       setLoading(true);
       const response = await api.get('/purchase-orders', {
         params: {
-          limit: 1000
+          limit: 1000,
+          view: 'list'
         }
       });
       setOrders(Array.isArray(response.data) ? response.data : []);